@@ -0,0 +1,245 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND,
+    preprocess_image, encrypt_image, steghide_embed_metadata, build_encryption_metadata,
+    compress_data, calculate_hash_bytes,
+)
+from logs import get_logger
+
+
+_STOP = object()
+log = get_logger('async_pipeline')
+
+
+@dataclass(frozen=True)
+class PipelineStage:
+    name: str
+    func: object
+    executor: str = 'thread'
+    concurrency: int = 1
+
+
+def decode_stage(job):
+
+    options = job['options']
+    image, original_size, padded = preprocess_image(
+        job['source'],
+        target_size=options.get('target_size'),
+        grayscale=options.get('grayscale', False),
+        simulate_low_bandwidth=options.get('simulate_low_bandwidth', False)
+    )
+    job['source'] = None
+    job['image'] = image
+    job['original_size'] = original_size
+    job['padded'] = padded
+    return job
+
+
+def encrypt_stage(job):
+
+    params = job['params']
+    encrypted, _ = encrypt_image(
+        job['image'],
+        acm_iterations=params['acm_iterations'],
+        logistic_x0=params['logistic_x0'], logistic_r=params['logistic_r'],
+        acm_a=params['acm_a'], acm_b=params['acm_b'],
+        keystream_backend=params['keystream_backend']
+    )
+    job['encrypted'] = encrypted
+    return job
+
+
+def steg_stage(job):
+
+    params = job['params']
+    image, encrypted = job['image'], job['encrypted']
+    width, height = job['original_size']
+    metadata = build_encryption_metadata(
+        acm_iterations=params['acm_iterations'],
+        acm_a=params['acm_a'],
+        acm_b=params['acm_b'],
+        logistic_x0=params['logistic_x0'],
+        logistic_r=params['logistic_r'],
+        original_shape_unpadded=(height, width) + image.shape[2:],
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=job['options'].get('grayscale', False),
+        padded=job['padded'],
+        pre_steg_shape=encrypted.shape,
+        pre_steg_dtype=encrypted.dtype,
+        keystream_backend=params['keystream_backend']
+    )
+    steg_image, steg_success = steghide_embed_metadata(encrypted, metadata)
+    job['image'] = None
+    job['encrypted'] = steg_image
+    job['steg_success'] = steg_success
+    job['encrypted_shape'] = list(encrypted.shape)
+    return job
+
+
+def compress_stage(job):
+
+    compressed, _ = compress_data(job['encrypted'])
+    if compressed is None:
+        raise ValueError("Compression failed.")
+    job['encrypted'] = None
+    job['compressed'] = compressed
+    return job
+
+
+def hash_stage(job):
+
+    job['sha256'] = calculate_hash_bytes(job['compressed'])
+    return job
+
+
+def write_stage(job):
+
+    output_path = os.path.join(job['output_dir'], f"{job['name']}.zlib-steg")
+    with open(output_path, "wb") as f:
+        f.write(job['compressed'])
+    job['compressed_size'] = len(job['compressed'])
+    job['compressed'] = None
+    job['output_path'] = output_path
+    return job
+
+
+DEFAULT_STAGES = (
+    PipelineStage('decode', decode_stage, executor='thread'),
+    PipelineStage('encrypt', encrypt_stage, executor='process'),
+    PipelineStage('steg', steg_stage, executor='thread'),
+    PipelineStage('compress', compress_stage, executor='thread'),
+    PipelineStage('hash', hash_stage, executor='thread'),
+    PipelineStage('write', write_stage, executor='thread'),
+)
+
+
+def make_job(index, source, output_dir, params=None, options=None):
+
+    if isinstance(source, tuple):
+        name, source = source
+    elif isinstance(source, str):
+        name = os.path.splitext(os.path.basename(source))[0]
+    else:
+        name = f"image_{index:05d}"
+    return {
+        'index': index,
+        'name': name,
+        'source': source,
+        'output_dir': output_dir,
+        'params': dict(params or {}),
+        'options': dict(options or {}),
+        'timings': {},
+        'error': None,
+    }
+
+
+async def _feed(sources, queue, consumers, output_dir, params, options):
+
+    index = 0
+    try:
+        if hasattr(sources, '__aiter__'):
+            async for source in sources:
+                await queue.put(make_job(index, source, output_dir, params, options))
+                index += 1
+        else:
+            for source in sources:
+                await queue.put(make_job(index, source, output_dir, params, options))
+                index += 1
+    finally:
+        for _ in range(consumers):
+            await queue.put(_STOP)
+
+
+async def _collect(queue, results):
+
+    while True:
+        job = await queue.get()
+        if job is _STOP:
+            return
+        results.append(job)
+
+
+async def _stage_worker(stage, executor, in_queue, out_queue):
+
+    loop = asyncio.get_running_loop()
+    while True:
+        job = await in_queue.get()
+        if job is _STOP:
+            return
+        if job['error'] is None:
+            start_time = time.perf_counter()
+            try:
+                job = await loop.run_in_executor(executor, stage.func, job)
+            except Exception as e:
+                log.error("Stage '%s' failed for %s: %s", stage.name, job['name'], e)
+                job['error'] = f"{stage.name}: {e}"
+            job['timings'][stage.name] = time.perf_counter() - start_time
+        await out_queue.put(job)
+
+
+async def _run_stage(stage, executor, in_queue, out_queue, downstream_consumers):
+
+    workers = [asyncio.create_task(_stage_worker(stage, executor, in_queue, out_queue))
+               for _ in range(stage.concurrency)]
+    await asyncio.gather(*workers)
+    for _ in range(downstream_consumers):
+        await out_queue.put(_STOP)
+
+
+async def run_async_pipeline(sources, output_dir='.', stages=DEFAULT_STAGES, queue_size=2, params=None, options=None):
+
+    key_params = {
+        'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+        'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND,
+    }
+    key_params.update(params or {})
+    for stage in stages:
+        if stage.executor not in ('thread', 'process') or stage.concurrency < 1:
+            raise ValueError(f"Invalid stage configuration: {stage}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    thread_workers = sum(s.concurrency for s in stages if s.executor == 'thread')
+    process_workers = sum(s.concurrency for s in stages if s.executor == 'process')
+    thread_pool = ThreadPoolExecutor(max_workers=thread_workers) if thread_workers else None
+    process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers else None
+    executors = {'thread': thread_pool, 'process': process_pool}
+
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    results = []
+    start_time = time.perf_counter()
+    try:
+        tasks = [asyncio.create_task(_feed(sources, queues[0], stages[0].concurrency, output_dir, key_params, options))]
+        for i, stage in enumerate(stages):
+            downstream = stages[i + 1].concurrency if i + 1 < len(stages) else 1
+            tasks.append(asyncio.create_task(
+                _run_stage(stage, executors[stage.executor], queues[i], queues[i + 1], downstream)))
+
+        tasks.append(asyncio.create_task(_collect(queues[-1], results)))
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            task.result()
+    finally:
+        if thread_pool is not None:
+            thread_pool.shutdown(wait=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=True)
+
+    total_time = time.perf_counter() - start_time
+    failed = sum(1 for job in results if job['error'])
+    log.info("Async pipeline processed %d images (%d failed) in %.4f seconds.", len(results), failed, total_time)
+    results.sort(key=lambda job: job['index'])
+    return results, total_time
+
+
+def process_images(sources, output_dir='.', **kwargs):
+
+    return asyncio.run(run_async_pipeline(sources, output_dir=output_dir, **kwargs))
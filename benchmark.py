@@ -0,0 +1,406 @@
+import argparse
+import datetime
+import io
+import json
+import math
+import platform
+import statistics
+import time
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R,
+    preprocess_image, arnold_cat_map, inverse_arnold_cat_map, generate_logistic_map_sequence,
+    apply_aes_sbox, steghide_embed_metadata, steghide_extract_metadata, build_encryption_metadata,
+    compress_data, decompress_data, calculate_hash_bytes, encrypt_image, decrypt_image,
+    isolated_kernel_caches,
+)
+from tracing import Tracer
+
+
+SIZES = (128, 256, 512, 1024, 2048, 4096, 8192)
+MODES = ('gray', 'rgb')
+CONTENT_KINDS = ('synthetic', 'photo')
+DEFAULT_REPEATS = 3
+DEFAULT_BUDGET_S = 20.0
+DEFAULT_THRESHOLD = 0.10
+ZERO_COPY_PEAK_MULTIPLE = 4.0
+ZERO_COPY_COLD_PEAK_MULTIPLE = 8.0
+
+
+def make_input(size, channels, kind, seed=0):
+
+    rng = np.random.default_rng(seed + size * 10 + channels)
+    if kind == 'synthetic':
+        ramp = np.linspace(0, 255, size, dtype=np.float32)
+        grid = np.arange(size) // 16
+        checker = ((grid[:, None] + grid[None, :]) % 2).astype(np.float32) * 48
+        base = (ramp[:, None] + ramp[None, :]) / 2 + checker
+        layers = [np.roll(base, k * size // 3, axis=1) for k in range(channels)]
+    elif kind == 'photo':
+        layers = []
+        for _ in range(channels):
+            layer = np.zeros((size, size), dtype=np.float32)
+            for cells, weight in ((5, 140.0), (17, 60.0), (65, 25.0)):
+                coarse = Image.fromarray(rng.random((cells, cells), dtype=np.float32), mode='F')
+                layer += weight * np.asarray(coarse.resize((size, size), Image.Resampling.BICUBIC))
+            layers.append(layer + rng.normal(0.0, 4.0, (size, size)).astype(np.float32))
+    else:
+        raise ValueError(f"Unknown content kind '{kind}'. Expected one of {CONTENT_KINDS}.")
+    img = np.clip(np.stack(layers, axis=-1), 0, 255).astype(np.uint8)
+    return img[:, :, 0] if channels == 1 else img
+
+
+def _encode_png(img):
+
+    buffer = io.BytesIO()
+    Image.fromarray(img).save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def _ciphertext_like(img):
+
+    return np.random.default_rng(img.size).integers(0, 256, img.shape, dtype=np.uint8)
+
+
+def _metadata_for(img):
+
+    return build_encryption_metadata(
+        acm_iterations=ACM_ITERATIONS, acm_a=ACM_A, acm_b=ACM_B,
+        logistic_x0=LOGISTIC_X0, logistic_r=LOGISTIC_R,
+        original_shape_unpadded=img.shape, original_shape_padded=img.shape, dtype=img.dtype,
+        grayscale=img.ndim == 2, padded=False, pre_steg_shape=img.shape, pre_steg_dtype=img.dtype
+    )
+
+
+def _prepare_preprocess(img):
+
+    data = _encode_png(img)
+    return lambda: preprocess_image(data, grayscale=img.ndim == 2), len(data)
+
+
+def _prepare_acm(img):
+
+    return lambda: arnold_cat_map(img, ACM_ITERATIONS, ACM_A, ACM_B), img.nbytes
+
+
+def _prepare_acm_inverse(img):
+
+    return lambda: inverse_arnold_cat_map(img, ACM_ITERATIONS, ACM_A, ACM_B), img.nbytes
+
+
+def _prepare_logistic(img):
+
+    return lambda: generate_logistic_map_sequence(LOGISTIC_X0, LOGISTIC_R, img.size), img.nbytes
+
+
+def _prepare_sbox(img):
+
+    return lambda: apply_aes_sbox(img), img.nbytes
+
+
+def _prepare_steg_embed(img):
+
+    metadata = _metadata_for(img)
+    return lambda: steghide_embed_metadata(img, metadata), img.nbytes
+
+
+def _prepare_steg_extract(img):
+
+    steg_img, _ = steghide_embed_metadata(img, _metadata_for(img))
+    return lambda: steghide_extract_metadata(steg_img), img.nbytes
+
+
+def _prepare_compress(img):
+
+    data = _ciphertext_like(img)
+    return lambda: compress_data(data), data.nbytes
+
+
+def _prepare_decompress(img):
+
+    data = _ciphertext_like(img)
+    compressed, _ = compress_data(data)
+    return lambda: decompress_data(compressed, data.shape, data.dtype), data.nbytes
+
+
+def _prepare_hash(img):
+
+    data = _ciphertext_like(img).tobytes()
+    return lambda: calculate_hash_bytes(data), len(data)
+
+
+def _prepare_pipeline(img):
+
+    def _round_trip():
+        encrypted, _ = encrypt_image(img, ACM_ITERATIONS, LOGISTIC_X0, LOGISTIC_R, ACM_A, ACM_B)
+        compressed, _ = compress_data(encrypted)
+        restored, _ = decompress_data(compressed, encrypted.shape, encrypted.dtype)
+        return decrypt_image(restored, ACM_ITERATIONS, LOGISTIC_X0, LOGISTIC_R, img.shape, False, ACM_A, ACM_B)
+    return _round_trip, img.nbytes
+
+
+def zero_copy_round_trip(img):
+
+    encrypted, _ = encrypt_image(img, ACM_ITERATIONS, LOGISTIC_X0, LOGISTIC_R, ACM_A, ACM_B, out=np.empty_like(img))
+    encrypted, _ = steghide_embed_metadata(encrypted, _metadata_for(img), in_place=True)
+    compressed, _ = compress_data(encrypted)
+    restored, _ = decompress_data(compressed, encrypted.shape, encrypted.dtype, out=encrypted)
+    return decrypt_image(restored, ACM_ITERATIONS, LOGISTIC_X0, LOGISTIC_R, img.shape, False, ACM_A, ACM_B, in_place=True)
+
+
+def _prepare_pipeline_zero_copy(img):
+
+    return lambda: zero_copy_round_trip(img), img.nbytes
+
+
+BENCHMARKS = {
+    'preprocess': _prepare_preprocess,
+    'acm': _prepare_acm,
+    'acm_inverse': _prepare_acm_inverse,
+    'logistic_sequence': _prepare_logistic,
+    'sbox': _prepare_sbox,
+    'steg_embed': _prepare_steg_embed,
+    'steg_extract': _prepare_steg_extract,
+    'compress': _prepare_compress,
+    'decompress': _prepare_decompress,
+    'hash': _prepare_hash,
+    'pipeline': _prepare_pipeline,
+    'pipeline_zero_copy': _prepare_pipeline_zero_copy,
+}
+CACHED_BENCHMARKS = ('acm', 'acm_inverse', 'pipeline', 'pipeline_zero_copy')
+
+
+def result_key(result):
+
+    return f"{result['benchmark']}/{result['content']}/{result['mode']}/{result['size']}"
+
+
+def time_benchmark(fn, repeats=DEFAULT_REPEATS, warm_caches=False):
+
+    with isolated_kernel_caches(warm_caches):
+        if warm_caches:
+            fn()
+        tracer = Tracer(memory='tracemalloc').start()
+        try:
+            with tracer.span('warmup') as span:
+                fn()
+        finally:
+            tracer.stop()
+        peak_bytes = span.peak_mem - span.start_mem
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            fn()
+            timings.append((time.perf_counter_ns() - start) / 1e9)
+    return timings, peak_bytes
+
+
+def run_benchmarks(sizes=SIZES, modes=MODES, content_kinds=CONTENT_KINDS, benchmarks=None,
+                   repeats=DEFAULT_REPEATS, budget_s=DEFAULT_BUDGET_S):
+
+    names = list(benchmarks or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {unknown}. Available: {sorted(BENCHMARKS)}")
+    runs = [(name, False) for name in names] + [(name, True) for name in names if name in CACHED_BENCHMARKS]
+
+    results = []
+    skipped = []
+    last_run = {}
+    for size in sorted(sizes):
+        for mode in modes:
+            channels = 1 if mode == 'gray' else 3
+            for kind in content_kinds:
+                img = None
+                for name, warm in runs:
+                    label = f"{name}_warm" if warm else name
+                    previous = last_run.get((label, mode, kind))
+                    if previous is not None:
+                        prev_size, prev_seconds = previous
+                        estimate = prev_seconds * (size / prev_size) ** 2
+                        if estimate > budget_s:
+                            skipped.append({'benchmark': label, 'size': size, 'mode': mode, 'content': kind,
+                                            'estimated_s': estimate})
+                            continue
+                    if img is None:
+                        img = make_input(size, channels, kind)
+                    fn, nbytes = BENCHMARKS[name](img)
+                    timings, peak_bytes = time_benchmark(fn, repeats, warm_caches=warm)
+                    median_s = statistics.median(timings)
+                    result = {
+                        'benchmark': label, 'size': size, 'mode': mode, 'content': kind,
+                        'caches': 'warm' if warm else 'cold',
+                        'bytes': nbytes,
+                        'median_s': median_s,
+                        'min_s': min(timings),
+                        'mb_s': nbytes / median_s / 1e6 if median_s > 0 else float('inf'),
+                        'peak_mem_mb': peak_bytes / 1e6,
+                    }
+                    results.append(result)
+                    last_run[(label, mode, kind)] = (size, median_s)
+                    print(f"{result_key(result):<40} {median_s:>10.4f}s {result['mb_s']:>10.1f} MB/s "
+                          f"{result['peak_mem_mb']:>9.1f} MB peak")
+    for entry in skipped:
+        print(f"Skipped {entry['benchmark']}/{entry['content']}/{entry['mode']}/{entry['size']}: "
+              f"estimated {entry['estimated_s']:.1f}s exceeds budget of {budget_s:.1f}s")
+    return results, skipped
+
+
+def check_peak_memory(size=2048, mode='rgb', kind='photo', multiple=ZERO_COPY_PEAK_MULTIPLE,
+                      cold_multiple=ZERO_COPY_COLD_PEAK_MULTIPLE):
+
+    img = make_input(size, 1 if mode == 'gray' else 3, kind)
+    peaks = {}
+    for name in ('pipeline', 'pipeline_zero_copy'):
+        fn, _ = BENCHMARKS[name](img)
+        for phase in ('cold', 'warm'):
+            _, peak_bytes = time_benchmark(fn, repeats=0, warm_caches=phase == 'warm')
+            peaks[f"{name}/{phase}"] = peak_bytes / img.nbytes
+            print(f"{name + '/' + phase:<25} peak {peak_bytes / 1e6:>9.1f} MB = "
+                  f"{peaks[name + '/' + phase]:.2f}x the {img.nbytes / 1e6:.1f} MB image")
+    limits = {'cold': cold_multiple, 'warm': multiple}
+    passed = True
+    for phase, limit in limits.items():
+        ok = peaks[f"pipeline_zero_copy/{phase}"] <= limit
+        passed = passed and ok
+        print(f"Zero-copy {phase} peak memory check {'PASSED' if ok else 'FAILED'} (limit {limit:.1f}x).")
+    return passed, peaks
+
+
+def scaling_exponents(results):
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result['benchmark'], result['content'], result['mode']), []).append(result)
+    exponents = {}
+    for key, group in groups.items():
+        if len(group) < 2:
+            continue
+        pixels = np.log([r['size'] ** 2 for r in group])
+        seconds = np.log([max(r['median_s'], 1e-9) for r in group])
+        exponents['/'.join(key)] = float(np.polyfit(pixels, seconds, 1)[0])
+    return exponents
+
+
+def save_results(path, results, skipped=()):
+
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'results': results,
+        'skipped': list(skipped),
+        'scaling': scaling_exponents(results),
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_results(path):
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+
+    baseline_results = {result_key(r): r for r in baseline.get('results', [])}
+    comparisons = []
+    for result in results:
+        reference = baseline_results.get(result_key(result))
+        if reference is None:
+            continue
+        ratio = result['median_s'] / reference['median_s'] if reference['median_s'] > 0 else math.inf
+        comparisons.append({
+            'key': result_key(result),
+            'baseline_s': reference['median_s'],
+            'current_s': result['median_s'],
+            'ratio': ratio,
+            'regression': ratio > 1.0 + threshold,
+        })
+    return comparisons
+
+
+def print_comparison(comparisons, threshold=DEFAULT_THRESHOLD):
+
+    print(f"--- Baseline Comparison (regression threshold {threshold:.0%}) ---")
+    for entry in comparisons:
+        status = "REGRESSION" if entry['regression'] else "ok"
+        print(f"{entry['key']:<40} {entry['baseline_s']:>10.4f}s -> {entry['current_s']:>10.4f}s "
+              f"({entry['ratio']:>5.2f}x) {status}")
+    regressions = [entry for entry in comparisons if entry['regression']]
+    print(f"{len(regressions)} regression(s) out of {len(comparisons)} compared benchmarks.")
+    return regressions
+
+
+def plot_scaling(results, path):
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result['benchmark'], result['content'], result['mode']), []).append(result)
+    fig, ax = plt.subplots(figsize=(10, 7))
+    for (name, kind, mode), group in sorted(groups.items()):
+        ax.plot([r['size'] for r in group], [r['mb_s'] for r in group], marker='o', label=f"{name} ({kind}, {mode})")
+    ax.set_xscale('log', base=2)
+    ax.set_yscale('log')
+    ax.set_xlabel('Image side (pixels)')
+    ax.set_ylabel('Throughput (MB/s)')
+    ax.set_title('Pipeline stage scaling')
+    ax.legend(fontsize='x-small', ncol=2)
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage across sizes, modes and content.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--content', nargs='+', choices=CONTENT_KINDS, default=list(CONTENT_KINDS))
+    parser.add_argument('--benchmarks', nargs='+', choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_S,
+                        help="Skip sizes whose estimated run time exceeds this many seconds.")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="Baseline JSON from an earlier run to compare against.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--plot', help="Save scaling curves to this PNG file.")
+    parser.add_argument('--memory-check', type=int, metavar='SIZE', default=None,
+                        help="Only check zero-copy round-trip peak memory at this image side, then exit.")
+    parser.add_argument('--memory-multiple', type=float, default=ZERO_COPY_PEAK_MULTIPLE,
+                        help="Peak limit with the permutation and keystream caches already warm.")
+    parser.add_argument('--cold-memory-multiple', type=float, default=ZERO_COPY_COLD_PEAK_MULTIPLE,
+                        help="Peak limit including permutation and keystream construction.")
+    args = parser.parse_args()
+
+    if args.memory_check:
+        passed, _ = check_peak_memory(args.memory_check, args.modes[-1], args.content[-1], args.memory_multiple,
+                                      args.cold_memory_multiple)
+        raise SystemExit(0 if passed else 1)
+
+    results, skipped = run_benchmarks(args.sizes, args.modes, args.content, args.benchmarks,
+                                      args.repeats, args.budget)
+    save_results(args.output, results, skipped)
+    print(f"Results written to: {args.output}")
+    print("--- Scaling Exponents (time ~ pixels^k) ---")
+    for key, exponent in scaling_exponents(results).items():
+        print(f"{key:<40} k={exponent:.2f}")
+    if args.plot:
+        print(f"Scaling plot written to: {plot_scaling(results, args.plot)}")
+    if args.baseline:
+        regressions = print_comparison(compare_to_baseline(results, load_results(args.baseline), args.threshold),
+                                       args.threshold)
+        if regressions:
+            raise SystemExit(1)
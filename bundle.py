@@ -0,0 +1,513 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND, KEYSTREAM_BACKENDS,
+    preprocess_image, encrypt_image, build_encryption_metadata, steghide_embed_metadata,
+    steghide_extract_metadata, compress_data, decompress_data, decrypt_image,
+)
+from logs import get_logger, add_logging_arguments, configure_from_args
+from metadata_index import read_steg_metadata
+
+
+BUNDLE_MAGIC = b'ICEBNDL1'
+TRAILER_MAGIC = b'ICEIDX01'
+TRAILER = struct.Struct('>8sQQI')
+BUNDLE_VERSION = 1
+KEY_FIELDS = ('acm_iterations', 'acm_a', 'acm_b', 'logistic_x0', 'logistic_r')
+WRITER_QUEUE_SIZE = 64
+COMPRESSION_LEVEL = 7
+
+log = get_logger('bundle')
+_pack_queue = None
+_extract_bundle = None
+
+
+class BundleError(ValueError):
+    pass
+
+
+def compact_metadata(metadata):
+
+    params = (metadata or {}).get('encryption_params', {})
+    compact = {name: params.get(name) for name in KEY_FIELDS}
+    compact.update({
+        'shape': params.get('original_shape_unpadded'),
+        'pre_steg_shape': params.get('pre_steg_shape'),
+        'pre_steg_dtype': params.get('pre_steg_dtype', 'uint8'),
+        'grayscale': params.get('grayscale'),
+        'padded': params.get('padded'),
+        'keystream_backend': params.get('keystream_backend', 'logistic'),
+        'timestamp': (metadata or {}).get('timestamp'),
+    })
+    return compact
+
+
+def _encode_index(entries):
+
+    return zlib.compress(json.dumps({'version': BUNDLE_VERSION, 'entries': entries},
+                                    separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _decode_index(buffer, index_offset, index_length, index_crc):
+
+    raw = buffer[index_offset:index_offset + index_length]
+    if len(raw) != index_length or zlib.crc32(raw) != index_crc:
+        raise BundleError("Bundle index checksum mismatch.")
+    index = json.loads(zlib.decompress(raw))
+    if index.get('version') != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle version {index.get('version')}.")
+    return index['entries']
+
+
+def _locate_index(buffer):
+
+    if buffer[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise BundleError("Not a bundle file (bad magic).")
+    end = len(buffer)
+    while end >= len(BUNDLE_MAGIC) + TRAILER.size:
+        start = end - TRAILER.size
+        magic, index_offset, index_length, index_crc = TRAILER.unpack(buffer[start:end])
+        if magic == TRAILER_MAGIC and index_offset + index_length == start:
+            try:
+                return _decode_index(buffer, index_offset, index_length, index_crc), end
+            except (BundleError, zlib.error, ValueError) as e:
+                log.warning("Skipping damaged bundle index ending at byte %d: %s", end, e)
+        found = buffer.rfind(TRAILER_MAGIC, len(BUNDLE_MAGIC), start + len(TRAILER_MAGIC) - 1)
+        if found < 0:
+            break
+        end = found + TRAILER.size
+    return [], len(BUNDLE_MAGIC)
+
+
+class Bundle:
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.close()
+            raise BundleError(f"{path} is empty.")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        entries, self.end = _locate_index(self._map)
+        if self.end != size:
+            log.warning("%s has %d bytes after the last valid index; they will be ignored.", path, size - self.end)
+        self.entries = {entry['name']: entry for entry in entries}
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+    def __len__(self):
+
+        return len(self.entries)
+
+    def __contains__(self, name):
+
+        return name in self.entries
+
+    def __iter__(self):
+
+        return iter(self.entries.values())
+
+    def names(self, patterns=None):
+
+        if not patterns:
+            return list(self.entries)
+        return [name for name in self.entries if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+
+    def read(self, name):
+
+        entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError(f"No entry named '{name}' in {self.path}.")
+        return memoryview(self._map)[entry['offset']:entry['offset'] + entry['length']]
+
+    def verify(self, name):
+
+        return hashlib.sha256(self.read(name)).hexdigest() == self.entries[name]['sha256']
+
+    def decrypt(self, name, verify=True, params=None):
+
+        start_time = time.perf_counter()
+        if verify and not self.verify(name):
+            raise BundleError(f"Integrity check failed for '{name}': hashes do not match.")
+        meta = self.entries[name]['meta']
+        shape, dtype = tuple(meta['pre_steg_shape']), meta['pre_steg_dtype']
+        steg_image, _ = decompress_data(self.read(name), shape, dtype, out=np.empty(shape, dtype=dtype))
+        if steg_image is None:
+            raise BundleError(f"Decompression failed for '{name}'.")
+        key_params = {field: meta[field] for field in KEY_FIELDS}
+        key_params['keystream_backend'] = meta.get('keystream_backend', 'logistic')
+        embedded = steghide_extract_metadata(steg_image)
+        if embedded is not None:
+            embedded_params = embedded.get('encryption_params', {})
+            key_params.update({field: embedded_params[field] for field in KEY_FIELDS if field in embedded_params})
+        else:
+            log.warning("No embedded metadata in '%s'; using the bundle index parameters.", name)
+        key_params.update(params or {})
+        decrypted, _ = decrypt_image(steg_image, original_shape_before_padding=tuple(meta['shape']),
+                                     padded=meta.get('padded', False), in_place=True, **key_params)
+        if decrypted is None:
+            raise BundleError(f"Decryption failed for '{name}'.")
+        return decrypted, time.perf_counter() - start_time
+
+    def close(self):
+
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+
+class BundleWriter:
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        self.entries = {}
+        if not overwrite and os.path.exists(path) and os.path.getsize(path) > 0:
+            with Bundle(path) as existing:
+                self.entries = dict(existing.entries)
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(BUNDLE_MAGIC)
+        self._appended = 0
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+    def add(self, name, payload, meta, sha256=None):
+
+        if name in self.entries:
+            raise BundleError(f"Entry '{name}' already exists in {self.path}.")
+        digest = hashlib.sha256(payload).hexdigest()
+        if sha256 is not None and sha256 != digest:
+            raise BundleError(f"Digest mismatch for '{name}' while appending.")
+        offset = self._file.tell()
+        self._file.write(payload)
+        self.entries[name] = {'name': name, 'offset': offset, 'length': len(payload), 'sha256': digest, 'meta': meta}
+        self._appended += 1
+        return self.entries[name]
+
+    def add_file(self, path, name=None):
+
+        metadata, digest, error = read_steg_metadata(path)
+        if metadata is None:
+            raise BundleError(f"Could not read embedded metadata from {path}: {error}")
+        with open(path, 'rb') as f:
+            payload = f.read()
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        return self.add(name, payload, compact_metadata(metadata), digest)
+
+    def commit(self):
+
+        index = _encode_index(list(self.entries.values()))
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(TRAILER.pack(TRAILER_MAGIC, index_offset, len(index), zlib.crc32(index)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        appended, self._appended = self._appended, 0
+        return appended
+
+    def close(self):
+
+        if self._file is None:
+            return 0
+        try:
+            return self.commit()
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def _writer_main(path, queue, results, overwrite):
+
+    try:
+        with BundleWriter(path, overwrite=overwrite) as writer:
+            while True:
+                item = queue.get()
+                if item is None:
+                    break
+                name, payload, meta, sha256 = item
+                try:
+                    writer.add(name, payload, meta, sha256)
+                except BundleError as e:
+                    results.put(('error', (name, str(e))))
+            results.put(('done', len(writer.entries)))
+    except Exception as e:
+        results.put(('fatal', f"{type(e).__name__}: {e}"))
+        while queue.get() is not None:
+            pass
+
+
+class WriterProcess:
+
+    def __init__(self, path, overwrite=False, queue_size=WRITER_QUEUE_SIZE):
+        context = multiprocessing.get_context()
+        self.queue = context.Queue(queue_size)
+        self._results = context.Queue()
+        self._process = context.Process(target=_writer_main, args=(path, self.queue, self._results, overwrite),
+                                        name='bundle-writer', daemon=True)
+        self._process.start()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
+
+    def append(self, name, payload, meta, sha256=None):
+
+        self.queue.put((name, payload, meta, sha256))
+
+    def close(self):
+
+        if self._process is None:
+            return None, []
+        self.queue.put(None)
+        errors, total = [], None
+        while total is None:
+            status, value = self._results.get()
+            if status == 'error':
+                errors.append(value)
+            elif status == 'fatal':
+                self._process.join()
+                self._process = None
+                raise BundleError(f"Bundle writer failed: {value}")
+            else:
+                total = value
+        self._process.join()
+        self._process = None
+        for name, error in errors:
+            log.error("Bundle writer rejected %s: %s", name, error)
+        return total, errors
+
+
+def encode_entry(source, params=None, options=None):
+
+    key_params = {
+        'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+        'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND,
+    }
+    key_params.update(params or {})
+    options = options or {}
+    image, (width, height), padded = preprocess_image(
+        source,
+        target_size=options.get('target_size'),
+        grayscale=options.get('grayscale', False),
+        simulate_low_bandwidth=options.get('simulate_low_bandwidth', False)
+    )
+    encrypted, _ = encrypt_image(image, **key_params)
+    metadata = build_encryption_metadata(
+        original_shape_unpadded=(height, width) + image.shape[2:],
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=options.get('grayscale', False),
+        padded=padded,
+        pre_steg_shape=encrypted.shape,
+        pre_steg_dtype=encrypted.dtype,
+        **key_params
+    )
+    steg_image, steg_success = steghide_embed_metadata(encrypted, metadata)
+    if not steg_success:
+        raise BundleError("Steganography embedding failed; bundle entries require embedded metadata.")
+    payload, _ = compress_data(steg_image, level=COMPRESSION_LEVEL)
+    if payload is None:
+        raise BundleError("Compression failed.")
+    return payload, compact_metadata(metadata)
+
+
+def _init_pack_worker(queue):
+
+    global _pack_queue
+    _pack_queue = queue
+
+
+def _pack_job(name, source, params, options):
+
+    start_time = time.perf_counter()
+    payload, meta = encode_entry(source, params, options)
+    sha256 = hashlib.sha256(payload).hexdigest()
+    _pack_queue.put((name, payload, meta, sha256))
+    return name, len(payload), time.perf_counter() - start_time
+
+
+def entry_name(path):
+
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def pack_images(sources, bundle_path, params=None, options=None, workers=None, overwrite=False):
+
+    named = [(entry_name(source), source) if isinstance(source, str) else source for source in sources]
+    names = [name for name, _ in named]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise BundleError(f"Duplicate entry names: {', '.join(duplicates)}")
+
+    start_time = time.perf_counter()
+    results, failures = [], []
+    writer = WriterProcess(bundle_path, overwrite=overwrite)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_pack_worker, initargs=(writer.queue,)) as pool:
+            futures = {pool.submit(_pack_job, name, source, params, options): name for name, source in named}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                    log.debug("Packed %s (%d bytes, %.4fs)", *results[-1])
+                except Exception as e:
+                    failures.append((futures[future], str(e)))
+                    log.error("Failed to pack %s: %s", futures[future], e)
+    finally:
+        total, rejected = writer.close()
+    failures.extend(rejected)
+    rejected_names = {name for name, _ in rejected}
+    packed = [(name, size) for name, size, _ in results if name not in rejected_names]
+    return {'packed': len(packed), 'failures': failures, 'entries': total,
+            'bytes': sum(size for _, size in packed)}, time.perf_counter() - start_time
+
+
+def import_files(paths, bundle_path, overwrite=False):
+
+    start_time = time.perf_counter()
+    imported, failures = 0, []
+    with BundleWriter(bundle_path, overwrite=overwrite) as writer:
+        for path in paths:
+            try:
+                writer.add_file(path)
+                imported += 1
+            except (BundleError, OSError) as e:
+                failures.append((path, str(e)))
+                log.error("Failed to import %s: %s", path, e)
+        total = len(writer.entries)
+    return {'packed': imported, 'failures': failures, 'entries': total}, time.perf_counter() - start_time
+
+
+def _init_extract_worker(path):
+
+    global _extract_bundle
+    _extract_bundle = Bundle(path)
+
+
+def _extract_job(name, output_dir, verify):
+
+    decrypted, decryption_time = _extract_bundle.decrypt(name, verify=verify)
+    output_path = os.path.join(output_dir, f"{name}.png")
+    Image.fromarray(decrypted.astype(np.uint8, copy=False)).save(output_path)
+    return name, output_path, decryption_time
+
+
+def extract_bundle(bundle_path, output_dir, patterns=None, workers=None, verify=True):
+
+    start_time = time.perf_counter()
+    with Bundle(bundle_path) as bundle:
+        names = bundle.names(patterns)
+    os.makedirs(output_dir, exist_ok=True)
+    results, failures = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_extract_worker, initargs=(bundle_path,)) as pool:
+        futures = {pool.submit(_extract_job, name, output_dir, verify): name for name in names}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+                log.debug("Extracted %s to %s (%.4fs)", *results[-1])
+            except Exception as e:
+                failures.append((futures[future], str(e)))
+                log.error("Failed to extract %s: %s", futures[future], e)
+    return {'extracted': results, 'failures': failures}, time.perf_counter() - start_time
+
+
+def _expand_inputs(inputs, pattern):
+
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(os.path.join(item, f) for f in os.listdir(item) if fnmatch.fnmatch(f, pattern)))
+        else:
+            paths.append(item)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack many small encrypted images into one indexed bundle file.")
+    add_logging_arguments(parser, default_level='WARNING')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack_parser = subparsers.add_parser('pack', help="Encrypt images in a process pool and append them to a bundle.")
+    pack_parser.add_argument('bundle')
+    pack_parser.add_argument('inputs', nargs='+', help="Image files or directories.")
+    pack_parser.add_argument('--pattern', default='*.png', help="Filename pattern for directory inputs.")
+    pack_parser.add_argument('--workers', type=int, default=None)
+    pack_parser.add_argument('--grayscale', action='store_true')
+    pack_parser.add_argument('--low-bandwidth', action='store_true', help="Downscale to 128x128 thumbnails before encrypting.")
+    pack_parser.add_argument('--keystream-backend', choices=KEYSTREAM_BACKENDS, default=KEYSTREAM_BACKEND)
+    import_parser = subparsers.add_parser('import', help="Append existing .zlib-steg files without re-encrypting.")
+    import_parser.add_argument('bundle')
+    import_parser.add_argument('inputs', nargs='+', help=".zlib-steg files or directories.")
+    import_parser.add_argument('--pattern', default='*.zlib-steg')
+    for sub in (pack_parser, import_parser):
+        sub.add_argument('--overwrite', action='store_true', help="Start a new bundle instead of appending.")
+    list_parser = subparsers.add_parser('list', help="List bundle entries.")
+    list_parser.add_argument('bundle')
+    list_parser.add_argument('--verify', action='store_true', help="Check every entry digest.")
+    extract_parser = subparsers.add_parser('extract', help="Decrypt selected entries to PNG in a process pool.")
+    extract_parser.add_argument('bundle')
+    extract_parser.add_argument('names', nargs='*', help="Entry names or glob patterns. Defaults to all entries.")
+    extract_parser.add_argument('--output-dir', default='extracted')
+    extract_parser.add_argument('--workers', type=int, default=None)
+    extract_parser.add_argument('--no-verify', action='store_true')
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    if args.command == 'pack':
+        options = {'grayscale': args.grayscale, 'simulate_low_bandwidth': args.low_bandwidth}
+        params = {'keystream_backend': args.keystream_backend}
+        summary, elapsed = pack_images(_expand_inputs(args.inputs, args.pattern), args.bundle, params, options,
+                                       args.workers, args.overwrite)
+        print(f"Packed {summary['packed']} images ({summary['bytes']} bytes) into {args.bundle} in {elapsed:.2f}s; "
+              f"bundle now holds {summary['entries']} entries.")
+    elif args.command == 'import':
+        summary, elapsed = import_files(_expand_inputs(args.inputs, args.pattern), args.bundle, args.overwrite)
+        print(f"Imported {summary['packed']} files into {args.bundle} in {elapsed:.2f}s; "
+              f"bundle now holds {summary['entries']} entries.")
+    elif args.command == 'list':
+        with Bundle(args.bundle) as bundle:
+            for entry in bundle:
+                meta = entry['meta']
+                shape = 'x'.join(str(d) for d in meta.get('shape') or [])
+                status = ('ok' if bundle.verify(entry['name']) else 'CORRUPT') if args.verify else ''
+                print(f"{entry['name']:<32} {entry['offset']:>12} {entry['length']:>10} {shape:>12} "
+                      f"{meta.get('keystream_backend', 'logistic'):<9} {entry['sha256'][:16]} {status}".rstrip())
+            print(f"{len(bundle)} entries, {bundle.end} bytes")
+        raise SystemExit(0)
+    else:
+        summary, elapsed = extract_bundle(args.bundle, args.output_dir, args.names, args.workers, not args.no_verify)
+        print(f"Extracted {len(summary['extracted'])} entries to {args.output_dir} in {elapsed:.2f}s")
+    for name, error in summary['failures']:
+        print(f"  {name}: {error}")
+    if summary['failures']:
+        raise SystemExit(1)
@@ -0,0 +1,475 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND, KEYSTREAM_BACKENDS, ROUNDTRIP_DIGEST,
+    preprocess_image, encrypt_image, build_encryption_metadata, attach_plaintext_digest,
+    steghide_embed_metadata, steghide_extract_metadata, verify_roundtrip,
+    acm_permutation, iter_logistic_keystream, generate_hash_keystream, inv_s_box_np,
+)
+from logs import get_logger, add_logging_arguments, configure_from_args
+
+
+KEY_PARAMS = ('acm_iterations', 'acm_a', 'acm_b', 'logistic_x0', 'logistic_r', 'keystream_backend')
+FRAME_HEADER = struct.Struct('>I')
+MAX_HEADER_BYTES = 1 << 20
+CHUNK_BYTES = 256 * 1024
+CHUNK_COMPRESSION_LEVEL = 7
+COMPRESS_AHEAD = 2
+RECEIVER_WORKERS = 4
+MAX_RESENDS = 3
+KEYSTREAM_BLOCK = 64 * 1024
+DEFAULT_PORT = 8765
+log = get_logger('transport')
+
+
+async def write_frame(writer, header, payload=b''):
+
+    header = dict(header, size=len(payload))
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    writer.write(FRAME_HEADER.pack(len(header_bytes)) + header_bytes)
+    if payload:
+        writer.write(payload)
+    await writer.drain()
+    return FRAME_HEADER.size + len(header_bytes) + len(payload)
+
+
+async def read_frame(reader):
+
+    try:
+        (header_length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    except asyncio.IncompleteReadError:
+        return None, b'', 0
+    if header_length > MAX_HEADER_BYTES:
+        raise ValueError(f"Frame header of {header_length} bytes exceeds the {MAX_HEADER_BYTES} byte limit.")
+    header = json.loads(await reader.readexactly(header_length))
+    payload = await reader.readexactly(header['size']) if header.get('size') else b''
+    return header, payload, FRAME_HEADER.size + header_length + len(payload)
+
+
+class KeystreamFeed:
+
+    def __init__(self, x0, r, total, block_size=KEYSTREAM_BLOCK):
+        self.buffer = np.empty(total, dtype=np.uint8)
+        self.ready = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._fill, args=(x0, r, block_size), name='keystream-feed', daemon=True)
+        self._thread.start()
+
+    def _fill(self, x0, r, block_size):
+
+        blocks = iter_logistic_keystream(x0, r, block_size)
+        while self.ready < self.buffer.size:
+            block = next(blocks)
+            count = min(block.size, self.buffer.size - self.ready)
+            self.buffer[self.ready:self.ready + count] = block[:count]
+            with self._cond:
+                self.ready += count
+                self._cond.notify_all()
+
+    def slice(self, start, stop):
+
+        with self._cond:
+            self._cond.wait_for(lambda: self.ready >= stop)
+        return self.buffer[start:stop]
+
+
+class SeekableKeystream:
+
+    def __init__(self, x0, r, backend):
+        self.x0, self.r, self.backend = x0, r, backend
+
+    def slice(self, start, stop):
+
+        return generate_hash_keystream(self.x0, self.r, stop - start, offset=start, backend=self.backend)
+
+
+def keystream_feed(x0, r, total, backend='logistic'):
+
+    if backend == 'logistic':
+        return KeystreamFeed(x0, r, total)
+    return SeekableKeystream(x0, r, backend)
+
+
+def prepare_cipher(image_input, params, options=None):
+
+    options = options or {}
+    image, (width, height), padded = preprocess_image(
+        image_input,
+        target_size=options.get('target_size'),
+        grayscale=options.get('grayscale', False),
+        simulate_low_bandwidth=options.get('simulate_low_bandwidth', False)
+    )
+    if image is None:
+        raise ValueError("Preprocessing failed to produce an image array.")
+    unpadded = image
+    if padded:
+        top, left = (image.shape[0] - height) // 2, (image.shape[1] - width) // 2
+        unpadded = image[top:top + height, left:left + width]
+    encrypted, _ = encrypt_image(image, **params)
+    metadata = build_encryption_metadata(
+        original_shape_unpadded=unpadded.shape,
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=options.get('grayscale', False),
+        padded=padded,
+        pre_steg_shape=encrypted.shape,
+        pre_steg_dtype=encrypted.dtype,
+        **params
+    )
+    if options.get('plaintext_digest', ROUNDTRIP_DIGEST):
+        attach_plaintext_digest(metadata, unpadded, image.shape)
+    steg_image, steg_success = steghide_embed_metadata(encrypted, metadata, in_place=True)
+    if not steg_success:
+        log.warning("Metadata could not be embedded; the receiver will fall back to its own key parameters.")
+    return steg_image, metadata
+
+
+def _compress_chunk(view, level):
+
+    payload = zlib.compress(view, level)
+    return payload, hashlib.sha256(payload).hexdigest()
+
+
+async def send_image(host, port, image_input=None, params=None, options=None, chunk_bytes=CHUNK_BYTES,
+                     corrupt_chunks=(), bandwidth_mbps=None):
+
+    key_params = {'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+                  'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND}
+    key_params.update(params or {})
+    loop = asyncio.get_running_loop()
+    start_time = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=COMPRESS_AHEAD)
+    try:
+        cipher, metadata = await loop.run_in_executor(pool, prepare_cipher, image_input, key_params, options)
+        prepare_time = time.perf_counter() - start_time
+
+        channels = cipher.shape[2] if cipher.ndim == 3 else 1
+        chunk_bytes = max(channels, chunk_bytes - chunk_bytes % channels)
+        flat = memoryview(cipher.reshape(-1))
+        chunks = -(-len(flat) // chunk_bytes)
+        reader, writer = await asyncio.open_connection(host, port)
+        write_lock = asyncio.Lock()
+        compressed = [None] * chunks
+        stats = {'wire_bytes': 0, 'payload_bytes': 0, 'chunks': chunks, 'resent': 0, 'prepare_time': prepare_time}
+
+        async def send_chunk(index, corrupt=False):
+            payload, digest = compressed[index]
+            if corrupt:
+                payload = bytearray(payload)
+                payload[len(payload) // 2] ^= 0xFF
+                payload = bytes(payload)
+            header = {'type': 'chunk', 'index': index, 'offset': index * chunk_bytes,
+                      'raw_size': min(chunk_bytes, len(flat) - index * chunk_bytes), 'sha256': digest}
+            async with write_lock:
+                stats['wire_bytes'] += await write_frame(writer, header, payload)
+            stats['payload_bytes'] += len(payload)
+            if bandwidth_mbps:
+                await asyncio.sleep(len(payload) / (bandwidth_mbps * 1e6 / 8))
+
+        async def serve_requests():
+            while True:
+                header, _, size = await read_frame(reader)
+                if header is None:
+                    raise ConnectionError("Receiver closed the connection before confirming the transfer.")
+                stats['wire_bytes'] += size
+                if header['type'] == 'resend':
+                    log.info("Receiver requested chunks %s again.", header['indices'])
+                    for index in header['indices']:
+                        stats['resent'] += 1
+                        await send_chunk(index)
+                elif header['type'] == 'done':
+                    return header
+                elif header['type'] == 'error':
+                    raise ConnectionError(f"Receiver aborted: {header.get('message')}")
+
+        hello = {'type': 'hello', 'shape': list(cipher.shape), 'dtype': str(cipher.dtype),
+                 'chunk_bytes': chunk_bytes, 'chunks': chunks, 'total_bytes': len(flat)}
+        async with write_lock:
+            stats['wire_bytes'] += await write_frame(writer, hello)
+        requests = asyncio.create_task(serve_requests())
+
+        pending = {}
+        for index in range(min(COMPRESS_AHEAD, chunks)):
+            pending[index] = loop.run_in_executor(pool, _compress_chunk, flat[index * chunk_bytes:(index + 1) * chunk_bytes], CHUNK_COMPRESSION_LEVEL)
+        for index in range(chunks):
+            compressed[index] = await pending.pop(index)
+            ahead = index + COMPRESS_AHEAD
+            if ahead < chunks:
+                pending[ahead] = loop.run_in_executor(pool, _compress_chunk, flat[ahead * chunk_bytes:(ahead + 1) * chunk_bytes], CHUNK_COMPRESSION_LEVEL)
+            await send_chunk(index, corrupt=index in corrupt_chunks)
+            if requests.done():
+                break
+        stats['send_time'] = time.perf_counter() - start_time
+        async with write_lock:
+            stats['wire_bytes'] += await write_frame(writer, {'type': 'end'})
+        reply = await requests
+        writer.close()
+        await writer.wait_closed()
+    finally:
+        pool.shutdown(wait=False)
+    stats['total_time'] = time.perf_counter() - start_time
+    stats['receiver'] = reply.get('stats')
+    log.info("Sent %d chunks (%d payload bytes, %d resent) in %.4f seconds.",
+             chunks, stats['payload_bytes'], stats['resent'], stats['total_time'])
+    return metadata, stats
+
+
+def _inflate_chunk(payload, header):
+
+    if hashlib.sha256(payload).hexdigest() != header['sha256']:
+        return None
+    try:
+        data = zlib.decompress(payload)
+    except zlib.error:
+        return None
+    return data if len(data) == header['raw_size'] else None
+
+
+def _keys_from_chunk(data, params, shape):
+
+    extracted = steghide_extract_metadata(np.frombuffer(data, dtype=np.uint8))
+    embedded = (extracted or {}).get('encryption_params', {})
+    key_params = {name: embedded.get(name, params[name]) for name in KEY_PARAMS}
+    _, gather = acm_permutation(shape[0], key_params['acm_iterations'], key_params['acm_a'], key_params['acm_b'])
+    return extracted, key_params, gather
+
+
+def _decrypt_chunk(data, offset, feed, gather, out_pixels, channels):
+
+    encrypted = np.frombuffer(data, dtype=np.uint8)
+    plain = inv_s_box_np[np.bitwise_xor(encrypted, feed.slice(offset, offset + encrypted.size))]
+    out_pixels[gather[offset // channels:(offset + encrypted.size) // channels]] = plain.reshape(-1, channels)
+
+
+async def receive_image(reader, writer, params=None, workers=RECEIVER_WORKERS, max_resends=MAX_RESENDS):
+
+    key_params = {'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+                  'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND}
+    key_params.update(params or {})
+    loop = asyncio.get_running_loop()
+    hello, _, wire_bytes = await read_frame(reader)
+    if hello is None or hello.get('type') != 'hello':
+        raise ConnectionError("Expected a hello frame from the sender.")
+    start_time = time.perf_counter()
+    shape = tuple(hello['shape'])
+    channels = shape[2] if len(shape) == 3 else 1
+    if hello['dtype'] != 'uint8' or shape[0] != shape[1] or hello['chunk_bytes'] % channels:
+        raise ValueError(f"Unsupported transfer layout: shape {shape}, dtype {hello['dtype']}, chunk {hello['chunk_bytes']} bytes.")
+    chunks = hello['chunks']
+    out = np.empty(shape, dtype=np.uint8)
+    out_pixels = out.reshape(shape[0] * shape[1], channels)
+
+    keys = loop.create_future()
+    complete = asyncio.Event()
+    write_lock = asyncio.Lock()
+    finished = set()
+    attempts = Counter()
+    tasks = set()
+    stats = {'chunks': chunks, 'resent': 0, 'first_chunk': None, 'first_pixel': None, 'last_chunk': None}
+    failure = []
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    async def request_resend(index):
+        attempts[index] += 1
+        if attempts[index] > max_resends:
+            raise ValueError(f"Chunk {index} failed verification {attempts[index]} times.")
+        stats['resent'] += 1
+        log.warning("Chunk %d failed digest/size verification; requesting it again.", index)
+        async with write_lock:
+            await write_frame(writer, {'type': 'resend', 'indices': [index]})
+
+    async def handle_chunk(header, payload):
+        index = header['index']
+        data = await loop.run_in_executor(pool, _inflate_chunk, payload, header)
+        if data is None:
+            await request_resend(index)
+            return
+        if index == 0 and not keys.done():
+            metadata, found_params, gather = await loop.run_in_executor(pool, _keys_from_chunk, data, key_params, shape)
+            feed = keystream_feed(found_params['logistic_x0'], found_params['logistic_r'], hello['total_bytes'],
+                                  found_params['keystream_backend'])
+            keys.set_result((metadata, found_params, gather, feed))
+        _, _, gather, feed = await keys
+        if index in finished:
+            return
+        await loop.run_in_executor(pool, _decrypt_chunk, data, header['offset'], feed, gather, out_pixels, channels)
+        finished.add(index)
+        if stats['first_pixel'] is None:
+            stats['first_pixel'] = time.perf_counter() - start_time
+        if len(finished) == chunks:
+            complete.set()
+
+    def track(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            failure.append(task.exception())
+            complete.set()
+
+    async def read_chunks():
+        nonlocal wire_bytes
+        while True:
+            header, payload, size = await read_frame(reader)
+            if header is None:
+                return
+            wire_bytes += size
+            if header['type'] != 'chunk':
+                continue
+            now = time.perf_counter() - start_time
+            if stats['first_chunk'] is None:
+                stats['first_chunk'] = now
+            stats['last_chunk'] = now
+            task = asyncio.create_task(handle_chunk(header, payload))
+            tasks.add(task)
+            task.add_done_callback(track)
+
+    reading = asyncio.create_task(read_chunks())
+    try:
+        waiter = asyncio.create_task(complete.wait())
+        await asyncio.wait({reading, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if not complete.is_set():
+            waiter.cancel()
+            raise ConnectionError(f"Sender disconnected after {len(finished)}/{chunks} chunks.")
+        if failure:
+            raise failure[0]
+        stats['complete'] = time.perf_counter() - start_time
+        stats['wire_bytes'] = wire_bytes
+        stats['wire_throughput_mbps'] = wire_bytes * 8 / 1e6 / stats['last_chunk'] if stats['last_chunk'] else 0.0
+        async with write_lock:
+            await write_frame(writer, {'type': 'done', 'stats': stats})
+    except Exception as e:
+        async with write_lock:
+            await write_frame(writer, {'type': 'error', 'message': str(e)})
+        raise
+    finally:
+        reading.cancel()
+        for task in list(tasks):
+            task.cancel()
+        pool.shutdown(wait=False)
+
+    metadata, found_params, _, _ = keys.result()
+    encryption_params = (metadata or {}).get('encryption_params', {})
+    image = out
+    if encryption_params.get('padded'):
+        orig_h, orig_w = encryption_params['original_shape_unpadded'][:2]
+        top, left = (shape[0] - orig_h) // 2, (shape[1] - orig_w) // 2
+        image = out[top:top + orig_h, left:left + orig_w]
+    roundtrip_ok, _ = verify_roundtrip(image, metadata)
+    log.info("Received %d chunks (%d resent): first pixel after %.4fs, complete after %.4fs, wire throughput %.1f Mbit/s.",
+             chunks, stats['resent'], stats['first_pixel'], stats['complete'], stats['wire_throughput_mbps'])
+    return {'image': image, 'metadata': metadata, 'key_params': found_params, 'roundtrip_ok': roundtrip_ok, 'stats': stats}
+
+
+async def start_receiver_server(host='127.0.0.1', port=DEFAULT_PORT, params=None, on_result=None):
+
+    async def handle(reader, writer):
+        try:
+            result = await receive_image(reader, writer, params=params)
+        except Exception as e:
+            log.error("Transfer from %s failed: %s", writer.get_extra_info('peername'), e)
+            result = None
+        finally:
+            writer.close()
+        if on_result is not None and result is not None:
+            on_result(result)
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def loopback_transfer(image_input=None, params=None, options=None, chunk_bytes=CHUNK_BYTES,
+                            corrupt_chunks=(), bandwidth_mbps=None):
+
+    loop = asyncio.get_running_loop()
+    received = loop.create_future()
+    server = await start_receiver_server('127.0.0.1', 0, params=params,
+                                         on_result=lambda result: received.done() or received.set_result(result))
+    port = server.sockets[0].getsockname()[1]
+    try:
+        start_time = time.perf_counter()
+        _, sender_stats = await send_image('127.0.0.1', port, image_input, params, options, chunk_bytes,
+                                           corrupt_chunks, bandwidth_mbps)
+        result = await asyncio.wait_for(received, timeout=60)
+        result['end_to_end'] = time.perf_counter() - start_time
+    finally:
+        server.close()
+        await server.wait_closed()
+    return result, sender_stats
+
+
+def print_transfer_summary(result, sender_stats, chunk_bytes):
+
+    offset = sender_stats['prepare_time']
+    stats = result['stats']
+    print("\n--- Chunked Transfer Summary ---")
+    print(f"Chunks: {stats['chunks']} x {chunk_bytes} bytes, resent: {stats['resent']}")
+    print(f"Sender prepare (preprocess + encrypt + steg): {offset:.4f}s")
+    print(f"Wire bytes: {stats['wire_bytes']}, throughput: {stats['wire_throughput_mbps']:.1f} Mbit/s")
+    print(f"Time to first pixel (after prepare):  {stats['first_pixel']:.4f}s")
+    print(f"Last chunk arrived (whole-file floor): {stats['last_chunk']:.4f}s")
+    print(f"End-to-end latency (after prepare):    {stats['complete']:.4f}s")
+    print(f"End-to-end latency (total):            {result['end_to_end']:.4f}s")
+    print(f"Round-trip digest: {'match' if result['roundtrip_ok'] else 'mismatch' if result['roundtrip_ok'] is False else 'n/a'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipelined chunk transfer of encrypted images over TCP.")
+    add_logging_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    demo_parser = subparsers.add_parser('demo', help="Send an image to an in-process loopback receiver.")
+    serve_parser = subparsers.add_parser('serve', help="Run a receiver that writes decrypted images to disk.")
+    send_parser = subparsers.add_parser('send', help="Send an image to a running receiver.")
+    for sub in (demo_parser, send_parser):
+        sub.add_argument('--input', default=None, help="Image path or URL. Defaults to the built-in fallback image.")
+        sub.add_argument('--grayscale', action='store_true')
+        sub.add_argument('--chunk-kib', type=int, default=CHUNK_BYTES // 1024)
+        sub.add_argument('--corrupt', type=int, nargs='*', default=[], help="Corrupt the first transmission of these chunks.")
+        sub.add_argument('--bandwidth-mbps', type=float, default=None, help="Throttle the sender to this link rate.")
+        sub.add_argument('--keystream-backend', choices=KEYSTREAM_BACKENDS, default=KEYSTREAM_BACKEND)
+    for sub in (serve_parser, send_parser):
+        sub.add_argument('--host', default='127.0.0.1')
+        sub.add_argument('--port', type=int, default=DEFAULT_PORT)
+    demo_parser.add_argument('--output', default=None, help="Write the decrypted image here.")
+    serve_parser.add_argument('--output-dir', default='received')
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    if args.command == 'serve':
+        os.makedirs(args.output_dir, exist_ok=True)
+
+        def save_result(result):
+            path = os.path.join(args.output_dir, f"received_{time.strftime('%Y%m%d-%H%M%S')}_{id(result) & 0xffff:04x}.png")
+            Image.fromarray(result['image']).save(path)
+            print(f"Saved decrypted image to {path}")
+
+        async def serve_forever():
+            server = await start_receiver_server(args.host, args.port, on_result=save_result)
+            print(f"Receiver listening on {args.host}:{args.port}")
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(serve_forever())
+    else:
+        options = {'grayscale': args.grayscale}
+        params = {'keystream_backend': args.keystream_backend}
+        if args.command == 'demo':
+            result, sender_stats = asyncio.run(loopback_transfer(args.input, params=params, options=options, chunk_bytes=args.chunk_kib * 1024,
+                                                                 corrupt_chunks=set(args.corrupt), bandwidth_mbps=args.bandwidth_mbps))
+            print_transfer_summary(result, sender_stats, args.chunk_kib * 1024)
+            if args.output:
+                Image.fromarray(result['image']).save(args.output)
+                print(f"Decrypted image written to {args.output}")
+        else:
+            asyncio.run(send_image(args.host, args.port, args.input, params=params, options=options, chunk_bytes=args.chunk_kib * 1024,
+                                   corrupt_chunks=set(args.corrupt), bandwidth_mbps=args.bandwidth_mbps))
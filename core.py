@@ -0,0 +1,1297 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from PIL import Image
+from io import BytesIO
+import time
+import functools
+import importlib
+import contextlib
+import threading
+import hashlib
+import logging
+import warnings
+import os 
+import base64 
+import zlib 
+import json 
+from tracing import trace_span, traced
+from security_metrics import image_entropy, mse_psnr, fast_ssim, histogram_stats
+from report import channel_histograms
+from file_delivery import file_link_html
+from logs import get_logger
+
+
+env_log = get_logger('env')
+preprocess_log = get_logger('preprocess')
+keystream_log = get_logger('keystream')
+cipher_log = get_logger('cipher')
+compress_log = get_logger('compress')
+steg_log = get_logger('steg')
+verify_log = get_logger('verify')
+metrics_log = get_logger('metrics')
+delivery_log = get_logger('delivery')
+
+try:
+    importlib.import_module('google.colab')
+    ENV = 'colab'
+except ImportError:
+    env_log.debug("Not running in Google Colab. File upload/download will require manual steps or alternative libraries (like ipywidgets).")
+    
+    try:
+        importlib.import_module('IPython.display')
+        importlib.import_module('ipywidgets')
+        ENV = 'jupyter'
+    except ImportError:
+        env_log.debug("IPython/ipywidgets not available. Download links may not be generated automatically.")
+        ENV = 'other'
+
+
+
+warnings.filterwarnings("ignore", category=UserWarning, module='skimage')
+warnings.filterwarnings("ignore", category=UserWarning, module='PIL')
+warnings.filterwarnings("ignore", category=FutureWarning, module='skimage')
+
+
+
+
+@traced("preprocess", bytes_arg=0)
+def preprocess_image(img_input, target_size=None, grayscale=False, simulate_low_bandwidth=False, low_bw_size=(128, 128)):
+    
+    try:
+        if isinstance(img_input, (BytesIO, bytes)):
+            
+            if isinstance(img_input, bytes):
+                img_input = BytesIO(img_input)
+            img_input.seek(0) 
+            img = Image.open(img_input)
+            preprocess_log.debug("Loaded image from uploaded data.")
+        elif isinstance(img_input, str): 
+            
+            if img_input.startswith('http://') or img_input.startswith('https://'):
+                 
+                 
+                 
+                 
+                 
+                 
+                 raise NotImplementedError("URL loading currently disabled. Upload file or use local path.")
+            else:
+                 img = Image.open(img_input)
+                 preprocess_log.debug("Loaded image from Path: %s", img_input)
+        elif isinstance(img_input, Image.Image):
+            img = img_input
+            preprocess_log.debug("Processing provided PIL image object.")
+        elif img_input is None: 
+             raise ValueError("No valid image input provided.")
+        else:
+             raise ValueError(f"Unsupported input type for preprocess_image: {type(img_input)}")
+
+    except FileNotFoundError:
+        preprocess_log.error("Error: File not found at path '%s'.", img_input)
+        preprocess_log.warning("Using a fallback procedural image.")
+        img_array = np.zeros((256, 256, 3), dtype=np.uint8)
+        img_array[:, :, 0] = np.linspace(0, 255, 256) 
+        img_array[:, :, 1] = np.linspace(0, 255, 256).T 
+        img_array[:, :, 2] = 128 
+        img = Image.fromarray(img_array)
+    except Exception as e:
+        preprocess_log.error("Error loading image: %s", e)
+        
+        preprocess_log.warning("Using a fallback procedural image.")
+        img_array = np.zeros((256, 256, 3), dtype=np.uint8)
+        img_array[:, :, 0] = np.linspace(0, 255, 256) 
+        img_array[:, :, 1] = np.linspace(0, 255, 256).T 
+        img_array[:, :, 2] = 128 
+        img = Image.fromarray(img_array)
+
+
+    original_mode = img.mode
+    original_size_before_processing = img.size
+    preprocess_log.debug("Original image mode: %s, size: %s", original_mode, original_size_before_processing)
+
+    if grayscale and img.mode != 'L':
+        img = img.convert('L')
+        preprocess_log.debug("Converted to grayscale. New mode: %s", img.mode)
+    elif not grayscale and img.mode not in ['RGB', 'RGBA']:
+         preprocess_log.debug("Converting mode %s to RGB for consistency.", img.mode)
+         img = img.convert('RGB')
+
+    if img.mode == 'RGBA':
+        preprocess_log.debug("Converting RGBA to RGB by blending onto a white background.")
+        
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        
+        try:
+            
+            bg.paste(img, mask=img.split()[3])
+        except IndexError:
+             preprocess_log.warning("Warning: Could not get alpha channel for RGBA conversion. Using image directly.")
+             bg.paste(img) 
+        img = bg 
+
+    
+    if simulate_low_bandwidth:
+        preprocess_log.debug("Simulating low bandwidth. Resizing image to %s...", low_bw_size)
+        img = img.resize(low_bw_size, Image.Resampling.LANCZOS)
+        preprocess_log.debug("Resized image size: %s", img.size)
+    elif target_size:
+        
+        if isinstance(target_size, (list, tuple)) and len(target_size) == 2:
+            preprocess_log.debug("Resizing image to %s...", target_size)
+            img = img.resize(target_size, Image.Resampling.LANCZOS)
+            preprocess_log.debug("Resized image size: %s", img.size)
+        else:
+            preprocess_log.warning("Warning: Invalid target_size %s. Skipping resize.", target_size)
+
+
+    img_array = np.array(img, dtype=np.uint8)
+
+    
+    h, w = img_array.shape[:2]
+    padded = False
+    if h != w:
+        padded = True
+        preprocess_log.debug("Image is not square (%sx%s). Padding to make it square.", h, w)
+        max_dim = max(h, w)
+        pad_h = max_dim - h
+        pad_w = max_dim - w
+        
+        
+        if img_array.ndim == 3: 
+            
+            pad_width = ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0))
+        else: 
+            
+            pad_width = ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2))
+        
+        img_array = np.pad(img_array, pad_width, mode='constant', constant_values=0)
+        preprocess_log.debug("Padded image size: %s", img_array.shape[:2])
+
+    
+    return img_array, original_size_before_processing, padded
+
+
+
+
+
+
+def build_acm_permutation(size, iterations, a=1, b=1):
+    
+    index_dtype = np.int32 if size * size < 2**31 else np.int64
+    coord_dtype = np.int32 if (1 + abs(a)) * (1 + abs(b)) * size < 2**31 else np.int64
+    x = np.repeat(np.arange(size, dtype=coord_dtype), size)
+    y = np.tile(np.arange(size, dtype=coord_dtype), size)
+    scratch = np.empty_like(x)
+
+    
+    for i in range(iterations):
+        np.multiply(y, b, out=scratch)
+        scratch += x
+        scratch %= size
+        y *= a * b + 1
+        x *= a
+        y += x
+        y %= size
+        x, scratch = scratch, x
+    del scratch
+
+    
+    forward = x.astype(index_dtype, copy=False)
+    forward *= size
+    forward += y
+    del x, y
+    gather = np.empty_like(forward)
+    gather[forward] = np.arange(size * size, dtype=index_dtype)
+    forward.flags.writeable = False
+    gather.flags.writeable = False
+    return forward, gather
+
+def acm_permutation(size, iterations, a=1, b=1):
+    
+    caches = active_kernel_caches()
+    if caches is not None:
+        return caches.permutation(size, iterations, a, b)
+    return build_acm_permutation(size, iterations, a, b)
+
+def check_out_buffer(out, shape, dtype=np.uint8, source=None):
+    
+    if out.shape != tuple(shape) or out.dtype != np.dtype(dtype):
+        raise ValueError(f"Output buffer must have shape {tuple(shape)} and dtype {np.dtype(dtype)}, got {out.shape} {out.dtype}.")
+    if not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("Output buffer must be C-contiguous and writeable.")
+    if source is not None and np.may_share_memory(out, source):
+        raise ValueError("Output buffer must not overlap the input for a permutation.")
+    return out
+
+def byte_view(array):
+    
+    return memoryview(np.ascontiguousarray(array).reshape(-1).view(np.uint8))
+
+def take_into(source, indices, out, chunk=1 << 18):
+    
+    flat_indices = indices.reshape(-1)
+    flat_out = out.reshape((flat_indices.size,) + source.shape[1:])
+    for start in range(0, flat_indices.size, chunk):
+        np.take(source, flat_indices[start:start + chunk], axis=0, out=flat_out[start:start + chunk], mode='clip')
+    return out
+
+@traced("ACM gather", bytes_arg=0)
+def arnold_cat_map(img_array, iterations, a=1, b=1, out=None):
+    
+    if img_array.ndim not in [2, 3]:
+        raise ValueError("Input must be a 2D (grayscale) or 3D (color) image array.")
+    if img_array.shape[0] != img_array.shape[1]:
+        raise ValueError("Arnold's Cat Map requires a square image. Please pad first.")
+
+    rows, cols = img_array.shape[:2]
+
+    
+    _, gather = acm_permutation(rows, iterations, a, b)
+    if out is None:
+        shuffled_img = img_array.reshape(rows * cols, -1)[gather]
+    else:
+        check_out_buffer(out, img_array.shape, img_array.dtype, source=img_array)
+        shuffled_img = take_into(img_array.reshape(rows * cols, -1), gather, out)
+
+    
+    return shuffled_img.reshape(img_array.shape)
+
+@traced("inverse ACM gather", bytes_arg=0)
+def inverse_arnold_cat_map(shuffled_img_array, iterations, a=1, b=1, out=None):
+    
+    if shuffled_img_array.ndim not in [2, 3]:
+        raise ValueError("Input must be a 2D (grayscale) or 3D (color) image array.")
+    if shuffled_img_array.shape[0] != shuffled_img_array.shape[1]:
+        raise ValueError("Inverse Arnold's Cat Map requires a square image.")
+
+    rows, cols = shuffled_img_array.shape[:2]
+
+    
+    forward, _ = acm_permutation(rows, iterations, a, b)
+    if out is None:
+        unshuffled_img = shuffled_img_array.reshape(rows * cols, -1)[forward]
+    else:
+        check_out_buffer(out, shuffled_img_array.shape, shuffled_img_array.dtype, source=shuffled_img_array)
+        unshuffled_img = take_into(shuffled_img_array.reshape(rows * cols, -1), forward, out)
+
+    return unshuffled_img.reshape(shuffled_img_array.shape)
+
+
+LOGISTIC_BLOCK_SIZE = 1 << 16
+
+def generate_logistic_map_sequence(x0, r, size, offset=0):
+    
+    
+    x0 = float(x0)
+    r = float(r)
+    sequence = np.zeros(size, dtype=np.float64) 
+    x = x0
+    
+    
+    for _ in range(100 + int(offset)): 
+        x = r * x * (1.0 - x)
+    
+    
+    for i in range(size):
+        x = r * x * (1.0 - x)
+        sequence[i] = x
+        
+        if x == 0.0 or x == 1.0:
+            
+            
+            
+            
+            
+            pass
+
+    return sequence
+
+def generate_logistic_keystream(x0, r, size, offset=0):
+    
+    try:
+        
+        keystream = np.empty(size, dtype=np.uint8)
+        block_size = max(1, min(size, LOGISTIC_BLOCK_SIZE))
+        blocks = iter_logistic_keystream(x0, r, block_size, offset=offset)
+        for start in range(0, size, block_size):
+            block = next(blocks)
+            keystream[start:start + block_size] = block[:size - start]
+        return keystream
+    except OverflowError:
+        keystream_log.error("FATAL: OverflowError during logistic map generation with r=%s, x0=%s. This usually indicates unstable parameters. Stopping.", r, x0)
+        
+        raise ValueError(f"Logistic map overflowed with r={r}, x0={x0}.")
+
+def iter_logistic_keystream(x0, r, block_size, offset=0):
+    
+    x0 = float(x0)
+    r = float(r)
+    x = x0
+    for _ in range(100 + int(offset)):
+        x = r * x * (1.0 - x)
+    block = np.empty(block_size, dtype=np.float64)
+    while True:
+        for i in range(block_size):
+            x = r * x * (1.0 - x)
+            block[i] = x
+        np.multiply(block, 255.999999, out=block)
+        yield block.astype(np.uint8)
+
+KEYSTREAM_BACKENDS = ('logistic', 'shake256', 'blake2b')
+HASH_KEYSTREAM_BLOCK_BYTES = {'shake256': 1 << 16, 'blake2b': 64}
+
+def keystream_seed(x0, r, backend):
+    
+    return f"ice-keystream/{backend}/{float(x0).hex()}/{float(r).hex()}".encode('ascii')
+
+def hash_keystream_blocks(x0, r, first_block, count, backend='shake256'):
+    
+    seed = keystream_seed(x0, r, backend)
+    if backend == 'shake256':
+        block_size = HASH_KEYSTREAM_BLOCK_BYTES[backend]
+        return b''.join(hashlib.shake_256(seed + index.to_bytes(8, 'big')).digest(block_size)
+                        for index in range(first_block, first_block + count))
+    if backend == 'blake2b':
+        keyed = hashlib.blake2b(key=hashlib.blake2b(seed, digest_size=32).digest(), digest_size=64)
+        blocks = []
+        for index in range(first_block, first_block + count):
+            h = keyed.copy()
+            h.update(index.to_bytes(8, 'big'))
+            blocks.append(h.digest())
+        return b''.join(blocks)
+    raise ValueError(f"Unknown hash keystream backend '{backend}'. Expected one of {tuple(HASH_KEYSTREAM_BLOCK_BYTES)}.")
+
+def generate_hash_keystream(x0, r, size, offset=0, backend='shake256'):
+    
+    if backend not in HASH_KEYSTREAM_BLOCK_BYTES:
+        raise ValueError(f"Unknown hash keystream backend '{backend}'. Expected one of {tuple(HASH_KEYSTREAM_BLOCK_BYTES)}.")
+    block_size = HASH_KEYSTREAM_BLOCK_BYTES[backend]
+    offset = int(offset)
+    first_block = offset // block_size
+    last_block = (offset + size + block_size - 1) // block_size
+    data = hash_keystream_blocks(x0, r, first_block, max(0, last_block - first_block), backend)
+    skip = offset - first_block * block_size
+    return np.frombuffer(data, dtype=np.uint8)[skip:skip + size]
+
+def generate_keystream(x0, r, size, offset=0, backend='logistic'):
+    
+    if backend == 'logistic':
+        return generate_logistic_keystream(x0, r, size, offset=offset)
+    return generate_hash_keystream(x0, r, size, offset=offset, backend=backend)
+
+def frozen_keystream(x0, r, size, offset=0, backend='logistic'):
+    
+    keystream = generate_keystream(x0, r, size, offset=offset, backend=backend)
+    keystream.flags.writeable = False
+    return keystream
+
+class KernelCaches:
+    
+    def __init__(self, permutations=4, keystreams=2):
+        self.permutation = functools.lru_cache(maxsize=permutations)(build_acm_permutation)
+        self.keystream = functools.lru_cache(maxsize=keystreams)(frozen_keystream)
+
+    def clear(self):
+        
+        self.permutation.cache_clear()
+        self.keystream.cache_clear()
+
+_process_kernel_caches = None
+_thread_kernel_caches = threading.local()
+_NO_OVERRIDE = object()
+
+def active_kernel_caches():
+    
+    caches = getattr(_thread_kernel_caches, 'caches', _NO_OVERRIDE)
+    return _process_kernel_caches if caches is _NO_OVERRIDE else caches
+
+def enable_kernel_caches(enabled=True):
+    
+    global _process_kernel_caches
+    if not enabled:
+        _process_kernel_caches = None
+    elif _process_kernel_caches is None:
+        _process_kernel_caches = KernelCaches()
+
+def clear_kernel_caches():
+    
+    caches = active_kernel_caches()
+    if caches is not None:
+        caches.clear()
+
+@contextlib.contextmanager
+def isolated_kernel_caches(enabled=True):
+    
+    previous = getattr(_thread_kernel_caches, 'caches', _NO_OVERRIDE)
+    _thread_kernel_caches.caches = KernelCaches() if enabled else None
+    try:
+        yield _thread_kernel_caches.caches
+    finally:
+        if previous is _NO_OVERRIDE:
+            del _thread_kernel_caches.caches
+        else:
+            _thread_kernel_caches.caches = previous
+
+def cached_keystream(x0, r, size, offset=0, backend='logistic'):
+    
+    caches = active_kernel_caches()
+    if caches is None:
+        return generate_keystream(x0, r, size, offset=offset, backend=backend)
+    return caches.keystream(float(x0), float(r), size, offset=int(offset), backend=backend)
+
+def logistic_map_encrypt_decrypt(img_array, x0, r, keystream_offset=0, out=None, keystream_backend='logistic'):
+    
+    if img_array.ndim not in [2, 3]:
+        raise ValueError("Input must be a 2D (grayscale) or 3D (color) image array.")
+    img_dtype = img_array.dtype
+    if img_dtype != np.uint8:
+        keystream_log.warning("Warning: Input image array dtype is %s. Converting to uint8 for XOR.", img_dtype)
+        img_array = img_array.astype(np.uint8)
+
+    total_pixels = img_array.size 
+
+    
+    if keystream_backend not in KEYSTREAM_BACKENDS:
+        raise ValueError(f"Unknown keystream backend '{keystream_backend}'. Expected one of {KEYSTREAM_BACKENDS}.")
+    if keystream_backend == 'logistic' and not (3.57 <= r <= 4.0):
+        keystream_log.warning("Warning: Logistic map parameter r=%s might not be in the typical chaotic range [3.57, 4.0]. Results may be insecure.", r)
+    if keystream_backend == 'logistic' and not (0 < x0 < 1):
+         keystream_log.warning("Warning: Logistic map initial value x0=%s should be between 0 and 1. Clipping to avoid issues.", x0)
+         
+         x0 = np.clip(x0, 1e-6, 1.0 - 1e-6)
+
+    with trace_span("keystream gen", bytes_processed=total_pixels):
+        keystream_uint8 = cached_keystream(x0, r, total_pixels, offset=keystream_offset, backend=keystream_backend)
+
+    
+    
+    keystream_reshaped = keystream_uint8 
+    img_flat = img_array.reshape(-1)
+
+    if len(img_flat) != len(keystream_reshaped):
+         raise ValueError(f"Image flat size ({len(img_flat)}) and keystream size ({len(keystream_reshaped)}) mismatch.")
+
+    
+    with trace_span("XOR", bytes_processed=total_pixels):
+        if out is None:
+            processed_flat = np.bitwise_xor(img_flat, keystream_reshaped)
+        else:
+            check_out_buffer(out, img_array.shape)
+            processed_flat = np.bitwise_xor(img_flat, keystream_reshaped, out=out.reshape(-1))
+
+    
+    return processed_flat.reshape(img_array.shape)
+
+
+
+
+s_box_list = [
+    0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
+    0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
+    0xb7, 0xfd, 0x93, 0x26, 0x36, 0x3f, 0xf7, 0xcc, 0x34, 0xa5, 0xe5, 0xf1, 0x71, 0xd8, 0x31, 0x15,
+    0x04, 0xc7, 0x23, 0xc3, 0x18, 0x96, 0x05, 0x9a, 0x07, 0x12, 0x80, 0xe2, 0xeb, 0x27, 0xb2, 0x75,
+    0x09, 0x83, 0x2c, 0x1a, 0x1b, 0x6e, 0x5a, 0xa0, 0x52, 0x3b, 0xd6, 0xb3, 0x29, 0xe3, 0x2f, 0x84,
+    0x53, 0xd1, 0x00, 0xed, 0x20, 0xfc, 0xb1, 0x5b, 0x6a, 0xcb, 0xbe, 0x39, 0x4a, 0x4c, 0x58, 0xcf,
+    0xd0, 0xef, 0xaa, 0xfb, 0x43, 0x4d, 0x33, 0x85, 0x45, 0xf9, 0x02, 0x7f, 0x50, 0x3c, 0x9f, 0xa8,
+    0x51, 0xa3, 0x40, 0x8f, 0x92, 0x9d, 0x38, 0xf5, 0xbc, 0xb6, 0xda, 0x21, 0x10, 0xff, 0xf3, 0xd2,
+    0xcd, 0x0c, 0x13, 0xec, 0x5f, 0x97, 0x44, 0x17, 0xc4, 0xa7, 0x7e, 0x3d, 0x64, 0x5d, 0x19, 0x73,
+    0x60, 0x81, 0x4f, 0xdc, 0x22, 0x2a, 0x90, 0x88, 0x46, 0xee, 0xb8, 0x14, 0xde, 0x5e, 0x0b, 0xdb,
+    0xe0, 0x32, 0x3a, 0x0a, 0x49, 0x06, 0x24, 0x5c, 0xc2, 0xd3, 0xac, 0x62, 0x91, 0x95, 0xe4, 0x79,
+    0xe7, 0xc8, 0x37, 0x6d, 0x8d, 0xd5, 0x4e, 0xa9, 0x6c, 0x56, 0xf4, 0xea, 0x65, 0x7a, 0xae, 0x08,
+    0xba, 0x78, 0x25, 0x2e, 0x1c, 0xa6, 0xb4, 0xc6, 0xe8, 0xdd, 0x74, 0x1f, 0x4b, 0xbd, 0x8b, 0x8a,
+    0x70, 0x3e, 0xb5, 0x66, 0x48, 0x03, 0xf6, 0x0e, 0x61, 0x35, 0x57, 0xb9, 0x86, 0xc1, 0x1d, 0x9e,
+    0xe1, 0xf8, 0x98, 0x11, 0x69, 0xd9, 0x8e, 0x94, 0x9b, 0x1e, 0x87, 0xe9, 0xce, 0x55, 0x28, 0xdf,
+    0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16
+]
+
+s_box_np = np.array(s_box_list, dtype=np.uint8)
+
+
+inv_s_box_list = [
+    0x52, 0x09, 0x6a, 0xd5, 0x30, 0x36, 0xa5, 0x38, 0xbf, 0x40, 0xa3, 0x9e, 0x81, 0xf3, 0xd7, 0xfb,
+    0x7c, 0xe3, 0x39, 0x82, 0x9b, 0x2f, 0xff, 0x87, 0x34, 0x8e, 0x43, 0x44, 0xc4, 0xde, 0xe9, 0xcb,
+    0x54, 0x7b, 0x94, 0x32, 0xa6, 0xc2, 0x23, 0x3d, 0xee, 0x4c, 0x95, 0x0b, 0x42, 0xfa, 0xc3, 0x4e,
+    0x08, 0x2e, 0xa1, 0x66, 0x28, 0xd9, 0x24, 0xb2, 0x76, 0x5b, 0xa2, 0x49, 0x6d, 0x8b, 0xd1, 0x25,
+    0x72, 0xf8, 0xf6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xd4, 0xa4, 0x5c, 0xcc, 0x5d, 0x65, 0xb6, 0x92,
+    0x6c, 0x70, 0x48, 0x50, 0xfd, 0xed, 0xb9, 0xda, 0x5e, 0x15, 0x46, 0x57, 0xa7, 0x8d, 0x9d, 0x84,
+    0x90, 0xd8, 0xab, 0x00, 0x8c, 0xbc, 0xd3, 0x0a, 0xf7, 0xe4, 0x58, 0x05, 0xb8, 0xb3, 0x45, 0x06,
+    0xd0, 0x2c, 0x1e, 0x8f, 0xca, 0x3f, 0x0f, 0x02, 0xc1, 0xaf, 0xbd, 0x03, 0x01, 0x13, 0x8a, 0x6b,
+    0x3a, 0x91, 0x11, 0x41, 0x4f, 0x67, 0xdc, 0xea, 0x97, 0xf2, 0xcf, 0xce, 0xf0, 0xb4, 0xe6, 0x73,
+    0x96, 0xac, 0x74, 0x22, 0xe7, 0xad, 0x35, 0x85, 0xe2, 0xf9, 0x37, 0xe8, 0x1c, 0x75, 0xdf, 0x6e,
+    0x47, 0xf1, 0x1a, 0x71, 0x1d, 0x29, 0xc5, 0x89, 0x6f, 0xb7, 0x62, 0x0e, 0xaa, 0x18, 0xbe, 0x1b,
+    0xfc, 0x56, 0x3e, 0x4b, 0xc6, 0xd2, 0x79, 0x20, 0x9a, 0xdb, 0xc0, 0xfe, 0x78, 0xcd, 0x5a, 0xf4,
+    0x1f, 0xdd, 0xa8, 0x33, 0x88, 0x07, 0xc7, 0x31, 0xb1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xec, 0x5f,
+    0x60, 0x51, 0x7f, 0xa9, 0x19, 0xb5, 0x4a, 0x0d, 0x2d, 0xe5, 0x7a, 0x9f, 0x93, 0xc9, 0x9c, 0xef,
+    0xa0, 0xe0, 0x3b, 0x4d, 0xae, 0x2a, 0xf5, 0xb0, 0xc8, 0xeb, 0xbb, 0x3c, 0x83, 0x53, 0x99, 0x61,
+    0x17, 0x2b, 0x04, 0x7e, 0xba, 0x77, 0xd6, 0x26, 0xe1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0c, 0x7d
+]
+
+inv_s_box_np = np.array(inv_s_box_list, dtype=np.uint8)
+
+@traced("S-box", bytes_arg=0)
+def apply_aes_sbox(img_array, out=None):
+    
+    if img_array.dtype != np.uint8:
+        cipher_log.warning("Warning: Converting image array to uint8 for S-box application.")
+        img_array = img_array.astype(np.uint8)
+    
+    if out is None:
+        return s_box_np[img_array]
+    return take_into(s_box_np, img_array, check_out_buffer(out, img_array.shape))
+
+@traced("inverse S-box", bytes_arg=0)
+def apply_inverse_aes_sbox(img_array, out=None):
+    
+    if img_array.dtype != np.uint8:
+        cipher_log.warning("Warning: Converting image array to uint8 for inverse S-box application.")
+        img_array = img_array.astype(np.uint8)
+    
+    if out is None:
+        return inv_s_box_np[img_array]
+    return take_into(inv_s_box_np, img_array, check_out_buffer(out, img_array.shape))
+
+
+
+
+@traced("encrypt", bytes_arg=0)
+def encrypt_image(img_array, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1, keystream_offset=0, out=None,
+                  keystream_backend='logistic'):
+     
+    cipher_log.debug("Starting Encryption Process...")
+    start_time = time.perf_counter()
+
+    
+    cipher_log.debug("Applying Arnold's Cat Map with %s iterations (a=%s, b=%s)...", acm_iterations, acm_a, acm_b)
+    try:
+        
+        if img_array.dtype != np.uint8:
+            cipher_log.debug("Converting image to uint8 before ACM.")
+            img_array = img_array.astype(np.uint8)
+        shuffled_img = arnold_cat_map(img_array, acm_iterations, acm_a, acm_b, out=out)
+    except ValueError as e:
+        cipher_log.error("Error during ACM: %s. Returning original image.", e)
+        return img_array, 0 
+
+    
+    cipher_log.debug("Applying AES S-box substitution...")
+    try:
+        sbox_applied_img = apply_aes_sbox(shuffled_img, out=shuffled_img)
+    except Exception as e: 
+        cipher_log.error("Error during AES S-box application: %s. Returning shuffled image.", e)
+        return shuffled_img, time.perf_counter() - start_time 
+
+    
+    cipher_log.debug("Applying %s keystream encryption (x0=%s, r=%s)...", keystream_backend, logistic_x0, logistic_r)
+    try:
+        
+        encrypted_img = logistic_map_encrypt_decrypt(sbox_applied_img, logistic_x0, logistic_r, keystream_offset=keystream_offset, out=sbox_applied_img,
+                                                     keystream_backend=keystream_backend) 
+    except ValueError as e:
+        cipher_log.error("Error during Logistic Map encryption: %s. Returning S-box applied image.", e)
+        return sbox_applied_img, time.perf_counter() - start_time 
+
+    end_time = time.perf_counter()
+    encryption_time = end_time - start_time
+    cipher_log.debug("Encryption completed in %.4f seconds.", encryption_time)
+    return encrypted_img, encryption_time
+
+
+
+
+@traced("compress", bytes_arg=0)
+def compress_data(data_array, level=7):
+    
+    compress_log.debug("Starting Compression...")
+    start_time = time.perf_counter()
+    
+    if not isinstance(data_array, np.ndarray):
+         compress_log.error("Error: Input data_array must be a NumPy array.")
+         return None, 0
+    original_view = byte_view(data_array)
+
+    
+    compression_level = level
+    compressor = zlib.compressobj(compression_level)
+    compressed_stream = BytesIO()
+    for start in range(0, original_view.nbytes, 1 << 20):
+        compressed_stream.write(compressor.compress(original_view[start:start + (1 << 20)]))
+    compressed_stream.write(compressor.flush())
+    compressed_bytes = compressed_stream.getvalue()
+    end_time = time.perf_counter()
+    compression_time = end_time - start_time
+
+    original_size = original_view.nbytes
+    compressed_size = len(compressed_bytes)
+    ratio = compressed_size / original_size if original_size > 0 else 0
+    compress_log.debug("Compression (zlib level %s) completed in %.4f seconds.", compression_level, compression_time)
+    compress_log.debug("Original size: %s bytes, Compressed size: %s bytes, Ratio: %.4f", original_size, compressed_size, ratio)
+    return compressed_bytes, compression_time
+
+@traced("hash", bytes_arg=0)
+def calculate_hash_bytes(byte_data):
+    
+    if not isinstance(byte_data, bytes):
+        raise TypeError("Input for hashing must be bytes.")
+    hasher = hashlib.sha256()
+    hasher.update(byte_data)
+    return hasher.hexdigest()
+
+
+def build_encryption_metadata(acm_iterations, acm_a, acm_b, logistic_x0, logistic_r,
+                              original_shape_unpadded, original_shape_padded, dtype,
+                              grayscale, padded, pre_steg_shape, pre_steg_dtype, **extra_params):
+    
+    encryption_params = {
+        "acm_iterations": acm_iterations,
+        "acm_a": acm_a,
+        "acm_b": acm_b,
+        "logistic_x0": logistic_x0, 
+        "logistic_r": logistic_r,   
+        "original_shape_unpadded": list(original_shape_unpadded) if original_shape_unpadded is not None else None,
+        "original_shape_padded": list(original_shape_padded) if original_shape_padded is not None else None,
+        "dtype": str(dtype) if dtype is not None else None,
+        "grayscale": grayscale,
+        "padded": padded,
+        "pre_steg_shape": list(pre_steg_shape), 
+        "pre_steg_dtype": str(pre_steg_dtype)   
+    }
+    encryption_params.update(extra_params)
+    return {
+        "encrypted_by": "Enhanced Image Security System",
+        "description": "Encrypted using ACM, AES S-box, Logistic Map, Compressed with zlib, Metadata via LSB Steg.",
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S %Z"), 
+        "encryption_params": encryption_params
+    }
+
+
+@traced("steg embed", bytes_arg=0)
+def steghide_embed_metadata(image_data, metadata_dict, in_place=False):
+    
+    steg_log.debug("--- Performing Steganography: Hiding Metadata ---")
+
+    
+    if not isinstance(image_data, np.ndarray):
+        steg_log.error("Error: Image data must be a NumPy array for steganography")
+        return image_data, False
+
+    
+    if in_place and image_data.flags.c_contiguous and image_data.flags.writeable:
+        steg_img = image_data
+    else:
+        if in_place:
+            steg_log.warning("Warning: Image data is not a writeable contiguous array; embedding into a copy.")
+        steg_img = image_data.copy()
+
+    
+    try:
+        
+        metadata_json = json.dumps(metadata_dict, separators=(',', ':')) 
+        metadata_bytes = metadata_json.encode('utf-8')
+
+        
+        length_bytes = len(metadata_bytes).to_bytes(4, byteorder='big')
+        full_payload = length_bytes + metadata_bytes
+
+        steg_log.debug("Metadata size: %s bytes", len(metadata_bytes))
+        steg_log.debug("Total payload with header: %s bytes (%s bits)", len(full_payload), len(full_payload)*8)
+
+        
+        required_bits = len(full_payload) * 8
+        available_bits = steg_img.size 
+
+        if required_bits > available_bits:
+            steg_log.error("Error: Image too small for metadata (%s bits needed, %s available)", required_bits, available_bits)
+            return image_data, False
+
+        
+        flat_img = steg_img.reshape(-1)
+
+        
+        payload_bits = np.unpackbits(np.frombuffer(full_payload, dtype=np.uint8), bitorder='little')
+        flat_img[:payload_bits.size] = (flat_img[:payload_bits.size] & 0xFE) | payload_bits
+
+        steg_log.debug("Successfully embedded %s bits of metadata", len(payload_bits))
+        return steg_img, True
+
+    except Exception as e:
+        steg_log.error("Steganography embedding failed: %s", e, exc_info=True)
+        return image_data, False
+
+@traced("steg extract", bytes_arg=0)
+def steghide_extract_metadata(steg_img):
+    
+    steg_log.debug("--- Extracting Hidden Metadata from Steganography ---")
+
+    if not isinstance(steg_img, np.ndarray):
+        steg_log.error("Error: Image data must be a NumPy array for extraction")
+        return None
+
+    try:
+        
+        flat_img = steg_img.reshape(-1)
+
+        
+        if len(flat_img) < 32:
+             steg_log.error("Error: Image too small to contain metadata length header.")
+             return None
+        length_bytes = np.packbits(flat_img[:32] & 1, bitorder='little').tobytes()
+
+        
+        metadata_length = int.from_bytes(length_bytes, byteorder='big')
+        steg_log.debug("Detected metadata length: %s bytes", metadata_length)
+
+        
+        max_possible_length = (flat_img.size - 32) // 8
+        if metadata_length <= 0 or metadata_length > max_possible_length:
+            steg_log.warning("Invalid metadata length detected (%s), possibly corrupted or no metadata. Max possible: %s", metadata_length, max_possible_length)
+            return None
+
+        
+        num_metadata_bits = metadata_length * 8
+        if 32 + num_metadata_bits > len(flat_img):
+            steg_log.error("Error: Image not large enough to contain declared metadata length (%s bits needed after header, only %s available).", num_metadata_bits, len(flat_img)-32)
+            return None
+
+        metadata_bytes = np.packbits(flat_img[32:32 + num_metadata_bits] & 1, bitorder='little').tobytes()
+
+        
+        
+        metadata_json = metadata_bytes.decode('utf-8')
+        metadata_dict = json.loads(metadata_json)
+
+        steg_log.debug("Successfully extracted metadata: %s fields", len(metadata_dict))
+        return metadata_dict
+
+    except json.JSONDecodeError as e:
+        steg_log.error("Metadata extraction failed: Could not decode JSON - %s", e)
+        
+        return None
+    except Exception as e:
+        steg_log.error("Metadata extraction failed: %s", e, exc_info=True)
+        return None
+
+
+
+STEG_SKIP_ALIGN = 1024
+
+def steg_affected_pixels(padded_shape, steg_elements, acm_iterations, acm_a=1, acm_b=1,
+                         original_shape_unpadded=None, padded=False):
+    
+    size = padded_shape[0]
+    channels = padded_shape[2] if len(padded_shape) == 3 else 1
+    forward, _ = acm_permutation(size, acm_iterations, acm_a, acm_b)
+    affected = forward.reshape(size, size) < -(-int(steg_elements) // channels)
+    if padded and original_shape_unpadded is not None:
+        orig_h, orig_w = original_shape_unpadded[:2]
+        top, left = (size - orig_h) // 2, (size - orig_w) // 2
+        affected = affected[top:top + orig_h, left:left + orig_w]
+    return affected
+
+@traced("plaintext digest", bytes_arg=0)
+def plaintext_digest(img_array, mask=None, tile_rows=0, band_rows=256):
+    
+    hasher = hashlib.blake2b(digest_size=32)
+    hasher.update(f"{img_array.shape}|{img_array.dtype}".encode('ascii'))
+    tiles = []
+    step = tile_rows if tile_rows else band_rows
+    for start in range(0, img_array.shape[0], step):
+        band = img_array[start:start + step]
+        if mask is not None and mask[start:start + step].any():
+            band = band.copy()
+            band[mask[start:start + step]] = 0
+        data = byte_view(band)
+        hasher.update(data)
+        if tile_rows:
+            tiles.append(hashlib.blake2b(data, digest_size=8).hexdigest())
+    return hasher.hexdigest(), tiles
+
+def attach_plaintext_digest(metadata, plaintext, padded_shape, tile_rows=0):
+    
+    start_time = time.perf_counter()
+    params = metadata['encryption_params']
+    record = {'algorithm': 'blake2b-256', 'hex': '0' * 64, 'steg_skip': 0}
+    if tile_rows:
+        record['tile_rows'] = int(tile_rows)
+        record['tiles'] = ['0' * 16] * -(-plaintext.shape[0] // tile_rows)
+    metadata['plaintext_digest'] = record
+    
+    while True:
+        needed = 32 + 8 * len(json.dumps(metadata, separators=(',', ':')).encode('utf-8'))
+        if needed <= record['steg_skip']:
+            break
+        record['steg_skip'] = -(-needed // STEG_SKIP_ALIGN) * STEG_SKIP_ALIGN
+    mask = steg_affected_pixels(padded_shape, record['steg_skip'], params['acm_iterations'], params['acm_a'],
+                                params['acm_b'], plaintext.shape, params.get('padded', False))
+    record['hex'], tiles = plaintext_digest(plaintext, mask, tile_rows)
+    if tile_rows:
+        record['tiles'] = tiles
+    digest_time = time.perf_counter() - start_time
+    if verify_log.isEnabledFor(logging.DEBUG):
+        verify_log.debug("Plaintext digest %s... recorded (%s steg-affected pixels masked) in %.4f seconds.", record['hex'][:16], int(mask.sum()), digest_time)
+    return metadata, digest_time
+
+def verify_roundtrip(decrypted_img, metadata):
+    
+    verify_log.info("--- Round-trip Self-Check (Plaintext Digest) ---")
+    start_time = time.perf_counter()
+    record = (metadata or {}).get('plaintext_digest')
+    params = (metadata or {}).get('encryption_params', {})
+    if not record or decrypted_img is None:
+        verify_log.info("No plaintext digest available; cannot verify the round trip by digest.")
+        return None, time.perf_counter() - start_time
+    if list(decrypted_img.shape) != list(params.get('original_shape_unpadded') or decrypted_img.shape):
+        verify_log.error("Round-trip FAILED: decrypted shape %s does not match %s.", decrypted_img.shape, params.get('original_shape_unpadded'))
+        return False, time.perf_counter() - start_time
+
+    mask = steg_affected_pixels(params['original_shape_padded'], record['steg_skip'], params['acm_iterations'],
+                                params['acm_a'], params['acm_b'], decrypted_img.shape, params.get('padded', False))
+    tile_rows = record.get('tile_rows', 0)
+    digest, tiles = plaintext_digest(decrypted_img, mask, tile_rows)
+    verify_time = time.perf_counter() - start_time
+    if digest == record['hex']:
+        if verify_log.isEnabledFor(logging.INFO):
+            verify_log.info("Round-trip PASSED: plaintext digest matches (%s steg-affected pixels excluded) in %.4f seconds.", int(mask.sum()), verify_time)
+        return True, verify_time
+    bad_tiles = [i for i, (ours, theirs) in enumerate(zip(tiles, record.get('tiles', []))) if ours != theirs]
+    if bad_tiles:
+        verify_log.error("Round-trip FAILED: %s/%s tiles of %s rows differ (first rows %s-%s).", len(bad_tiles), len(tiles), tile_rows, bad_tiles[0] * tile_rows, (bad_tiles[0] + 1) * tile_rows - 1)
+    else:
+        verify_log.error("Round-trip FAILED: plaintext digest does not match.")
+    return False, verify_time
+
+
+
+def _inflate_into(compressed_bytes, target, chunk_bytes=1 << 20):
+    
+    decompressor = zlib.decompressobj()
+    filled = 0
+    source = memoryview(compressed_bytes)
+    for start in range(0, len(source), chunk_bytes):
+        pending = source[start:start + chunk_bytes]
+        while pending:
+            piece = decompressor.decompress(pending, chunk_bytes)
+            pending = decompressor.unconsumed_tail
+            filled = _copy_piece(target, filled, piece)
+    return _copy_piece(target, filled, decompressor.flush())
+
+def _copy_piece(target, filled, piece):
+    
+    if filled + len(piece) > len(target):
+        raise ValueError(f"Decompressed data exceeds the {len(target)} byte output buffer.")
+    target[filled:filled + len(piece)] = piece
+    return filled + len(piece)
+
+@traced("decompress", bytes_arg=0)
+def decompress_data(compressed_bytes, original_shape, original_dtype, out=None):
+    
+    compress_log.debug("Starting Decompression...")
+    start_time = time.perf_counter()
+    if not isinstance(compressed_bytes, (bytes, bytearray, memoryview)):
+         compress_log.error("Error: Input for decompression must be bytes.")
+         return None, 0
+
+    try:
+        if out is None:
+            decompressed_bytes = zlib.decompress(compressed_bytes)
+            decompressed_size = len(decompressed_bytes)
+        else:
+            check_out_buffer(out, original_shape, original_dtype)
+            decompressed_size = _inflate_into(compressed_bytes, byte_view(out))
+
+        
+        
+        try:
+             dtype_itemsize = np.dtype(original_dtype).itemsize
+             
+             expected_bytes = int(np.prod(original_shape)) * dtype_itemsize 
+        except TypeError as e:
+             compress_log.error("Error calculating expected size: Invalid shape %s or dtype %s? %s", original_shape, original_dtype, e)
+             
+             raise ValueError("Cannot determine expected size from shape/dtype.")
+
+        
+        if decompressed_size != expected_bytes:
+             compress_log.error("FATAL: Decompressed byte count (%s) does not match expected count (%s) based on provided shape %s and dtype %s.", decompressed_size, expected_bytes, original_shape, original_dtype)
+             compress_log.error("This indicates data corruption, incorrect shape/dtype passed, or compression issues.")
+             
+             return None, time.perf_counter() - start_time 
+
+        
+        
+        if out is None:
+            data_array = np.frombuffer(decompressed_bytes, dtype=original_dtype)
+            
+            data_array = data_array.reshape(original_shape)
+        else:
+            data_array = out
+
+        end_time = time.perf_counter()
+        decompression_time = end_time - start_time
+        compress_log.debug("Decompression completed in %.4f seconds.", decompression_time)
+        return data_array, decompression_time
+
+    except zlib.error as e:
+        compress_log.error("Error during zlib decompression: %s. Data may be corrupted.", e)
+        return None, time.perf_counter() - start_time
+    except ValueError as e:
+        
+        compress_log.error("Error reshaping decompressed data (likely size mismatch or shape/dtype error): %s", e)
+        return None, time.perf_counter() - start_time
+    except Exception as e:
+        compress_log.error("An unexpected error occurred during decompression: %s", e, exc_info=True)
+        return None, time.perf_counter() - start_time
+
+@traced("decrypt", bytes_arg=0)
+def decrypt_image(encrypted_img_array, acm_iterations, logistic_x0, logistic_r, original_shape_before_padding, padded, acm_a=1, acm_b=1, keystream_offset=0, in_place=False,
+                  keystream_backend='logistic'):
+     
+    
+    if encrypted_img_array is None:
+         cipher_log.error("Error: Cannot decrypt None input.")
+         return None, 0
+
+    cipher_log.debug("Starting Decryption Process (on decompressed data)...")
+    start_time = time.perf_counter()
+
+    
+    cipher_log.debug("Applying %s keystream decryption (x0=%s, r=%s)...", keystream_backend, logistic_x0, logistic_r)
+    try:
+        
+        logistic_decrypted_img = logistic_map_encrypt_decrypt(encrypted_img_array, logistic_x0, logistic_r, keystream_offset=keystream_offset,
+                                                              out=encrypted_img_array if in_place else None,
+                                                              keystream_backend=keystream_backend) 
+    except ValueError as e:
+         cipher_log.error("Error during Logistic Map decryption: %s. Returning None.", e)
+         return None, time.perf_counter() - start_time
+
+    
+    cipher_log.debug("Applying Inverse AES S-box substitution...")
+    try:
+        
+        inv_sbox_applied_img = apply_inverse_aes_sbox(logistic_decrypted_img, out=logistic_decrypted_img) 
+    except Exception as e:
+        cipher_log.error("Error during Inverse AES S-box application: %s. Returning logistic decrypted image.", e)
+        return logistic_decrypted_img, time.perf_counter() - start_time 
+
+    
+    cipher_log.debug("Applying Inverse Arnold's Cat Map with %s iterations (a=%s, b=%s)...", acm_iterations, acm_a, acm_b)
+    try:
+        
+        unshuffled_padded_img = inverse_arnold_cat_map(inv_sbox_applied_img, acm_iterations, acm_a, acm_b) 
+    except ValueError as e:
+         cipher_log.error("Error during Inverse ACM: %s. Cannot unpad. Returning partially decrypted (inv-S-box applied) image.", e)
+         
+         return inv_sbox_applied_img, time.perf_counter() - start_time
+
+    
+    final_decrypted_img = unshuffled_padded_img 
+    if padded: 
+        current_h, current_w = unshuffled_padded_img.shape[:2]
+        
+        orig_h, orig_w = original_shape_before_padding[:2]
+
+        
+        if orig_h > current_h or orig_w > current_w:
+             cipher_log.error("Error: Original dimensions (%sx%s) seem larger than current image dimensions (%sx%s) after inverse ACM. Cannot unpad.", orig_h, orig_w, current_h, current_w)
+             
+             return unshuffled_padded_img, time.perf_counter() - start_time
+
+        
+        if current_h != orig_h or current_w != orig_w:
+            cipher_log.debug("Removing padding to restore original size %s...", original_shape_before_padding)
+            
+            pad_h_total = current_h - orig_h
+            pad_w_total = current_w - orig_w
+            
+            pad_top = pad_h_total // 2
+            pad_left = pad_w_total // 2
+
+            
+            try:
+                if unshuffled_padded_img.ndim == 3: 
+                    final_decrypted_img = unshuffled_padded_img[pad_top : pad_top + orig_h, pad_left : pad_left + orig_w, :]
+                else: 
+                    final_decrypted_img = unshuffled_padded_img[pad_top : pad_top + orig_h, pad_left : pad_left + orig_w]
+                cipher_log.debug("Final decrypted size after unpadding: %s", final_decrypted_img.shape[:2])
+            except IndexError as e:
+                 cipher_log.error("Error during unpadding slice (calculated indices might be wrong): %s", e)
+                 cipher_log.error("  current=%sx%s, orig=%sx%s, top=%s, left=%s", current_h, current_w, orig_h, orig_w, pad_top, pad_left)
+                 
+                 return unshuffled_padded_img, time.perf_counter() - start_time
+        else:
+            
+             cipher_log.debug("Padding flag was set, but dimensions seem to match the original size. No padding removed.")
+             final_decrypted_img = unshuffled_padded_img 
+    else:
+        cipher_log.debug("No padding was added initially, skipping unpadding step.")
+
+    end_time = time.perf_counter()
+    decryption_time = end_time - start_time
+    cipher_log.debug("Decryption completed in %.4f seconds.", decryption_time)
+    
+    return final_decrypted_img.astype(np.uint8, copy=False), decryption_time
+
+def verify_integrity_compressed(received_compressed_data, original_compressed_hash):
+    
+    verify_log.info("--- Tamper Verification (Compressed Data) ---")
+    if not isinstance(received_compressed_data, bytes):
+        verify_log.error("Error: Received data for hash verification is not bytes.")
+        return False
+    if not isinstance(original_compressed_hash, str) or len(original_compressed_hash) != 64:
+        verify_log.error("Error: Original hash for comparison is invalid.")
+        return False
+
+    verify_log.info("Expected Hash:  %s", original_compressed_hash)
+    
+    try:
+        calculated_hash = calculate_hash_bytes(received_compressed_data)
+        verify_log.info("Calculated Hash:%s", calculated_hash)
+    except Exception as e:
+        verify_log.error("Error calculating hash of received data: %s", e)
+        return False
+
+    if original_compressed_hash == calculated_hash:
+        verify_log.info("Integrity Check PASSED: Compressed data hashes match.")
+        return True
+    else:
+        verify_log.error("Integrity Check FAILED: Compressed data hashes DO NOT match. Data may be corrupted or tampered with.")
+        return False
+
+
+
+@traced("metrics")
+def calculate_metrics(img_orig, img_processed, data_range=255):
+    
+    
+    if not isinstance(img_orig, np.ndarray) or not isinstance(img_processed, np.ndarray):
+        metrics_log.error("Error: Inputs for metrics must be NumPy arrays.")
+        
+        entropy_orig = image_entropy(img_orig) if isinstance(img_orig, np.ndarray) else float('nan')
+        return {'mse': float('inf'), 'psnr': 0, 'ssim': 0, 'entropy_orig': entropy_orig, 'entropy_proc': float('nan')}
+
+    
+    
+    if img_orig.dtype != np.uint8:
+         
+         img_orig = img_orig.astype(np.uint8)
+    if img_processed.dtype != np.uint8:
+         
+         img_processed = img_processed.astype(np.uint8)
+
+    
+    if img_orig.shape != img_processed.shape:
+        metrics_log.warning("Warning: Original (%s) and processed (%s) images have different shapes for metrics calculation.", img_orig.shape, img_processed.shape)
+        metrics_log.warning("This often happens if decryption/unpadding failed.")
+        metrics_log.warning("Metrics calculation skipped due to shape mismatch.")
+        
+        entropy_orig_val = float('nan')
+        try:
+             entropy_orig_val = image_entropy(img_orig)
+        except Exception as e:
+             metrics_log.error("Error calculating original entropy: %s", e)
+        return {'mse': float('inf'), 'psnr': 0, 'ssim': 0, 'entropy_orig': entropy_orig_val, 'entropy_proc': float('nan')}
+
+
+    
+    try:
+        mse_val, psnr_val = mse_psnr(img_orig, img_processed, data_range=data_range)
+    except Exception as e:
+        metrics_log.error("Error calculating MSE/PSNR: %s", e)
+        mse_val, psnr_val = float('inf'), 0
+
+    
+    ssim_val = 0 
+    try:
+        ssim_val = fast_ssim(img_orig, img_processed, data_range=data_range)
+    except ValueError as e:
+         
+         metrics_log.error("Error calculating SSIM (check window size vs image dim): %s. Setting SSIM to 0.", e)
+         ssim_val = 0
+    except Exception as e:
+         metrics_log.error("Unexpected error calculating SSIM: %s", e)
+         ssim_val = 0
+
+
+    
+    try:
+        orig_stats = histogram_stats(img_orig)
+        proc_stats = histogram_stats(img_processed)
+    except Exception as e:
+        metrics_log.error("Error calculating histogram statistics: %s", e)
+        orig_stats = proc_stats = {'entropy': float('nan'), 'chi_square': float('nan')}
+
+
+    metrics = {
+        'mse': mse_val,
+        'psnr': psnr_val,
+        'ssim': ssim_val,
+        'entropy_orig': orig_stats['entropy'],
+        'entropy_proc': proc_stats['entropy'],
+        'chi_square_orig': orig_stats['chi_square'],
+        'chi_square_proc': proc_stats['chi_square']
+    }
+    return metrics
+
+@traced("histograms")
+def plot_histograms(img_orig, img_encrypted, img_decrypted):
+    
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Image Histograms', fontsize=16)
+    colors = ('r', 'g', 'b')
+    labels = ('Original (Unpadded)', 'Encrypted (Padded)', 'Decrypted (Final)')
+    images = (img_orig, img_encrypted, img_decrypted)
+
+    for i, img in enumerate(images):
+        ax = axes[i]
+        if img is None or not isinstance(img, np.ndarray): 
+            ax.set_title(f"{labels[i]} (Not Available)")
+            ax.text(0.5, 0.5, 'N/A', ha='center', va='center', transform=ax.transAxes, fontsize=12, color='red')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            continue
+
+        
+        ax.set_title(labels[i] + f" {img.shape}") 
+        ax.set_xlabel('Pixel Intensity'); ax.set_ylabel('Frequency')
+        try:
+            if img.ndim == 3: 
+                
+                for hist, color in zip(channel_histograms(img), colors):
+                    ax.plot(np.arange(256), hist, color=color, alpha=0.7, label=f'Ch {color.upper()}')
+                if img.shape[2] > 1 : ax.legend(loc='upper right') 
+            elif img.ndim == 2: 
+                ax.plot(np.arange(256), channel_histograms(img)[0], color='black')
+            else:
+                 ax.text(0.5, 0.5, f'Invalid Dim {img.ndim}', ha='center', va='center', transform=ax.transAxes)
+
+
+            ax.set_xlim([0, 255])
+            ax.grid(True, linestyle='--', alpha=0.6)
+        except Exception as e:
+             metrics_log.error("Error plotting histogram for %s: %s", labels[i], e)
+             ax.text(0.5, 0.5, 'Plotting Error', ha='center', va='center', transform=ax.transAxes, color='red')
+
+
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95]) 
+    plt.show()
+
+@traced("display")
+def display_images(img_orig, img_encrypted, img_decrypted):
+    
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+    fig.suptitle('Image Encryption Results', fontsize=16)
+    titles = ['Original Image (Unpadded)', 'Encrypted Image (Padded)', 'Decrypted Image (Final)']
+    images = [img_orig, img_encrypted, img_decrypted]
+
+    for ax, img, title in zip(axes, images, titles):
+        ax.set_title(title)
+        ax.axis('off') 
+        if img is not None and isinstance(img, np.ndarray):
+            
+            cmap = 'gray' if img.ndim == 2 else None
+            try:
+                ax.imshow(img, cmap=cmap)
+            except Exception as e:
+                 metrics_log.error("Error displaying image '%s': %s", title, e)
+                 ax.text(0.5, 0.5, 'Display Error', ha='center', va='center', transform=ax.transAxes, color='red')
+
+        else:
+             
+             ax.text(0.5, 0.5, 'N/A', ha='center', va='center', transform=ax.transAxes, fontsize=12, color='red')
+
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95]) 
+    plt.show()
+
+
+def create_download_link_jupyter(filename, data_bytes, link_text, mime_type='application/octet-stream'):
+    
+    if ENV != 'jupyter' or not isinstance(data_bytes, bytes):
+        return "" 
+    if len(data_bytes) > DOWNLOAD_INLINE_MAX_BYTES and os.path.exists(filename):
+        return create_file_link_jupyter(filename, link_text, mime_type)
+    try:
+        b64 = base64.b64encode(data_bytes).decode('ascii') 
+        
+        base_filename = os.path.basename(filename)
+        href = f'<a href="data:{mime_type};base64,{b64}" download="{base_filename}">{link_text}</a>'
+        return href
+    except Exception as e:
+        delivery_log.error("Error creating download link for %s: %s", filename, e)
+        return f"<span>Error creating link for {filename}</span>"
+
+def create_file_link_jupyter(path, link_text, mime_type='application/octet-stream'):
+    
+    if ENV != 'jupyter':
+        return ""
+    try:
+        return file_link_html(path, link_text, mime_type, mode=DOWNLOAD_DELIVERY, max_inline_bytes=DOWNLOAD_INLINE_MAX_BYTES)
+    except Exception as e:
+        delivery_log.error("Error creating download link for %s: %s", path, e)
+        return f"<span>Error creating link for {path}</span>"
+
+
+
+
+
+
+
+ACM_ITERATIONS = 10 
+ACM_A = 1; ACM_B = 1 
+LOGISTIC_X0 = 0.3141592653589793 
+LOGISTIC_R = 3.9999999          
+KEYSTREAM_BACKEND = "logistic"
+
+
+USE_GRAYSCALE = False             
+SIMULATE_LOW_BANDWIDTH = False    
+RESIZE_TARGET = None 
+
+
+
+COMPRESSED_ENCRYPTED_FILENAME = "encrypted_compressed_data.zlib-steg" 
+DECRYPTED_FILENAME = "decrypted_image.png" 
+
+
+TRACE_ENABLED = False
+TRACE_MEMORY = "tracemalloc"
+TRACE_OUTPUT = "pipeline_trace.json"
+TRACE_FORMAT = "chrome"
+
+
+SENSITIVITY_SWEEP = False
+SENSITIVITY_WORKERS = None
+
+
+HEADLESS_REPORT = ENV == 'other'
+REPORT_DIR = "report"
+
+
+ZERO_COPY = False
+
+
+ROUNDTRIP_DIGEST = True
+ROUNDTRIP_TILE_ROWS = 0
+ROUNDTRIP_ALWAYS_METRICS = False
+
+
+LOG_LEVEL = "INFO"
+LOG_LEVELS = ()
+LOG_FORMAT = "plain"
+
+
+METRICS_FILE = None
+METRICS_PORT = None
+
+
+PLANNER_ENABLED = False
+PLANNER_MEMORY_LIMIT = None
+PLANNER_LINK_MBPS = None
+PLANNER_CALIBRATION_FILE = None
+
+
+PIPELINE_STAGES = None
+PIPELINE_SKIP = ()
+
+
+DOWNLOAD_DELIVERY = "auto"
+DOWNLOAD_INLINE_MAX_BYTES = 1024 * 1024
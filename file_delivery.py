@@ -0,0 +1,170 @@
+import base64
+import html
+import mimetypes
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+
+DATA_URI_MAX_BYTES = 1024 * 1024
+DELIVERY_MODES = ('auto', 'datauri', 'filelink', 'server')
+_server = None
+_server_lock = threading.Lock()
+
+
+def _parse_range(header, size):
+
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start_text, _, end_text = header[len('bytes='):].strip().partition('-')
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+
+        pass
+
+    def _lookup(self):
+
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'files':
+            return None
+        entry = self.server.files.get(parts[1])
+        if entry is None or os.path.basename(entry[0]) != unquote(parts[2]):
+            return None
+        return entry
+
+    def _serve(self, send_body):
+
+        entry = self._lookup()
+        if entry is None:
+            self.send_error(404, "Unknown file")
+            return
+        path, mime_type = entry
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File no longer available")
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            start, end = 0, size - 1
+            byte_range = _parse_range(self.headers.get('Range'), size)
+            if self.headers.get('Range') and byte_range is None and size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.end_headers()
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            else:
+                self.send_response(200)
+            count = max(0, end - start + 1)
+            self.send_header('Content-Type', mime_type)
+            self.send_header('Content-Length', str(count))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(path)}"')
+            self.end_headers()
+            if send_body and count:
+                self.wfile.flush()
+                self.connection.sendfile(f, offset=start, count=count)
+
+    def do_GET(self):
+
+        self._serve(True)
+
+    def do_HEAD(self):
+
+        self._serve(False)
+
+
+class FileServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), FileRequestHandler)
+        self.files = {}
+        self._thread = threading.Thread(target=self.serve_forever, name='file-delivery', daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self):
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def register(self, path, mime_type=None):
+
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+        token = secrets.token_urlsafe(16)
+        self.files[token] = (path, mime_type or mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        return f"{self.base_url}/files/{token}/{quote(os.path.basename(path))}"
+
+    def close(self):
+
+        self.shutdown()
+        self.server_close()
+
+
+def get_file_server():
+
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = FileServer()
+        return _server
+
+
+def data_uri(path, mime_type='application/octet-stream'):
+
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('ascii')
+    return f"data:{mime_type};base64,{encoded}"
+
+
+def _relative_to_cwd(path):
+
+    relative = os.path.relpath(os.path.abspath(path))
+    return None if relative.startswith(os.pardir) else relative
+
+
+def file_link_html(path, link_text, mime_type='application/octet-stream', mode='auto',
+                   max_inline_bytes=DATA_URI_MAX_BYTES):
+
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"Unknown delivery mode '{mode}'. Expected one of {DELIVERY_MODES}.")
+    size = os.path.getsize(path)
+    name = html.escape(os.path.basename(path))
+    text = html.escape(link_text)
+    if mode == 'datauri' or (mode == 'auto' and size <= max_inline_bytes):
+        return f'<a href="{data_uri(path, mime_type)}" download="{name}">{text}</a>'
+
+    relative = _relative_to_cwd(path)
+    if mode == 'filelink' or (mode == 'auto' and relative is not None):
+        if relative is None:
+            raise ValueError(f"{path} is outside the notebook directory; FileLink cannot serve it.")
+        href = html.escape(quote(relative.replace(os.sep, '/')))
+        return f'<a href="{href}" download="{name}" target="_blank">{text}</a> ({size / 1e6:.1f} MB)'
+
+    url = get_file_server().register(path, mime_type)
+    return f'<a href="{html.escape(url)}" download="{name}" target="_blank">{text}</a> ({size / 1e6:.1f} MB)'
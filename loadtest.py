@@ -0,0 +1,101 @@
+import argparse
+import io
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+
+def make_test_image(size, seed=0, grayscale=False):
+
+    rng = np.random.default_rng(seed)
+    shape = (size, size) if grayscale else (size, size, 3)
+    gradient = np.add.outer(np.arange(size), np.arange(size)) % 256
+    noise = rng.integers(0, 32, shape)
+    image = (gradient[..., None] if not grayscale else gradient) + noise
+    buffer = io.BytesIO()
+    Image.fromarray(image.astype(np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def post(url, body, headers=None, timeout=300):
+
+    request = urllib.request.Request(url, data=body, headers=headers or {}, method='POST')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read(), dict(response.headers)
+
+
+def run_load_test(base_url, endpoint='encrypt', requests=100, concurrency=4, image_size=256):
+
+    image_bytes = make_test_image(image_size)
+    body, headers = image_bytes, {'Content-Type': 'application/octet-stream'}
+    if endpoint != 'encrypt':
+        compressed, encrypt_headers = post(f"{base_url}/encrypt", image_bytes)
+        body = compressed
+        headers = {
+            'X-Encrypted-Shape': encrypt_headers['X-Encrypted-Shape'],
+            'X-Content-SHA256': encrypt_headers['X-Content-SHA256'],
+        }
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def _one(_):
+        nonlocal errors
+        start_time = time.perf_counter()
+        try:
+            post(f"{base_url}/{endpoint}", body, headers)
+            ok = True
+        except Exception as e:
+            print(f"Request failed: {e}")
+            ok = False
+        elapsed = time.perf_counter() - start_time
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(_one, range(requests)))
+    wall_time = time.perf_counter() - start_time
+
+    values = np.array(latencies) * 1000.0
+    return {
+        'endpoint': endpoint,
+        'requests': requests,
+        'concurrency': concurrency,
+        'image_size': image_size,
+        'errors': errors,
+        'p50_ms': float(np.percentile(values, 50)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'mean_ms': float(values.mean()),
+        'requests_per_s': requests / wall_time,
+        'wall_time_s': wall_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the local encryption service.")
+    parser.add_argument('--url', default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+    parser.add_argument('--endpoint', default='encrypt', choices=['encrypt', 'decrypt', 'verify', 'metadata'])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--image-size', type=int, default=256)
+    args = parser.parse_args()
+
+    report = run_load_test(args.url, args.endpoint, args.requests, args.concurrency, args.image_size)
+    print(f"--- Load Test: /{report['endpoint']} ({report['requests']} requests, concurrency {report['concurrency']}) ---")
+    print(f"p50 latency:  {report['p50_ms']:.2f} ms")
+    print(f"p99 latency:  {report['p99_ms']:.2f} ms")
+    print(f"Throughput:   {report['requests_per_s']:.2f} req/s")
+    print(f"Errors:       {report['errors']}")
+    with urllib.request.urlopen(f"{args.url}/stats") as response:
+        print("Server stats:", json.dumps(json.loads(response.read()), indent=2))
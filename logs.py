@@ -0,0 +1,100 @@
+import argparse
+import json
+import logging
+import sys
+
+
+LOGGER_ROOT = 'ice'
+LOG_FORMATS = ('plain', 'verbose', 'json')
+LEVEL_NAMES = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+_TEXT_FORMATS = {
+    'plain': '%(message)s',
+    'verbose': '%(asctime)s %(levelname)-7s %(name)s: %(message)s',
+}
+
+
+def get_logger(subsystem):
+
+    return logging.getLogger(f"{LOGGER_ROOT}.{subsystem}")
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'subsystem': record.name[len(LOGGER_ROOT) + 1:] if record.name.startswith(LOGGER_ROOT + '.') else record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(specs):
+
+    levels = {}
+    for spec in specs or ():
+        subsystem, _, level = spec.partition('=')
+        level = level.strip().upper()
+        if not subsystem or level not in LEVEL_NAMES:
+            raise ValueError(f"Invalid log level override '{spec}'. Expected SUBSYSTEM=LEVEL with LEVEL in {LEVEL_NAMES}.")
+        levels[subsystem.strip()] = level
+    return levels
+
+
+def configure_logging(level='INFO', levels=None, fmt='plain', stream=None):
+
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format '{fmt}'. Expected one of {LOG_FORMATS}.")
+    root = logging.getLogger(LOGGER_ROOT)
+    for handler in [h for h in root.handlers if getattr(h, '_ice_handler', False)]:
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(_TEXT_FORMATS[fmt]))
+    handler._ice_handler = True
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+    for subsystem, subsystem_level in (levels or {}).items():
+        get_logger(subsystem).setLevel(subsystem_level)
+    return root
+
+
+def add_logging_arguments(parser, default_level='INFO'):
+
+    parser.add_argument('--log-level', default=default_level, type=str.upper, choices=LEVEL_NAMES,
+                        help="Default level for all pipeline subsystems.")
+    parser.add_argument('--log', action='append', default=[], metavar='SUBSYSTEM=LEVEL',
+                        help="Per-subsystem override, e.g. steg=DEBUG or stage.metrics=WARNING. Repeatable.")
+    parser.add_argument('--log-format', default='plain', choices=LOG_FORMATS)
+    return parser
+
+
+def configure_from_args(args, parser=None):
+
+    try:
+        return configure_logging(args.log_level, parse_levels(args.log), args.log_format)
+    except ValueError as e:
+        if parser is None:
+            raise
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which pipeline loggers exist and their effective levels.")
+    add_logging_arguments(parser)
+    parser.add_argument('--import', dest='modules', nargs='*', default=['core', 'pipeline'],
+                        help="Modules to import so their loggers are registered.")
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+    for module in args.modules:
+        __import__(module)
+    names = sorted(name for name in logging.root.manager.loggerDict if name.startswith(LOGGER_ROOT + '.'))
+    for name in names:
+        print(f"{name[len(LOGGER_ROOT) + 1:]:<24} {logging.getLevelName(logging.getLogger(name).getEffectiveLevel())}")
@@ -0,0 +1,317 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from logs import get_logger, add_logging_arguments, configure_from_args
+
+
+DEFAULT_DB = 'metadata_index.sqlite'
+DEFAULT_PATTERN = '*.zlib-steg'
+READ_CHUNK = 64 * 1024
+LENGTH_HEADER_BITS = 32
+MAX_METADATA_BYTES = 1024 * 1024
+WRITE_BATCH = 500
+log = get_logger('metadata_index')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT,
+    indexed_at REAL NOT NULL,
+    timestamp TEXT,
+    acm_iterations INTEGER,
+    acm_a INTEGER,
+    acm_b INTEGER,
+    logistic_x0 REAL,
+    logistic_r REAL,
+    height INTEGER,
+    width INTEGER,
+    channels INTEGER,
+    padded_size INTEGER,
+    dtype TEXT,
+    grayscale INTEGER,
+    padded INTEGER,
+    metadata_json TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_acm ON files (acm_iterations, acm_a, acm_b);
+CREATE INDEX IF NOT EXISTS idx_files_dims ON files (height, width);
+CREATE INDEX IF NOT EXISTS idx_files_grayscale ON files (grayscale);
+"""
+COLUMNS = ('path', 'size', 'mtime', 'sha256', 'indexed_at', 'timestamp', 'acm_iterations', 'acm_a', 'acm_b',
+           'logistic_x0', 'logistic_r', 'height', 'width', 'channels', 'padded_size', 'dtype', 'grayscale',
+           'padded', 'metadata_json', 'error')
+
+
+def _lsb_bytes(buffer):
+
+    bits = np.frombuffer(bytes(buffer), dtype=np.uint8) & 1
+    return np.packbits(bits.reshape(-1, 8), axis=1, bitorder='little').tobytes()
+
+
+def read_steg_metadata(path, with_digest=True):
+
+    hasher = hashlib.sha256() if with_digest else None
+    inflater = zlib.decompressobj()
+    prefix = bytearray()
+    needed = LENGTH_HEADER_BITS
+    metadata = None
+    error = None
+
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            if hasher is not None:
+                hasher.update(chunk)
+            pending = chunk
+            while metadata is None and error is None and pending:
+                try:
+                    prefix += inflater.decompress(pending, needed - len(prefix))
+                except zlib.error as e:
+                    error = f"zlib: {e}"
+                    break
+                pending = inflater.unconsumed_tail
+                if len(prefix) < needed:
+                    continue
+                if needed == LENGTH_HEADER_BITS:
+                    length = int.from_bytes(_lsb_bytes(prefix[:LENGTH_HEADER_BITS]), byteorder='big')
+                    if length <= 0 or length > MAX_METADATA_BYTES:
+                        error = f"invalid metadata length {length}"
+                        break
+                    needed = LENGTH_HEADER_BITS + 8 * length
+                    continue
+                try:
+                    metadata = json.loads(_lsb_bytes(prefix[LENGTH_HEADER_BITS:needed]).decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    error = f"metadata decode: {e}"
+            if hasher is None and (metadata is not None or error is not None):
+                break
+
+    if metadata is None and error is None:
+        error = "file ended before metadata was complete"
+    return metadata, hasher.hexdigest() if hasher is not None else None, error
+
+
+def _as_int(value):
+
+    return int(value) if value is not None else None
+
+
+def build_record(path, with_digest=True):
+
+    stat = os.stat(path)
+    try:
+        metadata, digest, error = read_steg_metadata(path, with_digest)
+    except OSError as e:
+        metadata, digest, error = None, None, f"read: {e}"
+    params = (metadata or {}).get('encryption_params', {})
+    shape = params.get('original_shape_unpadded') or []
+    padded_shape = params.get('original_shape_padded') or []
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha256': digest,
+        'indexed_at': time.time(),
+        'timestamp': (metadata or {}).get('timestamp'),
+        'acm_iterations': _as_int(params.get('acm_iterations')),
+        'acm_a': _as_int(params.get('acm_a')),
+        'acm_b': _as_int(params.get('acm_b')),
+        'logistic_x0': params.get('logistic_x0'),
+        'logistic_r': params.get('logistic_r'),
+        'height': _as_int(shape[0]) if len(shape) > 0 else None,
+        'width': _as_int(shape[1]) if len(shape) > 1 else None,
+        'channels': _as_int(shape[2]) if len(shape) > 2 else (1 if shape else None),
+        'padded_size': _as_int(padded_shape[0]) if padded_shape else None,
+        'dtype': params.get('dtype'),
+        'grayscale': _as_int(params.get('grayscale')),
+        'padded': _as_int(params.get('padded')),
+        'metadata_json': json.dumps(metadata) if metadata is not None else None,
+        'error': error,
+    }
+
+
+def _build_record_job(args):
+
+    path, with_digest = args
+    try:
+        return build_record(path, with_digest)
+    except FileNotFoundError:
+        return None
+
+
+def open_index(db_path=DEFAULT_DB):
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_candidate_files(root, pattern=DEFAULT_PATTERN):
+
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if fnmatch.fnmatch(name, pattern):
+                yield os.path.abspath(os.path.join(dirpath, name))
+
+
+def _write_batch(conn, records):
+
+    placeholders = ', '.join('?' for _ in COLUMNS)
+    conn.executemany(f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                     [tuple(record[column] for column in COLUMNS) for record in records])
+    conn.commit()
+
+
+def index_directory(root, db_path=DEFAULT_DB, pattern=DEFAULT_PATTERN, workers=None, with_digest=True, prune=True):
+
+    log.debug("Indexing %s into %s...", root, db_path)
+    start_time = time.perf_counter()
+    conn = open_index(db_path)
+    root_prefix = os.path.join(os.path.abspath(root), '')
+    known = {path: (size, mtime) for path, size, mtime in conn.execute(
+        "SELECT path, size, mtime FROM files WHERE substr(path, 1, length(?)) = ?", (root_prefix, root_prefix))}
+
+    changed = []
+    seen = set()
+    for path in iter_candidate_files(root, pattern):
+        seen.add(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if known.get(path) != (stat.st_size, stat.st_mtime):
+            changed.append(path)
+
+    indexed = failed = 0
+    if changed:
+        batch = []
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            jobs = ((path, with_digest) for path in changed)
+            for record in pool.map(_build_record_job, jobs, chunksize=64):
+                if record is None:
+                    continue
+                batch.append(record)
+                indexed += 1
+                failed += record['error'] is not None
+                if len(batch) >= WRITE_BATCH:
+                    _write_batch(conn, batch)
+                    batch = []
+        if batch:
+            _write_batch(conn, batch)
+
+    removed = 0
+    if prune:
+        stale = [(path,) for path in known if path not in seen]
+        conn.executemany("DELETE FROM files WHERE path = ?", stale)
+        conn.commit()
+        removed = len(stale)
+    conn.close()
+
+    elapsed = time.perf_counter() - start_time
+    log.info("Indexed %d new/changed files (%d without readable metadata), %d unchanged, %d removed in %.2f seconds.",
+             indexed, failed, len(seen) - len(changed), removed, elapsed)
+    return {'indexed': indexed, 'failed': failed, 'unchanged': len(seen) - len(changed),
+            'removed': removed, 'time': elapsed}
+
+
+def query_index(db_path=DEFAULT_DB, min_side=None, max_side=None, grayscale=None, acm_iterations=None,
+                acm_a=None, acm_b=None, logistic_r=None, errors_only=False, where=None, limit=None):
+
+    clauses, args = [], []
+    if min_side is not None:
+        clauses.append("MAX(height, width) >= ?")
+        args.append(min_side)
+    if max_side is not None:
+        clauses.append("MAX(height, width) <= ?")
+        args.append(max_side)
+    if grayscale is not None:
+        clauses.append("grayscale = ?")
+        args.append(int(grayscale))
+    for column, value in (('acm_iterations', acm_iterations), ('acm_a', acm_a), ('acm_b', acm_b),
+                          ('logistic_r', logistic_r)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            args.append(value)
+    if errors_only:
+        clauses.append("error IS NOT NULL")
+    if where:
+        clauses.append(f"({where})")
+    sql = "SELECT * FROM files"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY path"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    conn = open_index(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(sql, args)]
+    finally:
+        conn.close()
+
+
+def _print_rows(rows, as_json=False):
+
+    if as_json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    print(f"{'Height':>6} {'Width':>6} {'Ch':>3} {'Gray':>4} {'ACM':>4} {'Size':>10} {'Timestamp':<24} Path")
+    for row in rows:
+        print(f"{row['height'] or '-':>6} {row['width'] or '-':>6} {row['channels'] or '-':>3} "
+              f"{row['grayscale'] if row['grayscale'] is not None else '-':>4} {row['acm_iterations'] or '-':>4} "
+              f"{row['size']:>10} {(row['timestamp'] or row['error'] or '')[:24]:<24} {row['path']}")
+    print(f"{len(rows)} matching file(s).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite metadata index over encrypted .zlib-steg outputs.")
+    add_logging_arguments(parser)
+    parser.add_argument('--db', default=DEFAULT_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help="Scan a directory tree and update the index.")
+    index_parser.add_argument('root')
+    index_parser.add_argument('--pattern', default=DEFAULT_PATTERN)
+    index_parser.add_argument('--workers', type=int, default=None)
+    index_parser.add_argument('--no-digest', action='store_true', help="Skip hashing whole files.")
+    index_parser.add_argument('--no-prune', action='store_true', help="Keep rows for files that disappeared.")
+
+    query_parser = subparsers.add_parser('query', help="Query indexed metadata.")
+    query_parser.add_argument('--min-side', type=int)
+    query_parser.add_argument('--max-side', type=int)
+    gray_group = query_parser.add_mutually_exclusive_group()
+    gray_group.add_argument('--grayscale', dest='grayscale', action='store_true', default=None)
+    gray_group.add_argument('--color', dest='grayscale', action='store_false')
+    query_parser.add_argument('--acm-iterations', type=int)
+    query_parser.add_argument('--acm-a', type=int)
+    query_parser.add_argument('--acm-b', type=int)
+    query_parser.add_argument('--logistic-r', type=float)
+    query_parser.add_argument('--errors', action='store_true', help="Only files whose metadata could not be read.")
+    query_parser.add_argument('--where', help="Extra raw SQL condition over the files table.")
+    query_parser.add_argument('--limit', type=int)
+    query_parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    if args.command == 'index':
+        index_directory(args.root, args.db, args.pattern, args.workers, not args.no_digest, not args.no_prune)
+    else:
+        _print_rows(query_index(args.db, args.min_side, args.max_side, args.grayscale, args.acm_iterations,
+                                args.acm_a, args.acm_b, args.logistic_r, args.errors, args.where, args.limit),
+                    args.json)
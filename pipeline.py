@@ -0,0 +1,682 @@
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND, USE_GRAYSCALE, SIMULATE_LOW_BANDWIDTH, RESIZE_TARGET,
+    COMPRESSED_ENCRYPTED_FILENAME, DECRYPTED_FILENAME, SENSITIVITY_WORKERS, HEADLESS_REPORT, REPORT_DIR,
+    ROUNDTRIP_DIGEST, ROUNDTRIP_TILE_ROWS, ROUNDTRIP_ALWAYS_METRICS,
+    preprocess_image, encrypt_image, decrypt_image, build_encryption_metadata, steghide_embed_metadata,
+    steghide_extract_metadata, compress_data, decompress_data, calculate_hash_bytes, verify_integrity_compressed,
+    calculate_metrics, plot_histograms, display_images, attach_plaintext_digest, verify_roundtrip,
+)
+from security_metrics import image_entropy, cipher_report
+from raw_io import is_raw_path, load_raw_image
+from report import ReportWriter
+from logs import get_logger, add_logging_arguments, configure_from_args
+from telemetry import get_registry, start_exporters, stop_exporters
+from tracing import trace_span
+
+
+KEY_PARAMS = ('acm_iterations', 'acm_a', 'acm_b', 'logistic_x0', 'logistic_r', 'keystream_backend')
+log = get_logger('pipeline')
+
+_registry = get_registry()
+IMAGES_PROCESSED = _registry.counter('ice_images_processed_total', "Pipeline runs by outcome.", ('status',))
+STAGE_SECONDS = _registry.histogram('ice_stage_duration_seconds', "Wall time of each pipeline stage.", ('stage',))
+STAGE_FAILURES = _registry.counter('ice_stage_failures_total', "Pipeline stages that raised.", ('stage',))
+BYTES_IN = _registry.counter('ice_bytes_in_total', "Plaintext image bytes entering the pipeline.")
+BYTES_OUT = _registry.counter('ice_bytes_out_total', "Compressed ciphertext bytes produced.")
+COMPRESSION_RATIO = _registry.gauge('ice_compression_ratio', "Cipher bytes over compressed bytes for the latest image.")
+INTEGRITY_FAILURES = _registry.counter('ice_integrity_failures_total', "Failed integrity checks by check.", ('check',))
+METADATA_FAILURES = _registry.counter('ice_metadata_extraction_failures_total', "Steganographic metadata that could not be read back.")
+DECRYPTION_ERRORS = _registry.counter('ice_decryption_errors_total', "Decryptions that produced no image.")
+LAST_SUCCESS = _registry.gauge('ice_last_success_timestamp_seconds', "Unix time of the last pipeline run that completed.")
+for _status in ('ok', 'error'):
+    IMAGES_PROCESSED.inc(0, status=_status)
+for _check in ('sha256', 'decompress', 'roundtrip'):
+    INTEGRITY_FAILURES.inc(0, check=_check)
+
+
+class Stage:
+
+    name = None
+    requires = ()
+    provides = ()
+    defaults = {}
+
+    def __init__(self, enabled=True, **config):
+        unknown = sorted(set(config) - set(self.defaults))
+        if unknown:
+            raise ValueError(f"Unknown config for stage '{self.name}': {unknown}. Expected one of {sorted(self.defaults)}.")
+        self.enabled = enabled
+        self.config = dict(self.defaults, **config)
+        self.log = get_logger(f"stage.{self.name}")
+
+    def run(self, ctx):
+
+        raise NotImplementedError
+
+    def __repr__(self):
+
+        state = 'on' if self.enabled else 'off'
+        return f"<{type(self).__name__} {self.name} ({state})>"
+
+
+class PreprocessStage(Stage):
+
+    name = 'preprocess'
+    requires = ('input',)
+    provides = ('image_padded', 'image_unpadded', 'original_size', 'padded', 'grayscale')
+    defaults = {'target_size': RESIZE_TARGET, 'grayscale': USE_GRAYSCALE,
+                'simulate_low_bandwidth': SIMULATE_LOW_BANDWIDTH, 'raw_shape': None}
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 1: Preprocessing ---")
+        img_input = ctx['input']
+        if is_raw_path(img_input):
+            image_padded, original_size, padded = load_raw_image(img_input, self.config['raw_shape'])
+        else:
+            image_padded, original_size, padded = preprocess_image(
+                img_input,
+                target_size=self.config['target_size'],
+                grayscale=self.config['grayscale'],
+                simulate_low_bandwidth=self.config['simulate_low_bandwidth']
+            )
+        if image_padded is None:
+            raise ValueError("Preprocessing failed to produce an image array.")
+
+        h_orig, w_orig = original_size
+        image_unpadded = image_padded
+        if padded:
+            pad_top = (image_padded.shape[0] - h_orig) // 2
+            pad_left = (image_padded.shape[1] - w_orig) // 2
+            image_unpadded = image_padded[pad_top:pad_top + h_orig, pad_left:pad_left + w_orig]
+        if not ctx['zero_copy']:
+            image_unpadded = image_unpadded.copy()
+
+        self.log.debug("Original image dimensions stored for metrics: %s", image_unpadded.shape)
+        self.log.debug("Image array type after preprocessing: %s, shape: %s", image_padded.dtype, image_padded.shape)
+        ctx.update(image_padded=image_padded, image_unpadded=image_unpadded, original_size=original_size,
+                   padded=padded, grayscale=self.config['grayscale'])
+        BYTES_IN.inc(image_unpadded.nbytes)
+
+
+class EncryptStage(Stage):
+
+    name = 'encrypt'
+    requires = ('image_padded',)
+    provides = ('cipher', 'cipher_pre_steg', 'key_params')
+    defaults = {'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+                'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND}
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 2: Encryption (ACM + S-Box + Logistic Map) ---")
+        key_params = {name: self.config[name] for name in KEY_PARAMS}
+        encrypted, encryption_time = encrypt_image(ctx['image_padded'], **key_params)
+        if encrypted is None:
+            raise ValueError("Encryption failed.")
+        self.log.debug("Encrypted image shape (before steg): %s, dtype: %s", encrypted.shape, encrypted.dtype)
+        ctx['times']['encryption'] = encryption_time
+        pre_steg = encrypted
+        if ctx['zero_copy'] and 'cipher_pre_steg' in ctx.get('required', ('cipher_pre_steg',)):
+            self.log.debug("Zero-copy mode: keeping a pre-steg copy of the ciphertext for later stages.")
+            pre_steg = encrypted.copy()
+        ctx.update(cipher=encrypted, cipher_pre_steg=pre_steg, key_params=key_params)
+
+
+class StegStage(Stage):
+
+    name = 'steg'
+    requires = ('cipher', 'key_params', 'image_padded', 'image_unpadded', 'padded', 'grayscale')
+    provides = ('metadata',)
+    defaults = {'extra_params': None, 'plaintext_digest': ROUNDTRIP_DIGEST, 'tile_rows': ROUNDTRIP_TILE_ROWS}
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 2.5: Steganography - Embedding Metadata ---")
+        cipher = ctx['cipher']
+        metadata = build_encryption_metadata(
+            original_shape_unpadded=ctx['image_unpadded'].shape,
+            original_shape_padded=ctx['image_padded'].shape,
+            dtype=ctx['image_padded'].dtype,
+            grayscale=ctx['grayscale'],
+            padded=ctx['padded'],
+            pre_steg_shape=cipher.shape,
+            pre_steg_dtype=cipher.dtype,
+            **ctx['key_params'],
+            **(self.config['extra_params'] or {})
+        )
+        if self.config['plaintext_digest']:
+            _, ctx['times']['digest'] = attach_plaintext_digest(metadata, ctx['image_unpadded'], ctx['image_padded'].shape,
+                                                                self.config['tile_rows'])
+        if ctx['zero_copy']:
+            self.log.debug("Zero-copy mode: embedding metadata into the encrypted buffer in place.")
+        try:
+            steg_image, steg_success = steghide_embed_metadata(cipher, metadata, in_place=ctx['zero_copy'])
+            if steg_success:
+                ctx['cipher'] = steg_image
+                self.log.info("✅ Successfully embedded metadata using LSB steganography.")
+            else:
+                self.log.error("⚠️ Steganography embedding failed, using original encrypted data (without embedded metadata).")
+        except Exception as e:
+            self.log.error("Error during steganography embedding process: %s", e, exc_info=True)
+            self.log.warning("Continuing with original encrypted data (without embedded metadata).")
+        self.log.debug("Final encrypted image shape (after steg attempt): %s, dtype: %s", ctx['cipher'].shape, ctx['cipher'].dtype)
+        ctx['metadata'] = metadata
+
+
+class CompressStage(Stage):
+
+    name = 'compress'
+    requires = ('cipher',)
+    provides = ('compressed',)
+    defaults = {'level': 7}
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 3: Compression (zlib) ---")
+        compressed, compression_time = compress_data(ctx['cipher'], level=self.config['level'])
+        if compressed is None:
+            raise ValueError("Compression failed.")
+        ctx['times']['compression'] = compression_time
+        ctx['compressed'] = compressed
+        BYTES_OUT.inc(len(compressed))
+        if len(compressed):
+            COMPRESSION_RATIO.set(ctx['cipher'].nbytes / len(compressed))
+
+
+class HashStage(Stage):
+
+    name = 'hash'
+    requires = ('compressed',)
+    provides = ('sha256',)
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 4: Hashing Compressed Data ---")
+        ctx['sha256'] = calculate_hash_bytes(ctx['compressed'])
+        self.log.info("Calculated SHA-256 Hash of Compressed Data: %s", ctx['sha256'])
+
+
+class VerifyStage(Stage):
+
+    name = 'verify'
+    requires = ('compressed', 'sha256', 'cipher', 'key_params', 'original_size', 'padded')
+    provides = ('integrity_ok', 'decompressed', 'extracted_metadata', 'decrypted', 'roundtrip_ok')
+
+    def run(self, ctx):
+
+        cipher = ctx['cipher']
+        ctx.update(integrity_ok=verify_integrity_compressed(ctx['compressed'], ctx['sha256']),
+                   decompressed=None, extracted_metadata=None, decrypted=None, roundtrip_ok=None)
+        if not ctx['integrity_ok']:
+            INTEGRITY_FAILURES.inc(check='sha256')
+            self.log.error("Skipping Decompression and Metadata Extraction due to failed integrity check.")
+            self.log.warning("Skipping Decryption.")
+            return
+
+        self.log.info("--- Task 5: Decompression (zlib) ---")
+        decompressed, decompression_time = decompress_data(
+            ctx['compressed'], cipher.shape, cipher.dtype,
+            out=np.empty(cipher.shape, dtype=cipher.dtype) if ctx['zero_copy'] else None
+        )
+        ctx['times']['decompression'] = decompression_time
+        if decompressed is None:
+            INTEGRITY_FAILURES.inc(check='decompress')
+            self.log.error("Decompression failed. Cannot proceed with decryption.")
+            ctx['integrity_ok'] = False
+            self.log.warning("Skipping Decryption.")
+            return
+        self.log.debug("Decompressed image shape: %s, dtype: %s", decompressed.shape, decompressed.dtype)
+        ctx['decompressed'] = decompressed
+
+        self.log.info("--- Task 5.5: Extracting Metadata from Steganography ---")
+        extracted = None
+        try:
+            extracted = steghide_extract_metadata(decompressed)
+            if extracted:
+                if self.log.isEnabledFor(logging.DEBUG):
+                    self.log.debug("--- Steganography Metadata Retrieved ---\n%s", json.dumps(extracted, indent=2))
+            else:
+                self.log.warning("No metadata could be extracted (or extraction failed).")
+        except Exception as e:
+            self.log.error("Metadata extraction process failed unexpectedly: %s", e, exc_info=True)
+        if not extracted:
+            METADATA_FAILURES.inc()
+        ctx['extracted_metadata'] = extracted
+
+        self.log.info("--- Task 6: Decryption (Logistic Map -> Inv S-Box -> Inv ACM -> Unpad) ---")
+        embedded = (extracted or {}).get('encryption_params', {})
+        key_params = {name: embedded.get(name, ctx['key_params'][name]) for name in KEY_PARAMS}
+        dec_orig_shape = tuple(embedded['original_shape_unpadded']) if embedded.get('original_shape_unpadded') else ctx['original_size']
+        dec_padded_flag = embedded.get('padded', ctx['padded'])
+        self.log.info("Using Decryption Parameters: ACM iter=%s, a=%s, b=%s, x0=%s, r=%s, keystream=%s", key_params['acm_iterations'], key_params['acm_a'], key_params['acm_b'], key_params['logistic_x0'], key_params['logistic_r'], key_params['keystream_backend'])
+        self.log.debug("Target Original Shape: %s, Padding Applied Originally: %s", dec_orig_shape, dec_padded_flag)
+
+        decrypted, decryption_time = decrypt_image(
+            decompressed,
+            original_shape_before_padding=dec_orig_shape,
+            padded=dec_padded_flag,
+            in_place=ctx['zero_copy'],
+            **key_params
+        )
+        ctx['times']['decryption'] = decryption_time
+        if decrypted is None:
+            DECRYPTION_ERRORS.inc()
+            self.log.error("Decryption process failed to produce final image.")
+            ctx['integrity_ok'] = False
+        else:
+            self.log.debug("Final decrypted image shape: %s, dtype: %s", decrypted.shape, decrypted.dtype)
+            ctx['roundtrip_ok'], ctx['times']['roundtrip_check'] = verify_roundtrip(decrypted, extracted)
+            if ctx['roundtrip_ok'] is False:
+                INTEGRITY_FAILURES.inc(check='roundtrip')
+        ctx['decrypted'] = decrypted
+
+
+class TimingStage(Stage):
+
+    name = 'timing'
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 7: Performance & Security Analysis ---")
+        self.log.info("--- Timing ---")
+        times = ctx['times']
+        self.log.info("Encryption Time:   %.4fs", times.get('encryption', 0))
+        self.log.info("Compression Time:  %.4fs", times.get('compression', 0))
+        self.log.info("Decompression Time:%.4fs", times.get('decompression', 0))
+        self.log.info("Decryption Time:   %.4fs", times.get('decryption', 0))
+        total_time = sum(times.get(name, 0) for name in ('encryption', 'compression', 'decompression', 'decryption'))
+        self.log.info("Total Time (Enc->Comp->Decomp->Dec): %.4fs", total_time)
+        if ctx.get('image_padded') is not None:
+            self.log.info("Image dimensions processed (padded): %s", ctx['image_padded'].shape)
+        if ctx.get('image_unpadded') is not None:
+            self.log.info("Original unpadded dimensions: %s", ctx['image_unpadded'].shape)
+
+
+class MetricsStage(Stage):
+
+    name = 'metrics'
+    requires = ('image_unpadded', 'decrypted')
+    provides = ('metrics',)
+    defaults = {'always': ROUNDTRIP_ALWAYS_METRICS}
+
+    def run(self, ctx):
+
+        self.log.info("--- Similarity Metrics (Original Unpadded vs Final Decrypted) ---")
+        ctx['metrics'] = None
+        if not (ctx['integrity_ok'] and ctx['decrypted'] is not None):
+            self.log.error("Skipping decrypted metrics calculation (Integrity check failed or decryption error).")
+            try:
+                self.log.info("Entropy (Original):  %.4f", image_entropy(ctx['image_unpadded']))
+            except Exception as e:
+                self.log.warning("Could not calculate original entropy: %s", e)
+            return
+        if ctx.get('roundtrip_ok') and not self.config['always']:
+            self.log.info("Plaintext digest matched; skipping MSE/PSNR/SSIM/entropy passes (set 'always' to force them).")
+            ctx['metrics'] = {'roundtrip_digest': 'match'}
+            return
+        if ctx.get('roundtrip_ok') is False:
+            self.log.info("Plaintext digest mismatched; computing full similarity metrics to characterise the difference.")
+
+        metrics = ctx['metrics'] = calculate_metrics(ctx['image_unpadded'], ctx['decrypted'])
+        self.log.info("MSE:  %.4f", metrics.get('mse', 'N/A'))
+        psnr_val = metrics.get('psnr', 0)
+        psnr_str = f"{psnr_val:.4f} dB" if np.isfinite(psnr_val) else "inf (Perfect Reconstruction)"
+        self.log.info("PSNR: %s", psnr_str)
+        self.log.info("SSIM: %.4f", metrics.get('ssim', 'N/A'))
+        self.log.info("Entropy (Original):  %.4f", metrics.get('entropy_orig', 'N/A'))
+        self.log.info("Entropy (Decrypted): %.4f", metrics.get('entropy_proc', 'N/A'))
+        if metrics.get('mse', 1) < 1e-6 and metrics.get('ssim', 0) > 0.999:
+            self.log.info("✅ Metrics suggest Decryption SUCCESSFUL (Low MSE, High PSNR/SSIM).")
+        else:
+            self.log.warning("⚠️ Warning: Metrics indicate differences between original and decrypted images.")
+
+
+class SecurityStage(Stage):
+
+    name = 'security'
+    requires = ('image_padded', 'image_unpadded', 'cipher_pre_steg', 'key_params')
+    provides = ('security',)
+    defaults = {'good_entropy_threshold': 7.5, 'significant_increase_threshold': 0.5}
+
+    def run(self, ctx):
+
+        self.log.info("--- Security Analysis (Original Unpadded vs Encrypted) ---")
+        ctx['security'] = None
+        try:
+            plain_variant = ctx['image_padded'].copy()
+            plain_variant.reshape(-1)[0] ^= 1
+            cipher_variant, _ = encrypt_image(plain_variant, **ctx['key_params'])
+            report = ctx['security'] = cipher_report(ctx['image_unpadded'], ctx['cipher_pre_steg'], cipher_variant)
+            entropy_original = report['entropy_plain']
+            entropy_encrypted = report['entropy_cipher']
+            self.log.info("Entropy (Original Unpadded): %.4f", entropy_original)
+            self.log.info("Entropy (Encrypted - Pre Steg):  %.4f", entropy_encrypted)
+            self.log.info("Chi-square (Original / Encrypted): %.2f / %.2f", report['chi_square_plain'], report['chi_square_cipher'])
+            for direction, corr_plain in report['correlation_plain'].items():
+                self.log.info("Adjacent correlation (%s): original %.4f, encrypted %.4f", direction, corr_plain, report['correlation_cipher'][direction])
+            self.log.info("NPCR (one-pixel plaintext change): %.4f%%", report['npcr'])
+            self.log.info("UACI (one-pixel plaintext change): %.4f%%", report['uaci'])
+
+            entropy_diff = entropy_encrypted - entropy_original
+            if entropy_encrypted > self.config['good_entropy_threshold'] and entropy_diff > self.config['significant_increase_threshold']:
+                self.log.info("Entropy increased significantly towards ideal random distribution (Good).")
+            elif entropy_diff > 0.1:
+                self.log.info("Entropy increased after encryption (Okay).")
+            else:
+                self.log.warning("Warning: Entropy did not increase significantly after encryption. Encryption might be weak or ineffective.")
+        except Exception as e:
+            self.log.warning("Could not perform entropy analysis: %s", e)
+
+
+class FiguresStage(Stage):
+
+    name = 'figures'
+    requires = ('image_unpadded', 'cipher')
+    provides = ('report_writer',)
+    defaults = {'headless': HEADLESS_REPORT, 'report_dir': REPORT_DIR, 'prefix': '{stem}'}
+
+    def run(self, ctx):
+
+        self.log.info("--- Histograms & Image Display ---")
+        decrypted = ctx.get('decrypted') if ctx.get('integrity_ok') else None
+        ctx['report_writer'] = None
+        if self.config['headless']:
+            report_writer = ctx['report_writer'] = ReportWriter(self.config['report_dir'], prefix=output_path(self.config['prefix'], ctx))
+            report_writer.submit_figures(ctx['image_unpadded'], ctx['cipher'], decrypted)
+            self.log.info("Histogram and image figures queued for background rendering into: %s", self.config['report_dir'])
+        else:
+            plot_histograms(ctx['image_unpadded'], ctx['cipher'], decrypted)
+            display_images(ctx['image_unpadded'], ctx['cipher'], decrypted)
+
+
+class KeySensitivityStage(Stage):
+
+    name = 'key_sensitivity'
+    requires = ('decompressed', 'cipher', 'image_unpadded', 'key_params', 'original_size', 'padded')
+    defaults = {'x0_delta': 1e-9}
+
+    def run(self, ctx):
+
+        self.log.info("--- Key Sensitivity Test ---")
+        if not (ctx['integrity_ok'] and ctx['decompressed'] is not None):
+            self.log.error("Skipping key sensitivity test (Integrity check failed or decompressed data unavailable).")
+            return
+        key_params = dict(ctx['key_params'])
+        key_params['logistic_x0'] += self.config['x0_delta']
+        self.log.info("Attempting decryption with slightly modified key (x0 = %.15f)...", key_params['logistic_x0'])
+        decrypted_wrong_key, _ = decrypt_image(
+            ctx['cipher'] if ctx['zero_copy'] else ctx['decompressed'],
+            original_shape_before_padding=ctx['original_size'],
+            padded=ctx['padded'],
+            **key_params
+        )
+        if decrypted_wrong_key is None:
+            self.log.error("Decryption with wrong key failed to produce an image for comparison.")
+            return
+        metrics_wrong = calculate_metrics(ctx['image_unpadded'], decrypted_wrong_key)
+        self.log.info("Resulting PSNR (Wrong Key): %.4f dB", metrics_wrong.get('psnr', 0))
+        self.log.info("Resulting SSIM (Wrong Key): %.4f", metrics_wrong.get('ssim', 0))
+        if metrics_wrong.get('psnr', 100) < 15 and metrics_wrong.get('ssim', 1) < 0.1:
+            self.log.info("✅ Key sensitivity test PASSED: Decryption with slightly wrong key produced significantly different result.")
+        else:
+            self.log.error("❌ Key sensitivity test FAILED: Decryption with slightly wrong key did not produce a significantly different result (PSNR/SSIM too high). Check algorithm/parameters.")
+
+
+class SensitivitySweepStage(Stage):
+
+    name = 'sensitivity'
+    requires = ('image_padded', 'key_params')
+    provides = ('sensitivity_rows',)
+    defaults = {'workers': SENSITIVITY_WORKERS}
+
+    def run(self, ctx):
+
+        from sensitivity import run_sensitivity_analysis, print_sensitivity_report
+        rows, _ = run_sensitivity_analysis(ctx['image_padded'], params=ctx['key_params'], workers=self.config['workers'])
+        print_sensitivity_report(rows)
+        ctx['sensitivity_rows'] = rows
+
+
+def output_path(template, ctx):
+
+    return template.format(stem=ctx['stem'])
+
+
+class WriteStage(Stage):
+
+    name = 'write'
+    requires = ('compressed',)
+    defaults = {'path': COMPRESSED_ENCRYPTED_FILENAME}
+
+    def run(self, ctx):
+
+        self.log.info("--- Task 8: Saving and Downloading Output ---")
+        path = output_path(self.config['path'], ctx)
+        try:
+            with trace_span("write", bytes_processed=len(ctx['compressed'])), open(path, "wb") as f:
+                f.write(ctx['compressed'])
+            ctx['outputs']['compressed'] = path
+            self.log.info("Compressed encrypted data saved as: %s", path)
+        except Exception as e:
+            self.log.error("Error saving compressed encrypted data: %s", e)
+
+
+class WriteDecryptedStage(Stage):
+
+    name = 'write_decrypted'
+    requires = ('decrypted',)
+    defaults = {'path': DECRYPTED_FILENAME}
+
+    def run(self, ctx):
+
+        decrypted = ctx['decrypted']
+        if not (ctx['integrity_ok'] and decrypted is not None):
+            self.log.error("Final decrypted image not saved (Integrity check failed or decryption error).")
+            return
+        path = output_path(self.config['path'], ctx)
+        try:
+            with trace_span("write", bytes_processed=decrypted.nbytes):
+                Image.fromarray(decrypted.astype(np.uint8, copy=False)).save(path)
+            ctx['outputs']['decrypted'] = path
+            self.log.info("Final decrypted image saved as: %s", path)
+        except Exception as e:
+            self.log.error("Error saving decrypted image: %s", e)
+
+
+STAGE_TYPES = (PreprocessStage, EncryptStage, StegStage, CompressStage, HashStage, VerifyStage, TimingStage,
+               MetricsStage, SecurityStage, FiguresStage, KeySensitivityStage, SensitivitySweepStage,
+               WriteStage, WriteDecryptedStage)
+ENCRYPT_ONLY_STAGES = ('preprocess', 'encrypt', 'steg', 'compress', 'hash', 'write')
+
+
+class Pipeline:
+
+    def __init__(self, stages=(), zero_copy=False):
+        self.zero_copy = zero_copy
+        self.stages = []
+        self._by_name = {}
+        self._plan = None
+        for stage in stages:
+            self.register(stage)
+
+    def register(self, stage):
+
+        if not stage.name:
+            raise ValueError(f"Stage {stage!r} has no name.")
+        if stage.name in self._by_name:
+            raise ValueError(f"A stage named '{stage.name}' is already registered.")
+        self.stages.append(stage)
+        self._by_name[stage.name] = stage
+        self._plan = None
+        return self
+
+    def stage(self, name):
+
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise ValueError(f"Unknown stage '{name}'. Registered stages: {list(self._by_name)}") from None
+
+    def enable(self, *names):
+
+        for name in names:
+            self.stage(name).enabled = True
+        self._plan = None
+        return self
+
+    def disable(self, *names):
+
+        for name in names:
+            self.stage(name).enabled = False
+        self._plan = None
+        return self
+
+    def only(self, *names):
+
+        for name in names:
+            self.stage(name)
+        for stage in self.stages:
+            stage.enabled = stage.name in names
+        self._plan = None
+        return self
+
+    def configure(self, name, **config):
+
+        stage = self.stage(name)
+        unknown = sorted(set(config) - set(stage.defaults))
+        if unknown:
+            raise ValueError(f"Unknown config for stage '{name}': {unknown}. Expected one of {sorted(stage.defaults)}.")
+        stage.config.update(config)
+        return self
+
+    def validate(self, strict=True):
+
+        available = {'input'}
+        plan = []
+        for stage in self.stages:
+            if not stage.enabled:
+                continue
+            missing = [key for key in stage.requires if key not in available]
+            if missing:
+                providers = {key: [s.name for s in self.stages if key in s.provides] for key in missing}
+                hints = ', '.join(f"{key} (from {' or '.join(names) or 'no registered stage'})"
+                                  for key, names in providers.items())
+                if strict:
+                    raise ValueError(f"Stage '{stage.name}' needs {hints}, which no earlier enabled stage provides.")
+                log.info("Disabling stage '%s': needs %s.", stage.name, hints)
+                stage.enabled = False
+                continue
+            available.update(stage.provides)
+            plan.append(stage)
+        if not plan:
+            raise ValueError("No pipeline stages are enabled.")
+        self._plan = tuple(plan)
+        return self._plan
+
+    def describe(self):
+
+        plan = self._plan if self._plan is not None else self.validate()
+        return ' -> '.join(stage.name for stage in plan)
+
+    def new_context(self, img_input):
+
+        stem = os.path.splitext(os.path.basename(img_input))[0] if isinstance(img_input, str) else 'pipeline'
+        return {'input': img_input, 'stem': stem, 'zero_copy': self.zero_copy, 'times': {}, 'stage_times': {},
+                'outputs': {}, 'integrity_ok': False}
+
+    def run(self, img_input, ctx=None):
+
+        plan = self._plan if self._plan is not None else self.validate()
+        ctx = ctx if ctx is not None else self.new_context(img_input)
+        ctx['required'] = frozenset(key for stage in plan for key in stage.requires)
+        for stage in plan:
+            start_time = time.perf_counter()
+            try:
+                with trace_span(f"stage {stage.name}"):
+                    stage.run(ctx)
+            except Exception:
+                STAGE_FAILURES.inc(stage=stage.name)
+                IMAGES_PROCESSED.inc(status='error')
+                raise
+            finally:
+                ctx['stage_times'][stage.name] = elapsed = time.perf_counter() - start_time
+                STAGE_SECONDS.observe(elapsed, stage=stage.name)
+        IMAGES_PROCESSED.inc(status='ok')
+        LAST_SUCCESS.set_to_current_time()
+        return ctx
+
+    def run_many(self, inputs):
+
+        self.validate()
+        results = []
+        for img_input in inputs:
+            ctx = self.new_context(img_input)
+            try:
+                self.run(img_input, ctx)
+            except Exception as e:
+                log.error("Pipeline failed for %s: %s: %s", ctx['stem'], type(e).__name__, e, exc_info=True)
+                ctx['error'] = e
+            results.append(ctx)
+        return results
+
+
+def build_pipeline(stages=None, skip=(), zero_copy=False, config=None, strict=False):
+
+    pipeline = Pipeline([stage_type() for stage_type in STAGE_TYPES], zero_copy=zero_copy)
+    pipeline.disable('sensitivity')
+    if stages is not None:
+        pipeline.only(*stages)
+    pipeline.disable(*skip)
+    for name, stage_config in (config or {}).items():
+        pipeline.configure(name, **stage_config)
+    pipeline.validate(strict)
+    return pipeline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a configurable subset of pipeline stages over many inputs.")
+    parser.add_argument('inputs', nargs='+', help="Input images or .npy/.raw frames.")
+    parser.add_argument('--stages', nargs='+', default=list(ENCRYPT_ONLY_STAGES),
+                        choices=[stage_type.name for stage_type in STAGE_TYPES])
+    parser.add_argument('--skip', nargs='+', default=[])
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--zero-copy', action='store_true')
+    parser.add_argument('--grayscale', action='store_true')
+    parser.add_argument('--metrics-file', default=None, help="Write Prometheus text metrics to this file.")
+    parser.add_argument('--metrics-port', type=int, default=None, help="Serve Prometheus metrics on this local port.")
+    add_logging_arguments(parser, default_level='WARNING')
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    pipeline = build_pipeline(args.stages, args.skip, args.zero_copy, config={
+        'preprocess': {'grayscale': args.grayscale},
+        'write': {'path': os.path.join(args.output_dir, '{stem}.zlib-steg')},
+        'write_decrypted': {'path': os.path.join(args.output_dir, '{stem}_decrypted.png')},
+        'figures': {'report_dir': args.output_dir},
+    })
+    print(f"Pipeline plan: {pipeline.describe()}")
+    start_time = time.perf_counter()
+    exporters = start_exporters(path=args.metrics_file, port=args.metrics_port)
+    try:
+        contexts = pipeline.run_many(args.inputs)
+    finally:
+        stop_exporters(exporters)
+    for ctx in contexts:
+        writer = ctx.get('report_writer')
+        if writer is not None:
+            writer.close()
+    failed = sum('error' in ctx for ctx in contexts)
+    print(f"Processed {len(contexts) - failed}/{len(contexts)} inputs in {time.perf_counter() - start_time:.2f} seconds.")
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,323 @@
+import argparse
+import io
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from core import ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, build_acm_permutation, generate_keystream
+from benchmark import BENCHMARKS, make_input, time_benchmark
+from logs import get_logger, add_logging_arguments, configure_from_args
+from raw_io import is_raw_path, open_raw_input
+from tracing import trace_span
+
+
+CALIBRATION_SIDE = 384
+CALIBRATION_LEVELS = (1, 3, 6, 7, 9)
+CALIBRATION_STAGES = {'acm': 'acm', 'keystream': 'logistic_sequence', 'sbox': 'sbox', 'steg': 'steg_embed',
+                      'decompress': 'decompress', 'hash': 'hash'}
+DEFAULT_COMPRESSION_LEVEL = 7
+MEMORY_HEADROOM = 0.8
+CHUNK_TARGET_SECONDS = 0.02
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+MIN_CHUNKS = 8
+MAX_STREAM_CHUNK_BYTES = 16 * 1024 * 1024
+FALLBACK_SHAPE = (256, 256, 3)
+log = get_logger('planner')
+_calibrations = {}
+
+
+def parse_size(text):
+
+    if text is None or isinstance(text, int):
+        return text
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    text = text.strip().upper().rstrip('B').rstrip('I')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _read_meminfo(path='/proc/meminfo'):
+
+    info = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                parts = value.split()
+                if parts:
+                    info[name] = int(parts[0]) * (1024 if parts[1:] == ['kB'] else 1)
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+def _read_cgroup_limit():
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+
+def probe_resources():
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    meminfo = _read_meminfo()
+    available = meminfo.get('MemAvailable', meminfo.get('MemFree'))
+    cgroup_limit = _read_cgroup_limit()
+    if cgroup_limit is not None:
+        available = min(available, cgroup_limit) if available else cgroup_limit
+    return {'cpus': cpus, 'mem_total': meminfo.get('MemTotal'), 'mem_available': available,
+            'cgroup_limit': cgroup_limit}
+
+
+def probe_input_shape(img_input, grayscale=False, target_size=None, raw_shape=None):
+
+    if isinstance(img_input, str) and is_raw_path(img_input):
+        return tuple(open_raw_input(img_input, raw_shape).shape)
+    if target_size:
+        width, height = target_size
+        return (height, width) if grayscale else (height, width, 3)
+    try:
+        source = io.BytesIO(img_input) if isinstance(img_input, bytes) else img_input
+        if source is None or (isinstance(source, str) and source.startswith(('http://', 'https://'))):
+            raise ValueError("shape is only known after download")
+        with Image.open(source) as img:
+            width, height = img.size
+    except (OSError, ValueError, AttributeError):
+        return FALLBACK_SHAPE[:2] if grayscale else FALLBACK_SHAPE
+    return (height, width) if grayscale else (height, width, 3)
+
+
+def calibrate(channels=3, side=CALIBRATION_SIDE, levels=CALIBRATION_LEVELS):
+
+    key = (channels, side, tuple(levels))
+    if key in _calibrations:
+        return _calibrations[key]
+    log.info("Calibrating planner cost model on a %dx%dx%d sample...", side, side, channels)
+    start_time = time.perf_counter()
+    img = make_input(side, channels, 'photo')
+    costs = {'side': side, 'channels': channels, 'seconds_per_byte': {}, 'compress': {}, 'peak_multiple': {}}
+    for stage, name in CALIBRATION_STAGES.items():
+        fn, nbytes = BENCHMARKS[name](img)
+        timings, _ = time_benchmark(fn, repeats=1, warm_caches=True)
+        costs['seconds_per_byte'][stage] = min(timings) / nbytes
+
+    cipher = np.random.default_rng(0).integers(0, 256, img.size, dtype=np.uint8).tobytes()
+    for level in levels:
+        started = time.perf_counter()
+        compressed = zlib.compress(cipher, level)
+        costs['compress'][level] = {'seconds_per_byte': (time.perf_counter() - started) / len(cipher),
+                                    'ratio': len(compressed) / len(cipher)}
+
+    started = time.perf_counter()
+    build_acm_permutation(side, 10)
+    costs['permutation_seconds_per_pixel_iteration'] = (time.perf_counter() - started) / (side * side * 10)
+
+    for mode, name in (('default', 'pipeline'), ('zero_copy', 'pipeline_zero_copy')):
+        fn, nbytes = BENCHMARKS[name](img)
+        _, peak_bytes = time_benchmark(fn, repeats=0, warm_caches=True)
+        costs['peak_multiple'][mode] = peak_bytes / nbytes
+
+    _, cache_bytes = time_benchmark(lambda: (build_acm_permutation(side, ACM_ITERATIONS, ACM_A, ACM_B),
+                                             generate_keystream(LOGISTIC_X0, LOGISTIC_R, img.size)), repeats=0)
+    costs['cache_multiple'] = cache_bytes / img.nbytes
+    costs['calibration_time'] = time.perf_counter() - start_time
+    log.info("Calibration finished in %.2f seconds (peak %.1fx default, %.1fx zero-copy, "
+             "plus %.1fx for permutation/keystream construction or caching).", costs['calibration_time'],
+             costs['peak_multiple']['default'], costs['peak_multiple']['zero_copy'], costs['cache_multiple'])
+    _calibrations[key] = costs
+    return costs
+
+
+def load_or_calibrate(path=None, channels=3):
+
+    if path and os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+        costs = stored.get(str(channels))
+        if costs is not None:
+            costs['compress'] = {int(level): entry for level, entry in costs['compress'].items()}
+            return costs
+    costs = calibrate(channels)
+    if path:
+        stored = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                stored = json.load(f)
+        stored[str(channels)] = costs
+        with open(path, 'w') as f:
+            json.dump(stored, f, indent=2)
+    return costs
+
+
+def _clamp(value, low, high):
+
+    return max(low, min(high, value))
+
+
+def plan_execution(shape, memory_limit=None, link_mbps=None, iterations=10, resources=None, costs=None,
+                   calibration_file=None):
+
+    resources = resources or probe_resources()
+    channels = shape[2] if len(shape) == 3 else 1
+    costs = costs or load_or_calibrate(calibration_file, channels)
+    side = max(shape[:2])
+    nbytes = side * side * channels
+    available = resources['mem_available']
+    if memory_limit is None:
+        memory_limit = int(available * MEMORY_HEADROOM) if available else None
+    notes = []
+    if memory_limit is not None and available and memory_limit > available:
+        notes.append(f"Memory ceiling {memory_limit / 1e9:.2f} GB exceeds the {available / 1e9:.2f} GB currently available.")
+
+    per_byte = costs['seconds_per_byte']
+    cache_bytes = int(costs.get('cache_multiple', 0) * nbytes)
+    peak = {mode: int(multiple * nbytes) + cache_bytes for mode, multiple in costs['peak_multiple'].items()}
+    zero_copy = False
+    fits = True
+    if memory_limit is not None and peak['default'] > memory_limit:
+        zero_copy = peak['zero_copy'] < peak['default']
+        if zero_copy:
+            notes.append(f"Default mode needs ~{peak['default'] / 1e9:.2f} GB; switching to zero-copy buffers.")
+        if min(peak.values()) > memory_limit:
+            fits = False
+            notes.append(f"Even the leanest mode needs ~{min(peak.values()) / 1e9:.2f} GB; use raw_io streaming "
+                         f"(memory-mapped .npy input) or raise the ceiling.")
+    image_peak = peak['zero_copy' if zero_copy else 'default']
+
+    level = DEFAULT_COMPRESSION_LEVEL
+    if link_mbps:
+        def transfer_cost(candidate):
+            entry = costs['compress'][candidate]
+            return nbytes * entry['seconds_per_byte'] + nbytes * entry['ratio'] * 8 / (link_mbps * 1e6)
+        level = min(costs['compress'], key=transfer_cost)
+        if level != DEFAULT_COMPRESSION_LEVEL:
+            notes.append(f"zlib level {level} minimises compress + transfer time on a {link_mbps:g} Mbit/s link.")
+    compress_per_byte = costs['compress'].get(level, costs['compress'][max(costs['compress'])])['seconds_per_byte']
+
+    stage_seconds = {
+        'acm_permutation': costs['permutation_seconds_per_pixel_iteration'] * side * side * iterations,
+        'acm': per_byte['acm'] * nbytes,
+        'sbox': per_byte['sbox'] * nbytes,
+        'keystream': per_byte['keystream'] * nbytes,
+        'steg': per_byte['steg'] * nbytes,
+        'compress': compress_per_byte * nbytes,
+        'hash': per_byte['hash'] * nbytes,
+    }
+    encrypt_seconds = sum(stage_seconds.values())
+
+    cpus = resources['cpus']
+    if memory_limit is not None:
+        batch_workers = _clamp(memory_limit // max(image_peak, 1), 1, cpus)
+        spare = memory_limit - image_peak
+        sensitivity_workers = _clamp(spare // max(image_peak, 1), 1, cpus)
+    else:
+        batch_workers = sensitivity_workers = cpus
+    if memory_limit is not None and batch_workers < cpus:
+        notes.append(f"Memory allows {batch_workers} concurrent images on {cpus} CPUs.")
+
+    receive_per_byte = per_byte['keystream'] + per_byte['sbox'] + per_byte['decompress'] + per_byte['hash']
+    chunk_bytes = int(_clamp(CHUNK_TARGET_SECONDS / max(receive_per_byte, 1e-12), MIN_CHUNK_BYTES, MAX_CHUNK_BYTES))
+    chunk_bytes = int(_clamp(min(chunk_bytes, nbytes // MIN_CHUNKS), channels, MAX_CHUNK_BYTES))
+    chunk_bytes -= chunk_bytes % channels
+    stream_chunk_bytes = MAX_STREAM_CHUNK_BYTES
+    if memory_limit is not None:
+        stream_chunk_bytes = int(_clamp(max(memory_limit - image_peak, 0) // 16, 1 << 20, MAX_STREAM_CHUNK_BYTES))
+
+    plan = {
+        'shape': list(shape),
+        'padded_side': side,
+        'image_bytes': nbytes,
+        'cpus': cpus,
+        'memory_available': available,
+        'memory_limit': memory_limit,
+        'zero_copy': zero_copy,
+        'estimated_peak_bytes': image_peak,
+        'fits': fits,
+        'batch_workers': int(batch_workers),
+        'sensitivity_workers': int(sensitivity_workers),
+        'compression_level': level,
+        'transport_chunk_bytes': chunk_bytes,
+        'keystream_block': chunk_bytes,
+        'stream_chunk_bytes': stream_chunk_bytes,
+        'estimated_stage_seconds': stage_seconds,
+        'estimated_encrypt_seconds': encrypt_seconds,
+        'estimated_throughput_mb_s': nbytes / encrypt_seconds / 1e6 * batch_workers if encrypt_seconds else None,
+        'link_mbps': link_mbps,
+        'notes': notes,
+    }
+    return plan
+
+
+def record_plan(plan):
+
+    attrs = {name: value for name, value in plan.items() if isinstance(value, (int, float, bool, str)) or value is None}
+    attrs['plan'] = json.dumps(plan)
+    with trace_span("execution plan", **attrs):
+        pass
+    return plan
+
+
+def apply_plan(pipeline, plan):
+
+    pipeline.zero_copy = plan['zero_copy']
+    pipeline.configure('compress', level=plan['compression_level'])
+    pipeline.configure('sensitivity', workers=plan['sensitivity_workers'])
+    return record_plan(plan)
+
+
+def print_plan(plan):
+
+    print("--- Execution Plan ---")
+    print(f"Input: {tuple(plan['shape'])} -> padded side {plan['padded_side']} ({plan['image_bytes'] / 1e6:.1f} MB)")
+    limit = f"{plan['memory_limit'] / 1e9:.2f} GB" if plan['memory_limit'] else "none"
+    print(f"CPUs: {plan['cpus']}, memory ceiling: {limit}, estimated peak: {plan['estimated_peak_bytes'] / 1e6:.1f} MB")
+    print(f"Zero-copy: {plan['zero_copy']}, zlib level: {plan['compression_level']}, "
+          f"batch workers: {plan['batch_workers']}, sensitivity workers: {plan['sensitivity_workers']}")
+    print(f"Transport chunk: {plan['transport_chunk_bytes']} bytes, stream chunk: {plan['stream_chunk_bytes']} bytes")
+    for stage, seconds in plan['estimated_stage_seconds'].items():
+        print(f"  {stage:<16} ~{seconds:.4f}s")
+    if plan['estimated_throughput_mb_s']:
+        print(f"Estimated encrypt throughput: {plan['estimated_throughput_mb_s']:.1f} MB/s")
+    for note in plan['notes']:
+        print(f"Note: {note}")
+    if not plan['fits']:
+        print("⚠️ Warning: The input is not expected to fit under the memory ceiling.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan workers, chunk sizes and zlib level for this host and input.")
+    add_logging_arguments(parser)
+    parser.add_argument('--input', default=None, help="Image or .npy/.raw frame to plan for.")
+    parser.add_argument('--shape', type=int, nargs='+', default=None, help="H W [C] instead of --input.")
+    parser.add_argument('--grayscale', action='store_true')
+    parser.add_argument('--memory-limit', default=None, help="Memory ceiling, e.g. 4G or 512M. Defaults to 80%% of available.")
+    parser.add_argument('--link-mbps', type=float, default=None, help="Link rate used to trade zlib level against transfer time.")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--calibration-file', default=None, help="Cache calibration results in this JSON file.")
+    parser.add_argument('--json', action='store_true', help="Print the plan as JSON.")
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    shape = tuple(args.shape) if args.shape else probe_input_shape(args.input, args.grayscale)
+    plan = plan_execution(shape, parse_size(args.memory_limit), args.link_mbps, args.iterations,
+                          calibration_file=args.calibration_file)
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print_plan(plan)
@@ -0,0 +1,198 @@
+import collections
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+import tracing
+from tracing import get_tracer
+
+
+DEFAULT_INTERVAL = 0.001
+DEFAULT_TOP_N = 20
+UNATTRIBUTED_STAGE = '(no stage)'
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.abspath(tracing.__file__)}
+
+
+def _is_skipped(filename, _cache={}):
+
+    skipped = _cache.get(filename)
+    if skipped is None:
+        skipped = _cache[filename] = os.path.abspath(filename) in _SKIPPED_FILES
+    return skipped
+
+
+def _frame_label(code):
+
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = collections.Counter()
+        self.lines = collections.Counter()
+        self.sample_count = 0
+        self.mode = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._previous_handler = None
+        self.cpu_seconds = 0.0
+        self._cpu_start = None
+
+    def _record(self, frame):
+
+        codes = []
+        leaf = frame
+        while frame is not None:
+            if not _is_skipped(frame.f_code.co_filename):
+                codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+        tracer = get_tracer()
+        stage = tracer.current_path(self.thread_id) if tracer is not None else None
+        self.stacks[(stage or UNATTRIBUTED_STAGE, tuple(reversed(codes)))] += 1
+        self.lines[(leaf.f_code.co_filename, leaf.f_code.co_name, leaf.f_lineno)] += 1
+        self.sample_count += 1
+
+    def _on_signal(self, signum, frame):
+
+        self._record(frame)
+
+    def _sample_thread(self):
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def start(self):
+
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        use_signal = (hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+                      and self.thread_id == threading.main_thread().ident)
+        self._cpu_start = time.process_time()
+        if use_signal:
+            self.mode = 'signal'
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self.mode = 'thread'
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_thread, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+
+        if self.mode == 'signal':
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        elif self.mode == 'thread':
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.mode = None
+        self.cpu_seconds += time.process_time() - self._cpu_start
+
+    def collapsed_stacks(self):
+
+        lines = []
+        for (stage, codes), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            frames = stage.split('/') + [_frame_label(code) for code in codes]
+            lines.append(f"{';'.join(frames)} {count}")
+        return lines
+
+    def write_collapsed(self, path):
+
+        with open(path, 'w') as f:
+            for line in self.collapsed_stacks():
+                f.write(line + '\n')
+        return path
+
+    def stage_totals(self):
+
+        totals = collections.Counter()
+        for (stage, _), count in self.stacks.items():
+            totals[stage] += count
+        return totals
+
+    def function_totals(self):
+
+        self_counts = collections.Counter()
+        total_counts = collections.Counter()
+        for (_, codes), count in self.stacks.items():
+            self_counts[_frame_label(codes[-1])] += count
+            for label in {_frame_label(code) for code in codes}:
+                total_counts[label] += count
+        return self_counts, total_counts
+
+    def print_report(self, top_n=DEFAULT_TOP_N):
+
+        total = max(self.sample_count, 1)
+        effective_ms = 1000.0 * self.cpu_seconds / total
+        print(f"--- Sampling Profile ({self.sample_count} samples over {self.cpu_seconds:.2f}s CPU, "
+              f"requested {self.interval * 1000:.1f} ms / effective {effective_ms:.1f} ms per sample) ---")
+        print(f"{'Stage':<48} {'Samples':>8} {'%':>6}")
+        for stage, count in self.stage_totals().most_common():
+            print(f"{stage:<48} {count:>8} {100.0 * count / total:>6.1f}")
+
+        self_counts, total_counts = self.function_totals()
+        print(f"--- Top {top_n} Functions (self samples) ---")
+        print(f"{'Function':<48} {'Self':>8} {'Self %':>7} {'Total %':>8}")
+        for label, count in self_counts.most_common(top_n):
+            print(f"{label:<48} {count:>8} {100.0 * count / total:>7.1f} {100.0 * total_counts[label] / total:>8.1f}")
+
+        print(f"--- Top {top_n} Lines ---")
+        for (filename, name, lineno), count in self.lines.most_common(top_n):
+            location = f"{os.path.basename(filename)}:{lineno if lineno is not None else '?'} ({name})"
+            print(f"{location:<48} {count:>8} {100.0 * count / total:>7.1f}")
+
+
+class PipelineProfiler:
+
+    def __init__(self, interval=DEFAULT_INTERVAL, output_prefix='pipeline_profile', top_n=DEFAULT_TOP_N):
+        self.output_prefix = output_prefix
+        self.top_n = top_n
+        self.sampler = SamplingProfiler(interval=interval)
+        self.cprofile = cProfile.Profile()
+
+    def start(self):
+
+        self.sampler.start()
+        self.cprofile.enable()
+        return self
+
+    def stop(self):
+
+        self.cprofile.disable()
+        self.sampler.stop()
+
+    def cprofile_table(self, sort='cumulative'):
+
+        stream = io.StringIO()
+        pstats.Stats(self.cprofile, stream=stream).strip_dirs().sort_stats(sort).print_stats(self.top_n)
+        return stream.getvalue()
+
+    def report(self):
+
+        self.sampler.print_report(self.top_n)
+        print(f"--- cProfile Top {self.top_n} (cumulative) ---")
+        print(self.cprofile_table())
+
+        outputs = {
+            'collapsed': self.sampler.write_collapsed(f"{self.output_prefix}.collapsed"),
+            'cprofile': f"{self.output_prefix}.prof",
+        }
+        self.cprofile.dump_stats(outputs['cprofile'])
+        for kind, path in outputs.items():
+            print(f"Profile output ({kind}): {os.path.abspath(path)}")
+        return outputs
@@ -0,0 +1,225 @@
+import io
+import json
+import time
+
+import numpy as np
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R,
+    encrypt_image, decrypt_image, compress_data, decompress_data,
+    calculate_hash_bytes, verify_integrity_compressed, build_encryption_metadata,
+)
+from logs import get_logger
+
+
+PROGRESSIVE_MAGIC = b'ICEPROG1'
+PROGRESSIVE_MODES = ('residual', 'downscale')
+MIN_LEVEL_SIZE = 16
+log = get_logger('progressive')
+
+
+def downscale_level(img_array):
+
+    h, w = img_array.shape[:2]
+    if h % 2 or w % 2:
+        pad_width = ((0, h % 2), (0, w % 2)) + ((0, 0),) * (img_array.ndim - 2)
+        img_array = np.pad(img_array, pad_width, mode='edge')
+    blocks = img_array.reshape(img_array.shape[0] // 2, 2, img_array.shape[1] // 2, 2, *img_array.shape[2:])
+    summed = blocks.sum(axis=(1, 3), dtype=np.uint16)
+    return ((summed + 2) // 4).astype(np.uint8)
+
+
+def upscale_level(img_array, target_shape):
+
+    upscaled = np.repeat(np.repeat(img_array, 2, axis=0), 2, axis=1)
+    return upscaled[:target_shape[0], :target_shape[1]]
+
+
+def build_resolution_pyramid(img_array, levels=4, mode='residual'):
+
+    if mode not in PROGRESSIVE_MODES:
+        raise ValueError(f"Unknown progressive mode '{mode}'. Expected one of {PROGRESSIVE_MODES}.")
+    if img_array.shape[0] != img_array.shape[1]:
+        raise ValueError("Progressive encoding requires a square image. Please pad first.")
+
+    full_levels = [img_array.astype(np.uint8, copy=False)]
+    while len(full_levels) < levels and full_levels[-1].shape[0] // 2 >= MIN_LEVEL_SIZE:
+        full_levels.append(downscale_level(full_levels[-1]))
+    full_levels.reverse()
+
+
+    layers = [full_levels[0]]
+    for coarser, finer in zip(full_levels, full_levels[1:]):
+        if mode == 'residual':
+            layers.append(finer - upscale_level(coarser, finer.shape))
+        else:
+            layers.append(finer)
+    return layers
+
+
+def pack_layer_frame(header, payload):
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return (len(header_bytes).to_bytes(4, byteorder='big') + header_bytes +
+            len(payload).to_bytes(4, byteorder='big') + payload)
+
+
+def unpack_layer_frame(frame_bytes):
+
+    header_length = int.from_bytes(frame_bytes[:4], byteorder='big')
+    header = json.loads(bytes(frame_bytes[4:4 + header_length]).decode('utf-8'))
+    payload_start = 8 + header_length
+    payload_length = int.from_bytes(frame_bytes[4 + header_length:payload_start], byteorder='big')
+    payload = bytes(frame_bytes[payload_start:payload_start + payload_length])
+    if len(payload) != payload_length:
+        raise ValueError(f"Frame truncated: expected {payload_length} payload bytes, got {len(payload)}.")
+    return header, payload
+
+
+def iter_progressive_layers(img_array, levels=4, mode='residual',
+                            acm_iterations=ACM_ITERATIONS, logistic_x0=LOGISTIC_X0, logistic_r=LOGISTIC_R,
+                            acm_a=ACM_A, acm_b=ACM_B, original_shape_unpadded=None, padded=False, grayscale=False):
+
+    layers = build_resolution_pyramid(img_array, levels=levels, mode=mode)
+    log.debug("Built %d-level resolution pyramid (%s): %s", len(layers), mode, [layer.shape[0] for layer in layers])
+
+
+    keystream_offset = 0
+    for level, layer in enumerate(layers):
+        encrypted_layer, _ = encrypt_image(layer, acm_iterations, logistic_x0, logistic_r,
+                                           acm_a=acm_a, acm_b=acm_b, keystream_offset=keystream_offset)
+        compressed_layer, _ = compress_data(encrypted_layer)
+        if compressed_layer is None:
+            raise ValueError(f"Compression failed for progressive level {level}.")
+
+        metadata = build_encryption_metadata(
+            acm_iterations=acm_iterations,
+            acm_a=acm_a,
+            acm_b=acm_b,
+            logistic_x0=logistic_x0,
+            logistic_r=logistic_r,
+            original_shape_unpadded=original_shape_unpadded if original_shape_unpadded is not None else img_array.shape,
+            original_shape_padded=img_array.shape,
+            dtype=img_array.dtype,
+            grayscale=grayscale,
+            padded=padded,
+            pre_steg_shape=encrypted_layer.shape,
+            pre_steg_dtype=encrypted_layer.dtype,
+            keystream_offset=keystream_offset
+        )
+        header = {
+            "level": level,
+            "num_levels": len(layers),
+            "mode": mode,
+            "shape": list(encrypted_layer.shape),
+            "dtype": str(encrypted_layer.dtype),
+            "payload_sha256": calculate_hash_bytes(compressed_layer),
+            "metadata": metadata
+        }
+        keystream_offset += layer.size
+        yield pack_layer_frame(header, compressed_layer)
+
+
+def encode_progressive(img_array, **kwargs):
+
+    log.debug("Starting Progressive Encoding...")
+    start_time = time.perf_counter()
+    frames = []
+    for frame in iter_progressive_layers(img_array, **kwargs):
+        frames.append(frame)
+        log.debug("Level %d ready: %d bytes (cumulative %d bytes)", len(frames) - 1, len(frame), sum(len(f) for f in frames))
+    encoding_time = time.perf_counter() - start_time
+    log.debug("Progressive encoding completed in %.4f seconds.", encoding_time)
+    return frames, encoding_time
+
+
+def write_progressive_stream(frames, fileobj):
+
+    fileobj.write(PROGRESSIVE_MAGIC)
+    for frame in frames:
+        fileobj.write(frame)
+        fileobj.flush()
+
+
+def _read_exact(fileobj, size):
+
+    data = fileobj.read(size)
+    if len(data) != size:
+        return None
+    return data
+
+
+def read_progressive_frames(fileobj):
+
+    if isinstance(fileobj, (bytes, bytearray)):
+        fileobj = io.BytesIO(fileobj)
+    if _read_exact(fileobj, len(PROGRESSIVE_MAGIC)) != PROGRESSIVE_MAGIC:
+        raise ValueError("Not a progressive stream (bad magic).")
+
+    while True:
+        length_bytes = _read_exact(fileobj, 4)
+        if length_bytes is None:
+            return
+        header_bytes = _read_exact(fileobj, int.from_bytes(length_bytes, byteorder='big'))
+        payload_length_bytes = _read_exact(fileobj, 4) if header_bytes is not None else None
+        payload = _read_exact(fileobj, int.from_bytes(payload_length_bytes, byteorder='big')) if payload_length_bytes is not None else None
+        if payload is None:
+            log.warning("Progressive stream truncated mid-layer. Stopping at the last complete layer.")
+            return
+        yield json.loads(header_bytes.decode('utf-8')), payload
+
+
+def _crop_padding(image, encryption_params):
+
+    if not encryption_params.get('padded'):
+        return image
+    padded_h, padded_w = encryption_params['original_shape_padded'][:2]
+    orig_h, orig_w = encryption_params['original_shape_unpadded'][:2]
+    scale = image.shape[0] / padded_h
+    if scale != 1:
+        orig_h = max(1, int(round(orig_h * scale)))
+        orig_w = max(1, int(round(orig_w * scale)))
+    pad_top = (image.shape[0] - orig_h) // 2
+    pad_left = (image.shape[1] - orig_w) // 2
+    return image[pad_top : pad_top + orig_h, pad_left : pad_left + orig_w]
+
+
+def decode_progressive(frames, max_layers=None):
+
+    previous = None
+    for header, payload in frames:
+        level = header['level']
+        if max_layers is not None and level >= max_layers:
+            return
+        if not verify_integrity_compressed(payload, header['payload_sha256']):
+            log.error("Integrity check failed for progressive level %d. Stopping.", level)
+            return
+
+        encryption_params = header['metadata']['encryption_params']
+        encrypted_layer, _ = decompress_data(payload, tuple(header['shape']), header['dtype'])
+        if encrypted_layer is None:
+            log.error("Decompression failed for progressive level %d. Stopping.", level)
+            return
+        layer, _ = decrypt_image(
+            encrypted_layer,
+            acm_iterations=encryption_params['acm_iterations'],
+            logistic_x0=encryption_params['logistic_x0'],
+            logistic_r=encryption_params['logistic_r'],
+            original_shape_before_padding=encrypted_layer.shape,
+            padded=False,
+            acm_a=encryption_params['acm_a'],
+            acm_b=encryption_params['acm_b'],
+            keystream_offset=encryption_params.get('keystream_offset', 0)
+        )
+        if layer is None:
+            log.error("Decryption failed for progressive level %d. Stopping.", level)
+            return
+
+        if header['mode'] == 'residual' and level > 0:
+            if previous is None:
+                raise ValueError(f"Residual level {level} cannot be reconstructed without level {level - 1}.")
+            image = layer + upscale_level(previous, layer.shape)
+        else:
+            image = layer
+        previous = image
+        yield level, _crop_padding(image, encryption_params)
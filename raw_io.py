@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND,
+    encrypt_image, acm_permutation, cached_keystream, inv_s_box_np, byte_view,
+    steghide_embed_metadata, build_encryption_metadata,
+)
+from logs import get_logger, add_logging_arguments, configure_from_args
+from metadata_index import read_steg_metadata
+
+
+RAW_EXTENSIONS = ('.npy', '.raw', '.bin')
+STREAM_CHUNK_BYTES = 16 * 1024 * 1024
+COMPRESSION_LEVEL = 7
+log = get_logger('raw_io')
+
+
+def is_raw_path(path):
+
+    return isinstance(path, str) and path.lower().endswith(RAW_EXTENSIONS)
+
+
+def open_raw_input(path, shape=None, dtype=np.uint8, offset=0):
+
+    if path.lower().endswith('.npy'):
+        array = np.load(path, mmap_mode='r')
+    else:
+        if shape is None:
+            raise ValueError(f"Raw frame '{path}' needs an explicit shape (H, W[, C]).")
+        array = np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape), offset=offset)
+    if array.dtype != np.uint8:
+        raise ValueError(f"Raw input must be uint8, got {array.dtype}.")
+    if array.ndim not in [2, 3]:
+        raise ValueError(f"Raw input must be a 2D or 3D array, got shape {array.shape}.")
+    return array
+
+
+def load_raw_image(path, shape=None, dtype=np.uint8, offset=0):
+
+    array = open_raw_input(path, shape, dtype, offset)
+    h, w = array.shape[:2]
+    log.debug("Memory-mapped raw input %s: shape %s", path, array.shape)
+    if h == w:
+        return array, (w, h), False
+    max_dim = max(h, w)
+    pad_h, pad_w = max_dim - h, max_dim - w
+    padded = np.zeros((max_dim, max_dim) + array.shape[2:], dtype=np.uint8)
+    padded[pad_h // 2:pad_h // 2 + h, pad_w // 2:pad_w // 2 + w] = array
+    log.debug("Image is not square (%dx%d). Padded to %s.", h, w, padded.shape[:2])
+    return padded, (w, h), True
+
+
+def _row_chunks(array, chunk_bytes=STREAM_CHUNK_BYTES):
+
+    array = np.ascontiguousarray(array)
+    flat = array.reshape(array.shape[0], -1)
+    rows = max(1, chunk_bytes // max(flat.shape[1] * flat.itemsize, 1))
+    for start in range(0, flat.shape[0], rows):
+        yield byte_view(flat[start:start + rows])
+
+
+def compress_to_file(array, path, level=COMPRESSION_LEVEL, chunk_bytes=STREAM_CHUNK_BYTES):
+
+    log.debug("Streaming compression to %s...", path)
+    start_time = time.perf_counter()
+    compressor = zlib.compressobj(level)
+    hasher = hashlib.sha256()
+    written = 0
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in _row_chunks(array, chunk_bytes):
+                piece = compressor.compress(chunk)
+                if piece:
+                    f.write(piece)
+                    hasher.update(piece)
+                    written += len(piece)
+            tail = compressor.flush()
+            f.write(tail)
+            hasher.update(tail)
+            written += len(tail)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    compression_time = time.perf_counter() - start_time
+    ratio = written / array.nbytes if array.nbytes else 0
+    log.info("Streamed %d bytes into %d compressed bytes (ratio %.4f) in %.4f seconds.", array.nbytes, written, ratio, compression_time)
+    return hasher.hexdigest(), written, compression_time
+
+
+def decompress_from_file(path, shape, dtype=np.uint8, out=None, chunk_bytes=STREAM_CHUNK_BYTES):
+
+    log.debug("Streaming decompression from %s...", path)
+    start_time = time.perf_counter()
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    target = byte_view(out)
+    decompressor = zlib.decompressobj()
+    filled = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                break
+            data = decompressor.decompress(chunk)
+            if filled + len(data) > len(target):
+                raise ValueError(f"Decompressed data exceeds expected size {len(target)} for shape {shape}.")
+            target[filled:filled + len(data)] = data
+            filled += len(data)
+    tail = decompressor.flush()
+    if tail:
+        if filled + len(tail) > len(target):
+            raise ValueError(f"Decompressed data exceeds expected size {len(target)} for shape {shape}.")
+        target[filled:filled + len(tail)] = tail
+        filled += len(tail)
+    if filled != len(target):
+        raise ValueError(f"Decompressed byte count ({filled}) does not match expected count ({len(target)}).")
+    log.debug("Decompression completed in %.4f seconds.", time.perf_counter() - start_time)
+    return out
+
+
+def decrypt_into(encrypted, out, acm_iterations, logistic_x0, logistic_r, original_shape_before_padding,
+                 padded, acm_a=1, acm_b=1, keystream_backend='logistic'):
+
+    size = encrypted.shape[0]
+    keystream = cached_keystream(logistic_x0, logistic_r, encrypted.size, backend=keystream_backend)
+    substituted = inv_s_box_np[np.bitwise_xor(encrypted.reshape(-1), keystream)]
+    substituted = substituted.reshape(size * size, -1)
+    forward, _ = acm_permutation(size, acm_iterations, acm_a, acm_b)
+    positions = forward.reshape(size, size)
+    if padded:
+        orig_h, orig_w = original_shape_before_padding[:2]
+        top, left = (size - orig_h) // 2, (size - orig_w) // 2
+        positions = positions[top:top + orig_h, left:left + orig_w]
+    np.take(substituted, positions.reshape(-1), axis=0, out=out.reshape(positions.size, -1))
+    return out
+
+
+def encrypt_raw_file(input_path, output_path, shape=None, params=None):
+
+    key_params = {
+        'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+        'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND,
+    }
+    key_params.update(params or {})
+    image, (width, height), padded = load_raw_image(input_path, shape)
+    encrypted, encryption_time = encrypt_image(image, **key_params)
+    metadata = build_encryption_metadata(
+        original_shape_unpadded=(height, width) + image.shape[2:],
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=image.ndim == 2,
+        padded=padded,
+        pre_steg_shape=encrypted.shape,
+        pre_steg_dtype=encrypted.dtype,
+        **key_params
+    )
+    steg_image, steg_success = steghide_embed_metadata(encrypted, metadata)
+    if not steg_success:
+        raise ValueError("Steganography embedding failed; raw output requires embedded metadata.")
+    digest, compressed_size, compression_time = compress_to_file(steg_image, output_path)
+    return {
+        'output_path': output_path,
+        'sha256': digest,
+        'compressed_size': compressed_size,
+        'encrypted_shape': list(encrypted.shape),
+        'encryption_time': encryption_time,
+        'compression_time': compression_time,
+    }
+
+
+def decrypt_raw_file(input_path, output_npy, expected_sha256=None, params=None):
+
+    metadata, digest, error = read_steg_metadata(input_path, with_digest=expected_sha256 is not None)
+    if metadata is None:
+        raise ValueError(f"Could not read embedded metadata from {input_path}: {error}")
+    if expected_sha256 is not None and digest != expected_sha256:
+        raise ValueError("Integrity check failed: hashes do not match.")
+    encryption_params = metadata['encryption_params']
+    key_params = {name: encryption_params[name]
+                  for name in ('acm_iterations', 'acm_a', 'acm_b', 'logistic_x0', 'logistic_r')}
+    key_params['keystream_backend'] = encryption_params.get('keystream_backend', 'logistic')
+    key_params.update(params or {})
+
+    encrypted = decompress_from_file(input_path, tuple(encryption_params['pre_steg_shape']),
+                                     encryption_params.get('pre_steg_dtype', 'uint8'))
+    log.debug("Starting Decryption into memory-mapped output...")
+    start_time = time.perf_counter()
+    out_shape = tuple(encryption_params['original_shape_unpadded'])
+    out = np.lib.format.open_memmap(output_npy, mode='w+', dtype=np.uint8, shape=out_shape)
+    try:
+        decrypt_into(encrypted, out, original_shape_before_padding=out_shape,
+                     padded=encryption_params.get('padded', False), **key_params)
+        out.flush()
+    finally:
+        del out
+    decryption_time = time.perf_counter() - start_time
+    log.info("Decryption completed in %.4f seconds. Output: %s", decryption_time, output_npy)
+    return output_npy, decryption_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped raw frame encryption and decryption.")
+    add_logging_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    encrypt_parser = subparsers.add_parser('encrypt', help="Encrypt a .npy or raw uint8 frame.")
+    encrypt_parser.add_argument('input')
+    encrypt_parser.add_argument('output')
+    encrypt_parser.add_argument('--shape', type=int, nargs='+', help="H W [C] for headerless raw frames.")
+    decrypt_parser = subparsers.add_parser('decrypt', help="Decrypt a .zlib-steg file into a .npy memmap.")
+    decrypt_parser.add_argument('input')
+    decrypt_parser.add_argument('output')
+    decrypt_parser.add_argument('--sha256', default=None)
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    if args.command == 'encrypt':
+        result = encrypt_raw_file(args.input, args.output, args.shape)
+        print(f"SHA-256 of compressed output: {result['sha256']}")
+    else:
+        decrypt_raw_file(args.input, args.output, args.sha256)
@@ -0,0 +1,183 @@
+import datetime
+import html
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from logs import get_logger
+from security_metrics import byte_histogram
+
+
+THUMBNAIL_MAX_SIDE = 512
+CHANNEL_COLORS = ('r', 'g', 'b')
+DEFAULT_LABELS = ('Original (Unpadded)', 'Encrypted (Padded)', 'Decrypted (Final)')
+log = get_logger('report')
+
+
+def channel_histograms(img):
+
+    if img.ndim == 2:
+        return [byte_histogram(img)]
+    return [byte_histogram(img[:, :, c]) for c in range(img.shape[2])]
+
+
+def _thumbnail(img):
+
+    step = max(1, int(np.ceil(max(img.shape[:2]) / THUMBNAIL_MAX_SIDE)))
+    return img[::step, ::step]
+
+
+def _save_figure(fig, path):
+
+    FigureCanvasAgg(fig)
+    fig.savefig(path, dpi=100)
+    return path
+
+
+def render_histograms(images, path, labels=DEFAULT_LABELS, title='Image Histograms'):
+
+    fig = Figure(figsize=(6 * len(images), 5))
+    fig.suptitle(title, fontsize=16)
+    axes = fig.subplots(1, len(images), squeeze=False)[0]
+    intensities = np.arange(256)
+    for ax, img, label in zip(axes, images, labels):
+        if img is None or not isinstance(img, np.ndarray) or img.ndim not in (2, 3):
+            ax.set_title(f"{label} (Not Available)")
+            ax.text(0.5, 0.5, 'N/A', ha='center', va='center', transform=ax.transAxes, fontsize=12, color='red')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            continue
+        ax.set_title(f"{label} {img.shape}")
+        ax.set_xlabel('Pixel Intensity')
+        ax.set_ylabel('Frequency')
+        hists = channel_histograms(img)
+        if len(hists) == 1:
+            ax.plot(intensities, hists[0], color='black')
+        else:
+            for hist, color in zip(hists, CHANNEL_COLORS):
+                ax.plot(intensities, hist, color=color, alpha=0.7, label=f'Ch {color.upper()}')
+            ax.legend(loc='upper right')
+        ax.set_xlim([0, 255])
+        ax.grid(True, linestyle='--', alpha=0.6)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    return _save_figure(fig, path)
+
+
+def render_images(images, path, labels=DEFAULT_LABELS, title='Image Encryption Results'):
+
+    fig = Figure(figsize=(5 * len(images), 5))
+    fig.suptitle(title, fontsize=16)
+    axes = fig.subplots(1, len(images), squeeze=False)[0]
+    for ax, img, label in zip(axes, images, labels):
+        ax.set_title(label)
+        ax.axis('off')
+        if img is None or not isinstance(img, np.ndarray):
+            ax.text(0.5, 0.5, 'N/A', ha='center', va='center', transform=ax.transAxes, fontsize=12, color='red')
+            continue
+        ax.imshow(_thumbnail(img), cmap='gray' if img.ndim == 2 else None)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    return _save_figure(fig, path)
+
+
+def _format_value(value):
+
+    if isinstance(value, float):
+        return f"{value:.4f}" if np.isfinite(value) else str(value)
+    if isinstance(value, dict):
+        return ', '.join(f"{k}: {_format_value(v)}" for k, v in value.items())
+    return str(value)
+
+
+def _html_table(rows, headers):
+
+    head = ''.join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+    body = ''.join(
+        "<tr>" + ''.join(f"<td>{html.escape(_format_value(cell))}</td>" for cell in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def build_html_report(title, figures, metrics=None, trace_summary=None):
+
+    sections = [f"<h1>{html.escape(title)}</h1>",
+                f"<p>Generated {datetime.datetime.now().isoformat(timespec='seconds')}</p>"]
+    for section, values in (metrics or {}).items():
+        if not values:
+            continue
+        sections.append(f"<h2>{html.escape(section)}</h2>")
+        sections.append(_html_table(sorted(values.items()), ('Metric', 'Value')))
+    if trace_summary:
+        sections.append("<h2>Trace</h2>")
+        rows = [(path, entry['count'], entry['total_s'],
+                 entry['bytes'] / entry['total_s'] / 1e6 if entry['bytes'] and entry['total_s'] > 0 else '',
+                 entry['peak_mem_bytes'] / 1e6)
+                for path, entry in trace_summary.items()]
+        sections.append(_html_table(rows, ('Span', 'Calls', 'Total (s)', 'MB/s', 'Peak MB')))
+    for name, path in figures.items():
+        sections.append(f"<h2>{html.escape(name)}</h2>")
+        sections.append(f'<img src="{html.escape(os.path.basename(path))}" alt="{html.escape(name)}">')
+    style = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1em}"
+             "td,th{border:1px solid #ccc;padding:4px 8px;text-align:left}img{max-width:100%}")
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<style>{style}</style></head><body>{''.join(sections)}</body></html>")
+
+
+class ReportWriter:
+
+    def __init__(self, output_dir='report', prefix='pipeline'):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.figures = {}
+        self.html_path = None
+        self._futures = []
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report')
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _path(self, name, extension):
+
+        return os.path.join(self.output_dir, f"{self.prefix}_{name}.{extension}")
+
+    def submit_figures(self, img_orig, img_encrypted, img_decrypted):
+
+        images = (img_orig, img_encrypted, img_decrypted)
+        for name, render in (('histograms', render_histograms), ('images', render_images)):
+            path = self._path(name, 'png')
+            self.figures[name.capitalize()] = path
+            self._futures.append(self._pool.submit(render, images, path))
+        return list(self._futures)
+
+    def submit_html(self, metrics=None, trace_summary=None, title='Image Encryption Pipeline Report'):
+
+        figure_futures = list(self._futures)
+        path = self.html_path = self._path('report', 'html')
+
+        def _write():
+            for future in figure_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error("Error rendering report figure: %s", e, exc_info=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(build_html_report(title, self.figures, metrics, trace_summary))
+            return path
+
+        future = self._pool.submit(_write)
+        self._futures.append(future)
+        return future
+
+    def close(self):
+
+        self._pool.shutdown(wait=True)
+        errors = []
+        for future in self._futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+        for error in errors:
+            log.error("Error writing report: %s", error, exc_info=error)
+        return list(self.figures.values()) + ([self.html_path] if self.html_path else [])
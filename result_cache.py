@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from logs import get_logger
+from progressive import pack_layer_frame, unpack_layer_frame
+
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+EVICT_SLACK = 0.1
+ENTRY_SUFFIX = '.entry'
+log = get_logger('result_cache')
+
+
+def source_digest(source):
+
+    if isinstance(source, str):
+        hasher = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+def cache_key(source_sha256, params, options=None):
+
+    material = {
+        'version': CACHE_FORMAT_VERSION,
+        'source_sha256': source_sha256,
+        'params': {name: params[name] for name in sorted(params)},
+        'options': {name: (options or {})[name] for name in sorted(options or {})},
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, verify=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.corrupt = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._lru = OrderedDict()
+        self._total_bytes = 0
+        self._unscanned_bytes = 0
+        self._rescan()
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _entries(self):
+
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _rescan(self):
+
+        lru = OrderedDict((path, size) for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]))
+        with self._lock:
+            self._lru = lru
+            self._total_bytes = sum(lru.values())
+            self._unscanned_bytes = 0
+
+    def _forget(self, path):
+
+        with self._lock:
+            size = self._lru.pop(path, None)
+            if size is not None:
+                self._total_bytes -= size
+
+    def get(self, key):
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                stale = path in self._lru
+            if stale:
+                self._rescan()
+            return None
+
+        try:
+            header, payload = unpack_layer_frame(data)
+            if self.verify and hashlib.sha256(payload).hexdigest() != header.get('sha256'):
+                raise ValueError("payload digest mismatch")
+        except (ValueError, KeyError) as e:
+            log.warning("Discarding corrupt cache entry %s: %s", key, e)
+            self._remove(path)
+            self._forget(path)
+            with self._lock:
+                self.misses += 1
+                self.corrupt += 1
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if path in self._lru:
+                self._lru.move_to_end(path)
+            else:
+                self._lru[path] = len(data)
+                self._total_bytes += len(data)
+        return header, payload
+
+    def put(self, key, header, payload):
+
+        header = dict(header)
+        header.setdefault('sha256', hashlib.sha256(payload).hexdigest())
+        header['cache_key'] = key
+        header['cached_at'] = time.time()
+        data = pack_layer_frame(header, payload)
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix=ENTRY_SUFFIX + '.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.writes += 1
+            self._total_bytes += len(data) - self._lru.pop(path, 0)
+            self._lru[path] = len(data)
+            self._unscanned_bytes += len(data)
+            over_budget = (self._total_bytes > self.max_bytes or
+                           self._unscanned_bytes > self.max_bytes * EVICT_SLACK)
+        if over_budget:
+            self.evict()
+        return path
+
+    def _remove(self, path):
+
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def evict(self):
+
+        self._rescan()
+        target = self.max_bytes * (1.0 - EVICT_SLACK)
+        victims = []
+        with self._lock:
+            while self._lru and self._total_bytes > target:
+                path, size = self._lru.popitem(last=False)
+                self._total_bytes -= size
+                victims.append(path)
+        evicted = sum(1 for path in victims if self._remove(path))
+        with self._lock:
+            self.evictions += evicted
+        if evicted:
+            log.debug("Evicted %d cache entries, %d bytes remain.", evicted, self._total_bytes)
+        return evicted
+
+    def clear(self):
+
+        for path, _, _ in self._entries():
+            self._remove(path)
+        with self._lock:
+            self._lru.clear()
+            self._total_bytes = 0
+            self._unscanned_bytes = 0
+
+    def stats(self):
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'corrupt': self.corrupt,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def cached_call(cache, key, compute):
+
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            header, payload = cached
+            return header, payload, True
+    header, payload = compute()
+    if cache is not None:
+        cache.put(key, header, payload)
+    return header, payload, False
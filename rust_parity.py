@@ -0,0 +1,361 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    LOGISTIC_X0, LOGISTIC_R, ACM_ITERATIONS,
+    preprocess_image, arnold_cat_map, apply_aes_sbox, logistic_map_encrypt_decrypt,
+    build_encryption_metadata, steghide_embed_metadata, compress_data, calculate_hash_bytes,
+    decompress_data,
+)
+from benchmark import make_input
+from metadata_index import read_steg_metadata
+
+
+RUST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rust')
+RUST_BINARY_NAME = 'image-encrypt-rust'
+STAGES = ('preprocess', 'acm', 'sbox', 'logistic', 'steg', 'compress', 'hash')
+RUST_STAGE_LINES = (
+    ('preprocess', re.compile(r"^Preprocessing complete \((?P<t0>[^)]+)\)")),
+    ('acm', re.compile(r"^ACM complete \((?P<t0>[^)]+)\)")),
+    ('sbox', re.compile(r"^AES S-Box complete \((?P<t0>[^)]+)\)")),
+    ('logistic', re.compile(r"^Logistic Map XOR complete \((?P<t0>[^)]+)\)")),
+    ('steg', re.compile(r"^Steganography complete \((?P<t0>[^)]+)\)")),
+    (('compress', 'hash'), re.compile(r"^Compression & Hashing complete \((?P<t0>[^ ]+) \+ (?P<t1>[^)]+)\)")),
+)
+DURATION_UNITS = (('ns', 1e-9), ('µs', 1e-6), ('us', 1e-6), ('ms', 1e-3), ('s', 1.0))
+# Fields both implementations write into encryption_params; shapes are compared on (H, W[, C]).
+SHARED_PARAMS = ('acm_iterations', 'acm_a', 'acm_b', 'logistic_x0', 'logistic_r', 'grayscale', 'padded',
+                 'original_shape_unpadded', 'original_shape_padded', 'pre_steg_shape')
+DEFAULT_CASES = ('64:rgb:synthetic', '64:gray:photo', '96x64:rgb:photo', '256:rgb:photo')
+SLOWER_FLAG_RATIO = 1.5
+MIN_FLAG_SECONDS = 1e-3
+
+
+def find_rust_binary(explicit=None):
+
+    candidates = [explicit, os.environ.get('RUST_PARITY_BINARY')]
+    for profile in ('release', 'debug'):
+        for name in (RUST_BINARY_NAME, RUST_BINARY_NAME + '.exe'):
+            candidates.append(os.path.join(RUST_DIR, 'target', profile, name))
+    for path in candidates:
+        if path and os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def build_rust_binary():
+
+    print(f"Building Rust CLI in {RUST_DIR} (cargo build --release)...")
+    try:
+        result = subprocess.run(['cargo', 'build', '--release'], cwd=RUST_DIR, capture_output=True, text=True)
+    except FileNotFoundError:
+        print("cargo not found on PATH; cannot build the Rust CLI.")
+        return None
+    if result.returncode != 0:
+        print("Rust build failed:")
+        print(result.stderr.strip()[-4000:])
+        return None
+    return find_rust_binary()
+
+
+def parse_case(spec):
+
+    size, _, rest = spec.partition(':')
+    mode, _, kind = rest.partition(':')
+    if 'x' in size:
+        height, width = (int(v) for v in size.split('x'))
+    else:
+        height = width = int(size)
+    if mode not in ('rgb', 'gray'):
+        raise ValueError(f"Unknown colour mode '{mode}' in case '{spec}'. Expected 'rgb' or 'gray'.")
+    return {'name': spec, 'height': height, 'width': width, 'grayscale': mode == 'gray', 'kind': kind or 'photo'}
+
+
+def write_case_image(case, directory, seed=0):
+
+    side = max(case['height'], case['width'])
+    channels = 1 if case['grayscale'] else 3
+    array = make_input(side, channels, case['kind'], seed=seed)[:case['height'], :case['width']]
+    path = os.path.join(directory, case['name'].replace(':', '_') + '.png')
+    Image.fromarray(np.ascontiguousarray(array)).save(path)
+    return path
+
+
+def parse_rust_duration(text):
+
+    text = text.strip()
+    for unit, scale in DURATION_UNITS:
+        if text.endswith(unit):
+            try:
+                return float(text[:-len(unit)]) * scale
+            except ValueError:
+                return None
+    return None
+
+
+def parse_rust_timings(stdout):
+
+    timings = {}
+    for line in stdout.splitlines():
+        line = line.strip()
+        for stages, pattern in RUST_STAGE_LINES:
+            match = pattern.match(line)
+            if not match:
+                continue
+            if isinstance(stages, str):
+                stages = (stages,)
+            for index, stage in enumerate(stages):
+                timings[stage] = parse_rust_duration(match.group(f't{index}'))
+    return timings
+
+
+def run_rust(binary, image_path, output_path, grayscale, key_params):
+
+    command = [binary, 'encrypt', '--input', image_path, '--output', output_path,
+               '--acm-iter', str(key_params['acm_iterations']),
+               '--log-x0', repr(float(key_params['logistic_x0'])),
+               '--log-r', repr(float(key_params['logistic_r']))]
+    if grayscale:
+        command.append('--grayscale')
+    start_time = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    wall_time = time.perf_counter() - start_time
+    if result.returncode != 0:
+        raise RuntimeError(f"Rust encrypt failed ({result.returncode}): {result.stderr.strip() or result.stdout.strip()[-2000:]}")
+    timings = parse_rust_timings(result.stdout)
+    timings['total'] = sum(t for t in timings.values() if t is not None)
+    timings['process'] = wall_time
+    return output_path, timings
+
+
+def run_python(image_path, output_path, grayscale, key_params):
+
+    timings = {}
+
+    def timed(stage, func, *args, **kwargs):
+        start_time = time.perf_counter()
+        value = func(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start_time
+        return value
+
+    image, (width, height), padded = timed('preprocess', preprocess_image, image_path, target_size=None, grayscale=grayscale)
+    if image is None:
+        raise ValueError(f"Python preprocessing failed for {image_path}.")
+    cipher = timed('acm', arnold_cat_map, image, key_params['acm_iterations'], key_params['acm_a'], key_params['acm_b'])
+    cipher = timed('sbox', apply_aes_sbox, cipher, out=cipher)
+    cipher = timed('logistic', logistic_map_encrypt_decrypt, cipher, key_params['logistic_x0'],
+                   key_params['logistic_r'], out=cipher)
+    metadata = build_encryption_metadata(
+        original_shape_unpadded=(height, width) + image.shape[2:],
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=grayscale,
+        padded=padded,
+        pre_steg_shape=cipher.shape,
+        pre_steg_dtype=cipher.dtype,
+        **key_params
+    )
+    steg_image, steg_success = timed('steg', steghide_embed_metadata, cipher, metadata)
+    if not steg_success:
+        raise ValueError("Python steganography embedding failed.")
+    compressed, _ = timed('compress', compress_data, steg_image)
+    timed('hash', calculate_hash_bytes, compressed)
+    with open(output_path, 'wb') as f:
+        f.write(compressed)
+    timings['total'] = sum(timings.values())
+    return output_path, timings
+
+
+def _normalise_param(name, value):
+
+    if value is None:
+        return None
+    if name.endswith('_shape') or name.startswith('original_shape'):
+        shape = [int(v) for v in value]
+        if len(shape) == 3 and shape[2] == 1:
+            shape = shape[:2]
+        return shape
+    if name.startswith('logistic'):
+        return float(value)
+    if name in ('grayscale', 'padded'):
+        return bool(value)
+    return int(value)
+
+
+def compare_metadata(python_meta, rust_meta):
+
+    problems = []
+    python_params = python_meta.get('encryption_params', {})
+    rust_params = rust_meta.get('encryption_params', {})
+    for name in SHARED_PARAMS:
+        if name not in python_params or name not in rust_params:
+            problems.append(f"metadata field '{name}' missing ({'python' if name not in python_params else 'rust'})")
+            continue
+        ours = _normalise_param(name, python_params[name])
+        theirs = _normalise_param(name, rust_params[name])
+        if name == 'original_shape_unpadded':
+            ours, theirs = ours[:2], theirs[:2]
+        if ours != theirs:
+            problems.append(f"metadata field '{name}' differs: python={ours} rust={theirs}")
+    return problems
+
+
+def load_cipher(path, metadata):
+
+    params = metadata['encryption_params']
+    with open(path, 'rb') as f:
+        compressed = f.read()
+    decompressed, _ = decompress_data(compressed, tuple(params['pre_steg_shape']), params.get('pre_steg_dtype', 'uint8'))
+    if decompressed is None:
+        raise ValueError(f"Could not decompress {path} to shape {params['pre_steg_shape']}.")
+    return decompressed.reshape(-1), compressed
+
+
+def steg_region(cipher):
+
+    length_bits = np.packbits(cipher[:32] & 1, bitorder='little')
+    return 32 + 8 * int.from_bytes(length_bits.tobytes(), 'big')
+
+
+def compare_ciphertext(python_cipher, rust_cipher, region):
+
+    if python_cipher.size != rust_cipher.size:
+        return [f"ciphertext size differs: python={python_cipher.size} rust={rust_cipher.size}"], None
+    # Metadata JSON differs by design (timestamp, writer name), so only the LSBs of the steg prefix are excluded.
+    region = min(region, python_cipher.size)
+    head = (python_cipher[:region] & 0xFE) != (rust_cipher[:region] & 0xFE)
+    tail = python_cipher[region:] != rust_cipher[region:]
+    mismatches = np.concatenate([np.flatnonzero(head), region + np.flatnonzero(tail)])
+    if mismatches.size == 0:
+        return [], None
+    first = int(mismatches[0])
+    return [f"ciphertext differs in {mismatches.size}/{python_cipher.size} bytes "
+            f"(first at byte {first}: python={int(python_cipher[first])} rust={int(rust_cipher[first])})"], first
+
+
+def run_case(case, binary, directory, key_params, seed=0):
+
+    image_path = write_case_image(case, directory, seed=seed)
+    stem = os.path.splitext(image_path)[0]
+    result = {'case': case['name'], 'problems': [], 'python_times': {}, 'rust_times': {}}
+
+    python_path, result['python_times'] = run_python(image_path, stem + '.py.zlib-steg', case['grayscale'], key_params)
+    try:
+        rust_path, result['rust_times'] = run_rust(binary, image_path, stem + '.rs.zlib-steg', case['grayscale'], key_params)
+    except RuntimeError as e:
+        result['problems'].append(str(e))
+        return result
+
+    python_meta, _, python_error = read_steg_metadata(python_path, with_digest=False)
+    rust_meta, _, rust_error = read_steg_metadata(rust_path, with_digest=False)
+    if python_meta is None or rust_meta is None:
+        result['problems'].append(f"metadata unreadable: python={python_error} rust={rust_error}")
+        return result
+    result['problems'].extend(compare_metadata(python_meta, rust_meta))
+
+    python_cipher, python_compressed = load_cipher(python_path, python_meta)
+    rust_cipher, rust_compressed = load_cipher(rust_path, rust_meta)
+    region = max(steg_region(python_cipher), steg_region(rust_cipher))
+    problems, first = compare_ciphertext(python_cipher, rust_cipher, region)
+    result['problems'].extend(problems)
+    result['first_mismatch'] = first
+    result['compressed_sizes'] = (len(python_compressed), len(rust_compressed))
+    result['compressed_identical'] = python_compressed == rust_compressed
+    return result
+
+
+def print_report(results):
+
+    for result in results:
+        status = 'OK' if not result['problems'] else 'DIVERGED'
+        print(f"\n=== {result['case']}: {status} ===")
+        for problem in result['problems']:
+            print(f"  ! {problem}")
+        if 'compressed_sizes' in result:
+            py_size, rs_size = result['compressed_sizes']
+            note = 'identical' if result['compressed_identical'] else 'differ (expected: embedded metadata JSON differs)'
+            print(f"  compressed bytes: python={py_size} rust={rs_size} -> {note}")
+        print(f"  {'stage':<11}{'python (ms)':>13}{'rust (ms)':>12}{'py/rs':>8}")
+        for stage in STAGES + ('total', 'process'):
+            py_time = result['python_times'].get(stage)
+            rs_time = result['rust_times'].get(stage)
+            py_text = f"{py_time * 1000:.3f}" if py_time is not None else '-'
+            rs_text = f"{rs_time * 1000:.3f}" if rs_time is not None else '-'
+            ratio_text, flag = '-', ''
+            if py_time and rs_time:
+                ratio = py_time / rs_time
+                ratio_text = f"{ratio:.2f}"
+                if max(py_time, rs_time) < MIN_FLAG_SECONDS:
+                    pass
+                elif ratio >= SLOWER_FLAG_RATIO:
+                    flag = '  <- rust faster'
+                elif ratio <= 1 / SLOWER_FLAG_RATIO:
+                    flag = '  <- python faster'
+            print(f"  {stage:<11}{py_text:>13}{rs_text:>12}{ratio_text:>8}{flag}")
+
+
+def run_parity(cases, binary, key_params, seed=0, keep_dir=None):
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='rust-parity-') as tmp_dir:
+        directory = keep_dir or tmp_dir
+        os.makedirs(directory, exist_ok=True)
+        for spec in cases:
+            case = parse_case(spec)
+            print(f"\n--- Parity case {case['name']} ---")
+            try:
+                results.append(run_case(case, binary, directory, key_params, seed=seed))
+            except Exception as e:
+                results.append({'case': case['name'], 'problems': [f"harness error: {e}"],
+                                'python_times': {}, 'rust_times': {}})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the Python pipeline (core.py) and the Rust CLI produce interchangeable .zlib-steg files and compare stage timings.")
+    parser.add_argument('--binary', default=None, help="Path to the Rust CLI. Defaults to $RUST_PARITY_BINARY or rust/target/{release,debug}.")
+    parser.add_argument('--build', action='store_true', help="Run cargo build --release first if no binary is found.")
+    parser.add_argument('--require-binary', action='store_true', help="Exit with an error instead of skipping when no binary is available.")
+    parser.add_argument('--cases', nargs='+', default=list(DEFAULT_CASES),
+                        help="Cases as SIZE[xWIDTH]:rgb|gray[:synthetic|photo], e.g. 256:rgb:photo or 96x64:gray.")
+    parser.add_argument('--acm-iterations', type=int, default=ACM_ITERATIONS)
+    parser.add_argument('--logistic-x0', type=float, default=LOGISTIC_X0)
+    parser.add_argument('--logistic-r', type=float, default=LOGISTIC_R)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-dir', default=None, help="Write inputs and both outputs here instead of a temp dir.")
+    parser.add_argument('--json', default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    binary = find_rust_binary(args.binary)
+    if binary is None and args.build:
+        binary = build_rust_binary()
+    if binary is None:
+        message = f"No Rust binary found (looked for $RUST_PARITY_BINARY and {RUST_DIR}/target/*/{RUST_BINARY_NAME}). Build it with --build or cargo build --release."
+        if args.require_binary:
+            parser.error(message)
+        print(f"Skipping Rust parity check: {message}")
+        sys.exit(0)
+
+    # The Rust CLI has no flags for the ACM matrix, so both sides run with its fixed a=b=1.
+    key_params = {'acm_iterations': args.acm_iterations, 'acm_a': 1, 'acm_b': 1,
+                  'logistic_x0': args.logistic_x0, 'logistic_r': args.logistic_r}
+    print(f"Rust binary: {binary}")
+    results = run_parity(args.cases, binary, key_params, seed=args.seed, keep_dir=args.keep_dir)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+    diverged = [r['case'] for r in results if r['problems']]
+    if diverged:
+        print(f"\nParity FAILED for {len(diverged)}/{len(results)} case(s): {', '.join(diverged)}")
+        sys.exit(1)
+    print(f"\nParity OK for all {len(results)} case(s).")
@@ -0,0 +1,195 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from skimage.metrics import structural_similarity
+
+
+ROW_CHUNK_BYTES = 8 * 1024 * 1024
+CORRELATION_SAMPLES = 5000
+SSIM_MAX_SIDE = 1024
+CORRELATION_DIRECTIONS = {
+    'horizontal': (0, 1),
+    'vertical': (1, 0),
+    'diagonal': (1, 1),
+}
+
+
+def _channels(img):
+
+    return [img] if img.ndim == 2 else [img[:, :, c] for c in range(img.shape[2])]
+
+
+def _map_channels(fn, channels, workers=None):
+
+    if len(channels) == 1:
+        return [fn(channels[0])]
+    with ThreadPoolExecutor(max_workers=workers or min(len(channels), os.cpu_count() or 1)) as pool:
+        return list(pool.map(fn, channels))
+
+
+def byte_histogram(img):
+
+    return np.bincount(np.asarray(img, dtype=np.uint8).ravel(), minlength=256)
+
+
+def entropy_from_histogram(hist):
+
+    total = hist.sum()
+    if total == 0:
+        return 0.0
+    p = hist[hist > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+def chi_square_from_histogram(hist):
+
+    expected = hist.sum() / hist.size
+    if expected == 0:
+        return 0.0
+    return float(((hist - expected) ** 2).sum() / expected)
+
+
+def image_entropy(img):
+
+    return entropy_from_histogram(byte_histogram(img))
+
+
+def histogram_stats(img, workers=None):
+
+    channel_hists = _map_channels(byte_histogram, _channels(img), workers)
+    hist = np.sum(channel_hists, axis=0)
+    return {
+        'histogram': hist,
+        'channel_histograms': channel_hists,
+        'entropy': entropy_from_histogram(hist),
+        'chi_square': chi_square_from_histogram(hist),
+        'channel_entropy': [entropy_from_histogram(h) for h in channel_hists],
+        'channel_chi_square': [chi_square_from_histogram(h) for h in channel_hists],
+    }
+
+
+def difference_stats(img_a, img_b):
+
+    if img_a.shape != img_b.shape:
+        raise ValueError(f"Shape mismatch for difference statistics: {img_a.shape} vs {img_b.shape}")
+    flat_a = np.asarray(img_a, dtype=np.uint8).reshape(img_a.shape[0], -1)
+    flat_b = np.asarray(img_b, dtype=np.uint8).reshape(img_b.shape[0], -1)
+    rows_per_chunk = max(1, ROW_CHUNK_BYTES // max(flat_a.shape[1], 1))
+    sum_sq = sum_abs = changed = 0
+    for start in range(0, flat_a.shape[0], rows_per_chunk):
+        diff = np.subtract(flat_a[start:start + rows_per_chunk], flat_b[start:start + rows_per_chunk], dtype=np.int32)
+        sum_sq += int(np.einsum('ij,ij->', diff, diff, dtype=np.int64))
+        sum_abs += int(np.abs(diff).sum(dtype=np.int64))
+        changed += int(np.count_nonzero(diff))
+    return {'count': img_a.size, 'sum_sq': sum_sq, 'sum_abs': sum_abs, 'changed': changed}
+
+
+def mse_psnr(img_a, img_b, data_range=255):
+
+    stats = difference_stats(img_a, img_b)
+    mse_val = stats['sum_sq'] / stats['count'] if stats['count'] else 0.0
+    psnr_val = float('inf') if mse_val == 0 else 10 * math.log10(data_range ** 2 / mse_val)
+    return mse_val, psnr_val
+
+
+def npcr_uaci(cipher_a, cipher_b, data_range=255):
+
+    stats = difference_stats(cipher_a, cipher_b)
+    if stats['count'] == 0:
+        return 0.0, 0.0
+    npcr = 100.0 * stats['changed'] / stats['count']
+    uaci = 100.0 * stats['sum_abs'] / (stats['count'] * data_range)
+    return npcr, uaci
+
+
+def adjacent_correlation(img, direction='horizontal', samples=CORRELATION_SAMPLES, seed=0, workers=None):
+
+    dy, dx = CORRELATION_DIRECTIONS[direction]
+    h, w = img.shape[:2]
+    if h <= dy or w <= dx:
+        return float('nan')
+    rng = np.random.default_rng(seed)
+    count = min(samples, (h - dy) * (w - dx))
+    ys = rng.integers(0, h - dy, count)
+    xs = rng.integers(0, w - dx, count)
+
+    def _correlate(channel):
+        first = channel[ys, xs].astype(np.float64)
+        second = channel[ys + dy, xs + dx].astype(np.float64)
+        if first.std() == 0 or second.std() == 0:
+            return 0.0
+        return float(np.corrcoef(first, second)[0, 1])
+
+    return float(np.mean(_map_channels(_correlate, _channels(img), workers)))
+
+
+def correlation_report(img, samples=CORRELATION_SAMPLES, seed=0, workers=None):
+
+    return {direction: adjacent_correlation(img, direction, samples, seed, workers)
+            for direction in CORRELATION_DIRECTIONS}
+
+
+def _downsample(channel, factor):
+
+    if factor <= 1:
+        return channel
+    h = channel.shape[0] // factor * factor
+    w = channel.shape[1] // factor * factor
+    blocks = channel[:h, :w].reshape(h // factor, factor, w // factor, factor)
+    return blocks.mean(axis=(1, 3))
+
+
+def fast_ssim(img_a, img_b, data_range=255, max_side=SSIM_MAX_SIDE, workers=None):
+
+    if img_a.shape != img_b.shape:
+        raise ValueError(f"Shape mismatch for SSIM: {img_a.shape} vs {img_b.shape}")
+    factor = max(1, math.ceil(max(img_a.shape[:2]) / max_side)) if max_side else 1
+    win_size = min(7, min(img_a.shape[:2]) // factor)
+    if win_size % 2 == 0:
+        win_size -= 1
+    if win_size < 3:
+        raise ValueError(f"Image dimensions {img_a.shape[:2]} too small for SSIM.")
+
+    def _channel_ssim(pair):
+        channel_a, channel_b = pair
+        channel_a = _downsample(channel_a, factor)
+        channel_b = _downsample(channel_b, factor)
+        return structural_similarity(channel_a, channel_b, data_range=data_range, win_size=win_size)
+
+    pairs = list(zip(_channels(img_a), _channels(img_b)))
+    return float(np.mean(_map_channels(_channel_ssim, pairs, workers)))
+
+
+def compute_metrics(img_orig, img_processed, data_range=255, ssim_max_side=SSIM_MAX_SIDE, workers=None):
+
+    mse_val, psnr_val = mse_psnr(img_orig, img_processed, data_range)
+    orig_stats = histogram_stats(img_orig, workers)
+    proc_stats = histogram_stats(img_processed, workers)
+    return {
+        'mse': mse_val,
+        'psnr': psnr_val,
+        'ssim': fast_ssim(img_orig, img_processed, data_range, ssim_max_side, workers),
+        'entropy_orig': orig_stats['entropy'],
+        'entropy_proc': proc_stats['entropy'],
+        'chi_square_orig': orig_stats['chi_square'],
+        'chi_square_proc': proc_stats['chi_square'],
+    }
+
+
+def cipher_report(img_plain, img_cipher, img_cipher_alt=None, samples=CORRELATION_SAMPLES, workers=None):
+
+    plain_stats = histogram_stats(img_plain, workers)
+    cipher_stats = histogram_stats(img_cipher, workers)
+    report = {
+        'entropy_plain': plain_stats['entropy'],
+        'entropy_cipher': cipher_stats['entropy'],
+        'chi_square_plain': plain_stats['chi_square'],
+        'chi_square_cipher': cipher_stats['chi_square'],
+        'correlation_plain': correlation_report(img_plain, samples, workers=workers),
+        'correlation_cipher': correlation_report(img_cipher, samples, workers=workers),
+    }
+    if img_cipher_alt is not None:
+        report['npcr'], report['uaci'] = npcr_uaci(img_cipher, img_cipher_alt)
+    return report
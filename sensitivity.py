@@ -0,0 +1,198 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND,
+    preprocess_image, encrypt_image, acm_permutation, generate_keystream, cached_keystream,
+    s_box_np, inv_s_box_np, enable_kernel_caches,
+)
+from logs import get_logger, add_logging_arguments, configure_from_args
+from security_metrics import mse_psnr, npcr_uaci, fast_ssim, image_entropy
+
+
+KEYSTREAM_PARAMS = ('logistic_x0', 'logistic_r', 'keystream_backend')
+ACM_PARAMS = ('acm_iterations', 'acm_a', 'acm_b')
+REPORT_SSIM_MAX_SIDE = 256
+log = get_logger('sensitivity')
+_worker_state = {}
+
+
+def default_perturbations():
+
+    perturbations = []
+    for delta in (1e-15, 1e-12, 1e-9, -1e-9, 1e-6):
+        perturbations.append({'logistic_x0': delta})
+    for delta in (1e-12, 1e-9, -1e-9):
+        perturbations.append({'logistic_r': delta})
+    for delta in (1, -1):
+        perturbations.append({'acm_iterations': delta})
+    perturbations.append({'acm_a': 1})
+    perturbations.append({'acm_b': 1})
+    perturbations.append({'logistic_x0': 1e-9, 'acm_iterations': 1})
+    return perturbations
+
+
+def describe_perturbation(perturbation):
+
+    return ', '.join(f"{name}{delta:+g}" for name, delta in perturbation.items())
+
+
+def apply_perturbation(params, perturbation):
+
+    perturbed = dict(params)
+    for name, delta in perturbation.items():
+        perturbed[name] = perturbed[name] + delta
+    return perturbed
+
+
+def _init_worker(encrypted, plaintext, params):
+
+    enable_kernel_caches()
+    _worker_state.clear()
+    _worker_state.update(encrypted=encrypted, plaintext=plaintext, params=params)
+
+
+def _substituted_with_base_keystream():
+
+    substituted = _worker_state.get('substituted')
+    if substituted is None:
+        encrypted, params = _worker_state['encrypted'], _worker_state['params']
+        keystream = cached_keystream(params['logistic_x0'], params['logistic_r'], encrypted.size,
+                                     backend=params['keystream_backend'])
+        substituted = inv_s_box_np[np.bitwise_xor(encrypted.reshape(-1), keystream)]
+        _worker_state['substituted'] = substituted
+    return substituted
+
+
+def _decrypt_perturbed(params):
+
+    encrypted = _worker_state['encrypted']
+    base = _worker_state['params']
+    if all(params[name] == base[name] for name in KEYSTREAM_PARAMS):
+        substituted = _substituted_with_base_keystream()
+    else:
+        keystream = generate_keystream(params['logistic_x0'], params['logistic_r'], encrypted.size,
+                                       backend=params['keystream_backend'])
+        substituted = inv_s_box_np[np.bitwise_xor(encrypted.reshape(-1), keystream)]
+    size = encrypted.shape[0]
+    forward, _ = acm_permutation(size, params['acm_iterations'], params['acm_a'], params['acm_b'])
+    return substituted.reshape(size * size, -1)[forward].reshape(encrypted.shape)
+
+
+def _score(img_reference, img_candidate, elapsed):
+
+    _, psnr_val = mse_psnr(img_reference, img_candidate)
+    npcr, uaci = npcr_uaci(img_reference, img_candidate)
+    return {
+        'psnr': psnr_val,
+        'ssim': fast_ssim(img_reference, img_candidate, max_side=REPORT_SSIM_MAX_SIDE),
+        'npcr': npcr,
+        'uaci': uaci,
+        'entropy': image_entropy(img_candidate),
+        'time': elapsed,
+    }
+
+
+def key_sensitivity_job(perturbation):
+
+    start_time = time.perf_counter()
+    params = apply_perturbation(_worker_state['params'], perturbation)
+    decrypted = _decrypt_perturbed(params)
+    row = _score(_worker_state['plaintext'], decrypted, time.perf_counter() - start_time)
+    row.update(kind='key', perturbation=describe_perturbation(perturbation))
+    return row
+
+
+def plaintext_sensitivity_job(position):
+
+    start_time = time.perf_counter()
+    plaintext, encrypted, params = _worker_state['plaintext'], _worker_state['encrypted'], _worker_state['params']
+    variant = plaintext.copy()
+    variant[position] ^= 1
+    size = plaintext.shape[0]
+    _, gather = acm_permutation(size, params['acm_iterations'], params['acm_a'], params['acm_b'])
+    keystream = cached_keystream(params['logistic_x0'], params['logistic_r'], variant.size, backend=params['keystream_backend'])
+    shuffled = variant.reshape(size * size, -1)[gather].reshape(-1)
+    cipher_variant = np.bitwise_xor(s_box_np[shuffled], keystream).reshape(encrypted.shape)
+    row = _score(encrypted, cipher_variant, time.perf_counter() - start_time)
+    row.update(kind='plaintext', perturbation=f"pixel {tuple(int(i) for i in position)} ^= 1")
+    return row
+
+
+def sample_pixel_positions(shape, count, seed=0):
+
+    rng = np.random.default_rng(seed)
+    return [tuple(int(rng.integers(0, dim)) for dim in shape) for _ in range(count)]
+
+
+def run_sensitivity_analysis(plaintext_padded, params=None, perturbations=None, plaintext_positions=8, workers=None):
+
+    base_params = {
+        'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+        'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND,
+    }
+    base_params.update(params or {})
+    if plaintext_padded.ndim not in [2, 3] or plaintext_padded.shape[0] != plaintext_padded.shape[1]:
+        raise ValueError("Sensitivity analysis requires a square (padded) 2D or 3D image array.")
+    plaintext_padded = plaintext_padded.astype(np.uint8, copy=False)
+    perturbations = default_perturbations() if perturbations is None else perturbations
+
+    log.info("Running sensitivity analysis: %d key perturbations, %d plaintext perturbations...",
+             len(perturbations), plaintext_positions)
+    start_time = time.perf_counter()
+    encrypted, _ = encrypt_image(plaintext_padded, **base_params)
+    positions = sample_pixel_positions(plaintext_padded.shape, plaintext_positions)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_worker,
+                             initargs=(encrypted, plaintext_padded, base_params)) as pool:
+        key_futures = [pool.submit(key_sensitivity_job, p) for p in perturbations]
+        plain_futures = [pool.submit(plaintext_sensitivity_job, p) for p in positions]
+        rows = [future.result() for future in key_futures + plain_futures]
+
+    total_time = time.perf_counter() - start_time
+    log.info("Sensitivity analysis completed in %.4f seconds.", total_time)
+    return rows, total_time
+
+
+def print_sensitivity_report(rows):
+
+    print("--- Sensitivity Report ---")
+    print(f"{'Kind':<10} {'Perturbation':<40} {'PSNR (dB)':>10} {'SSIM':>8} {'NPCR %':>9} {'UACI %':>8} {'Entropy':>8} {'Time (s)':>9}")
+    for row in rows:
+        psnr_str = f"{row['psnr']:.4f}" if np.isfinite(row['psnr']) else "inf"
+        print(f"{row['kind']:<10} {row['perturbation']:<40} {psnr_str:>10} {row['ssim']:>8.4f} {row['npcr']:>9.4f} "
+              f"{row['uaci']:>8.4f} {row['entropy']:>8.4f} {row['time']:>9.4f}")
+
+
+def write_sensitivity_csv(rows, path):
+
+    fields = ['kind', 'perturbation', 'psnr', 'ssim', 'npcr', 'uaci', 'entropy', 'time']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row[field] for field in fields})
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Key and plaintext sensitivity sweep.")
+    add_logging_arguments(parser)
+    parser.add_argument('image', nargs='?', default=None, help="Input image (defaults to the fallback image).")
+    parser.add_argument('--grayscale', action='store_true')
+    parser.add_argument('--positions', type=int, default=8, help="Number of one-pixel plaintext perturbations.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--csv', help="Write the report as CSV to this path.")
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+
+    image, _, _ = preprocess_image(args.image, grayscale=args.grayscale)
+    rows, _ = run_sensitivity_analysis(image, plaintext_positions=args.positions, workers=args.workers)
+    print_sensitivity_report(rows)
+    if args.csv:
+        print(f"Report written to: {write_sensitivity_csv(rows, args.csv)}")
@@ -0,0 +1,198 @@
+import hashlib
+import time
+
+import numpy as np
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R,
+    acm_permutation, generate_logistic_keystream, apply_aes_sbox, apply_inverse_aes_sbox,
+    compress_data, decompress_data, calculate_hash_bytes, verify_integrity_compressed,
+)
+from logs import get_logger
+from progressive import pack_layer_frame, unpack_layer_frame
+
+
+DEFAULT_TILE_SIZE = 64
+TILE_DIGEST_SIZE = 16
+log = get_logger('sequence')
+
+
+def derive_tile_x0(logistic_x0, frame_index, tile_index):
+
+    seed = f"{float(logistic_x0)!r}:{frame_index}:{tile_index}".encode('ascii')
+    fraction = int.from_bytes(hashlib.sha256(seed).digest()[:8], byteorder='big') / 2**64
+    return 1e-6 + fraction * (1.0 - 2e-6)
+
+
+def split_into_tiles(frame, tile_size):
+
+    h, w = frame.shape[:2]
+    pad_h = -h % tile_size
+    pad_w = -w % tile_size
+    if pad_h or pad_w:
+        pad_width = ((0, pad_h), (0, pad_w)) + ((0, 0),) * (frame.ndim - 2)
+        frame = np.pad(frame, pad_width, mode='constant', constant_values=0)
+    rows, cols = frame.shape[0] // tile_size, frame.shape[1] // tile_size
+    channels = frame.shape[2] if frame.ndim == 3 else 1
+    tiles = frame.reshape(rows, tile_size, cols, tile_size, channels).swapaxes(1, 2)
+    return tiles.reshape(rows * cols, tile_size, tile_size, channels), (rows, cols)
+
+
+def merge_tiles(tiles, grid, frame_shape):
+
+    rows, cols = grid
+    tile_size, channels = tiles.shape[1], tiles.shape[3]
+    frame = tiles.reshape(rows, cols, tile_size, tile_size, channels).swapaxes(1, 2)
+    frame = frame.reshape(rows * tile_size, cols * tile_size, channels)
+    frame = frame[:frame_shape[0], :frame_shape[1]]
+    return frame if len(frame_shape) == 3 else frame[:, :, 0]
+
+
+def tile_digests(tiles):
+
+    return [hashlib.blake2b(tile.tobytes(), digest_size=TILE_DIGEST_SIZE).digest() for tile in tiles]
+
+
+def _tile_keystream(tile_indices, frame_index, tile_bytes, logistic_x0, logistic_r):
+
+    if not tile_indices:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate([
+        generate_logistic_keystream(derive_tile_x0(logistic_x0, frame_index, tile_index), logistic_r, tile_bytes)
+        for tile_index in tile_indices
+    ])
+
+
+def encrypt_tiles(tiles, tile_indices, frame_index, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1):
+
+    count, tile_size = tiles.shape[0], tiles.shape[1]
+    _, gather = acm_permutation(tile_size, acm_iterations, acm_a, acm_b)
+    shuffled = tiles.reshape(count, tile_size * tile_size, tiles.shape[3])[:, gather]
+    substituted = apply_aes_sbox(shuffled).reshape(-1)
+    keystream = _tile_keystream(tile_indices, frame_index, substituted.size // max(count, 1), logistic_x0, logistic_r)
+    return np.bitwise_xor(substituted, keystream).reshape(tiles.shape)
+
+
+def decrypt_tiles(encrypted_tiles, tile_indices, frame_index, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1):
+
+    count, tile_size = encrypted_tiles.shape[0], encrypted_tiles.shape[1]
+    flat = encrypted_tiles.reshape(-1)
+    keystream = _tile_keystream(tile_indices, frame_index, flat.size // max(count, 1), logistic_x0, logistic_r)
+    substituted = apply_inverse_aes_sbox(np.bitwise_xor(flat, keystream))
+    forward, _ = acm_permutation(tile_size, acm_iterations, acm_a, acm_b)
+    unshuffled = substituted.reshape(count, tile_size * tile_size, encrypted_tiles.shape[3])[:, forward]
+    return unshuffled.reshape(encrypted_tiles.shape)
+
+
+class SequenceEncoder:
+
+    def __init__(self, tile_size=DEFAULT_TILE_SIZE, keyframe_interval=None,
+                 acm_iterations=ACM_ITERATIONS, logistic_x0=LOGISTIC_X0, logistic_r=LOGISTIC_R,
+                 acm_a=ACM_A, acm_b=ACM_B):
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.encryption_params = {
+            "acm_iterations": acm_iterations,
+            "acm_a": acm_a,
+            "acm_b": acm_b,
+            "logistic_x0": logistic_x0,
+            "logistic_r": logistic_r,
+        }
+        self.frame_index = 0
+        self.frame_shape = None
+        self.previous_digests = None
+
+    def encode_frame(self, frame):
+
+        start_time = time.perf_counter()
+        frame = np.asarray(frame, dtype=np.uint8)
+        if self.frame_shape is not None and frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match sequence shape {self.frame_shape}.")
+        self.frame_shape = frame.shape
+
+        tiles, grid = split_into_tiles(frame, self.tile_size)
+        digests = tile_digests(tiles)
+        keyframe = (self.previous_digests is None or
+                    (self.keyframe_interval and self.frame_index % self.keyframe_interval == 0))
+        if keyframe:
+            changed = list(range(len(tiles)))
+        else:
+            changed = [i for i, (new, old) in enumerate(zip(digests, self.previous_digests)) if new != old]
+
+        encrypted = encrypt_tiles(tiles[changed], changed, self.frame_index, **self.encryption_params)
+        compressed, _ = compress_data(encrypted)
+        if compressed is None:
+            raise ValueError(f"Compression failed for frame {self.frame_index}.")
+
+        header = {
+            "frame_index": self.frame_index,
+            "keyframe": bool(keyframe),
+            "frame_shape": list(frame.shape),
+            "tile_size": self.tile_size,
+            "grid": list(grid),
+            "changed_tiles": changed,
+            "payload_sha256": calculate_hash_bytes(compressed),
+            "encryption_params": self.encryption_params,
+        }
+        packet = pack_layer_frame(header, compressed)
+        stats = {
+            "frame_index": self.frame_index,
+            "keyframe": bool(keyframe),
+            "tiles_total": len(tiles),
+            "tiles_changed": len(changed),
+            "packet_bytes": len(packet),
+            "encode_time": time.perf_counter() - start_time,
+        }
+        log.debug("Frame %d: %d/%d tiles changed, %d bytes, %.4fs",
+                  self.frame_index, len(changed), len(tiles), len(packet), stats['encode_time'])
+
+        self.previous_digests = digests
+        self.frame_index += 1
+        return packet, stats
+
+
+class SequenceDecoder:
+
+    def __init__(self):
+        self.previous_tiles = None
+
+    def decode_frame(self, packet):
+
+        header, payload = unpack_layer_frame(packet)
+        frame_index = header['frame_index']
+        if not verify_integrity_compressed(payload, header['payload_sha256']):
+            raise ValueError(f"Integrity check failed for frame {frame_index}.")
+        if not header['keyframe'] and self.previous_tiles is None:
+            raise ValueError(f"Frame {frame_index} is a delta frame but no previous frame has been decoded.")
+
+        tile_size = header['tile_size']
+        rows, cols = header['grid']
+        frame_shape = tuple(header['frame_shape'])
+        channels = frame_shape[2] if len(frame_shape) == 3 else 1
+        changed = header['changed_tiles']
+
+        tiles = (np.zeros((rows * cols, tile_size, tile_size, channels), dtype=np.uint8)
+                 if header['keyframe'] else self.previous_tiles.copy())
+        if changed:
+            encrypted, _ = decompress_data(payload, (len(changed), tile_size, tile_size, channels), np.uint8)
+            if encrypted is None:
+                raise ValueError(f"Decompression failed for frame {frame_index}.")
+            tiles[changed] = decrypt_tiles(encrypted, changed, frame_index, **header['encryption_params'])
+
+        self.previous_tiles = tiles
+        return merge_tiles(tiles, (rows, cols), frame_shape)
+
+
+def encode_sequence(frames, **kwargs):
+
+    encoder = SequenceEncoder(**kwargs)
+    for frame in frames:
+        packet, _ = encoder.encode_frame(frame)
+        yield packet
+
+
+def decode_sequence(packets):
+
+    decoder = SequenceDecoder()
+    for packet in packets:
+        yield decoder.decode_frame(packet)
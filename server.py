@@ -0,0 +1,377 @@
+import argparse
+import collections
+import hashlib
+import io
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from PIL import Image
+
+from core import (
+    ACM_ITERATIONS, ACM_A, ACM_B, LOGISTIC_X0, LOGISTIC_R, KEYSTREAM_BACKEND, KEYSTREAM_BACKENDS,
+    preprocess_image, encrypt_image, decrypt_image, steghide_embed_metadata, steghide_extract_metadata,
+    build_encryption_metadata, compress_data, decompress_data, calculate_hash_bytes,
+    verify_integrity_compressed, enable_kernel_caches,
+)
+from logs import get_logger, add_logging_arguments, configure_from_args
+from result_cache import ResultCache, DEFAULT_MAX_BYTES, cache_key, cached_call, source_digest
+from telemetry import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_registry
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 10000
+log = get_logger('server')
+_registry = get_registry()
+HTTP_REQUESTS = _registry.counter('ice_http_requests_total', "Service requests by endpoint and status code.", ('endpoint', 'code'))
+HTTP_SECONDS = _registry.histogram('ice_http_request_duration_seconds', "Service request latency.", ('endpoint',))
+QUEUE_DEPTH = _registry.gauge('ice_worker_queue_depth', "Jobs submitted to each worker and not yet finished.", ('worker',))
+CACHE_LOOKUPS = _registry.counter('ice_cache_lookups_total', "Result cache lookups by outcome.", ('result',))
+
+
+def keystream_backend(value):
+
+    if value not in KEYSTREAM_BACKENDS:
+        raise ValueError(f"Unknown keystream backend '{value}'. Expected one of {KEYSTREAM_BACKENDS}.")
+    return value
+
+
+KEY_PARAM_TYPES = {
+    'acm_iterations': int, 'acm_a': int, 'acm_b': int,
+    'logistic_x0': float, 'logistic_r': float, 'keystream_backend': keystream_backend,
+}
+
+
+def default_key_params():
+
+    return {
+        'acm_iterations': ACM_ITERATIONS, 'acm_a': ACM_A, 'acm_b': ACM_B,
+        'logistic_x0': LOGISTIC_X0, 'logistic_r': LOGISTIC_R, 'keystream_backend': KEYSTREAM_BACKEND,
+    }
+
+
+def _params_from_metadata(metadata, fallback):
+
+    params = dict(fallback)
+    encryption_params = (metadata or {}).get('encryption_params', {})
+    if metadata is not None:
+        params['keystream_backend'] = 'logistic'
+    for name, cast in KEY_PARAM_TYPES.items():
+        if name in encryption_params:
+            params[name] = cast(encryption_params[name])
+    return params, encryption_params
+
+
+def encrypt_request(image_bytes, params, grayscale=False):
+
+    image, original_size, padded = preprocess_image(image_bytes, grayscale=grayscale)
+    encrypted, encryption_time = encrypt_image(image, **params)
+    width, height = original_size
+    metadata = build_encryption_metadata(
+        original_shape_unpadded=(height, width) + image.shape[2:],
+        original_shape_padded=image.shape,
+        dtype=image.dtype,
+        grayscale=grayscale,
+        padded=padded,
+        pre_steg_shape=encrypted.shape,
+        pre_steg_dtype=encrypted.dtype,
+        **params
+    )
+    steg_image, _ = steghide_embed_metadata(encrypted, metadata)
+    compressed, _ = compress_data(steg_image)
+    if compressed is None:
+        raise ValueError("Compression failed.")
+    return {
+        'compressed': compressed,
+        'sha256': calculate_hash_bytes(compressed),
+        'encrypted_shape': list(encrypted.shape),
+        'encrypted_dtype': str(encrypted.dtype),
+        'encryption_time': encryption_time,
+    }
+
+
+def decompress_request(compressed, encrypted_shape, encrypted_dtype='uint8'):
+
+    encrypted, _ = decompress_data(compressed, tuple(encrypted_shape), encrypted_dtype)
+    if encrypted is None:
+        raise ValueError("Decompression failed: data corrupted or shape/dtype mismatch.")
+    return encrypted
+
+
+def decrypt_request(compressed, encrypted_shape, encrypted_dtype='uint8', expected_sha256=None):
+
+    if expected_sha256 and not verify_integrity_compressed(compressed, expected_sha256):
+        raise ValueError("Integrity check failed: hashes do not match.")
+    encrypted = decompress_request(compressed, encrypted_shape, encrypted_dtype)
+    metadata = steghide_extract_metadata(encrypted)
+    params, encryption_params = _params_from_metadata(metadata, default_key_params())
+    original_shape = encryption_params.get('original_shape_unpadded') or encrypted.shape
+    decrypted, decryption_time = decrypt_image(
+        encrypted,
+        original_shape_before_padding=tuple(original_shape),
+        padded=encryption_params.get('padded', False),
+        **params
+    )
+    if decrypted is None:
+        raise ValueError("Decryption failed.")
+    buffer = io.BytesIO()
+    Image.fromarray(decrypted).save(buffer, format='PNG')
+    return {'png': buffer.getvalue(), 'decryption_time': decryption_time}
+
+
+def metadata_request(compressed, encrypted_shape, encrypted_dtype='uint8'):
+
+    return steghide_extract_metadata(decompress_request(compressed, encrypted_shape, encrypted_dtype))
+
+
+class WorkerPool:
+
+    def __init__(self, workers):
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=enable_kernel_caches) for _ in range(workers)]
+        self.pending = [0] * workers
+        self.lock = threading.Lock()
+
+    def submit(self, affinity, fn, *args, **kwargs):
+
+        digest = hashlib.sha256(repr(affinity).encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], byteorder='big') % len(self.executors)
+        with self.lock:
+            self.pending[index] += 1
+        future = self.executors[index].submit(fn, *args, **kwargs)
+
+        def _done(_):
+            with self.lock:
+                self.pending[index] -= 1
+        future.add_done_callback(_done)
+        return future
+
+    def queue_depth(self):
+
+        with self.lock:
+            return list(self.pending)
+
+    def shutdown(self):
+
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+
+class LatencyStats:
+
+    def __init__(self):
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_WINDOW))
+        self.counts = collections.Counter()
+        self.errors = collections.Counter()
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok=True):
+
+        with self.lock:
+            self.samples[endpoint].append(seconds)
+            self.counts[endpoint] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def snapshot(self):
+
+        with self.lock:
+            report = {}
+            for endpoint, samples in self.samples.items():
+                values = np.array(samples) * 1000.0
+                report[endpoint] = {
+                    'count': self.counts[endpoint],
+                    'errors': self.errors[endpoint],
+                    'p50_ms': float(np.percentile(values, 50)) if len(values) else None,
+                    'p99_ms': float(np.percentile(values, 99)) if len(values) else None,
+                    'mean_ms': float(values.mean()) if len(values) else None,
+                }
+            return report
+
+
+class EncryptionRequestHandler(BaseHTTPRequestHandler):
+
+    server_version = "ImageEncryptionService/0.1"
+
+    def log_message(self, format, *args):
+
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        self._status = status
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length)
+
+    def _encrypted_shape(self, query):
+
+        shape = self.headers.get('X-Encrypted-Shape') or query.get('shape', [None])[0]
+        if not shape:
+            raise ValueError("Missing encrypted shape (X-Encrypted-Shape header or ?shape=H,W[,C]).")
+        return [int(dim) for dim in shape.split(',')]
+
+    def do_GET(self):
+
+        path = urlparse(self.path).path
+        if path == '/stats':
+            self._send(200, {
+                'queue_depth': self.server.pool.queue_depth(),
+                'latency': self.server.stats.snapshot(),
+                'uptime_s': time.perf_counter() - self.server.started_at,
+                'cache': self.server.cache.stats() if self.server.cache is not None else None,
+            })
+        elif path == '/metrics':
+            for worker, depth in enumerate(self.server.pool.queue_depth()):
+                QUEUE_DEPTH.set(depth, worker=worker)
+            self._send(200, _registry.render().encode('utf-8'), METRICS_CONTENT_TYPE)
+        elif path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        handler = {
+            '/encrypt': self._handle_encrypt,
+            '/decrypt': self._handle_decrypt,
+            '/verify': self._handle_verify,
+            '/metadata': self._handle_metadata,
+        }.get(parsed.path)
+        if handler is None:
+            self._send(404, {'error': f"Unknown endpoint {parsed.path}"})
+            return
+
+        start_time = time.perf_counter()
+        ok = False
+        try:
+            handler(self._read_body(), query)
+            ok = True
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            log.error("Unhandled error in %s: %s", parsed.path, e, exc_info=True)
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.server.stats.record(parsed.path, elapsed, ok)
+            HTTP_REQUESTS.inc(endpoint=parsed.path, code=getattr(self, '_status', 500))
+            HTTP_SECONDS.observe(elapsed, endpoint=parsed.path)
+
+    def _handle_encrypt(self, body, query):
+
+        params = default_key_params()
+        for name, cast in KEY_PARAM_TYPES.items():
+            if name in query:
+                params[name] = cast(query[name][0])
+        grayscale = query.get('grayscale', ['false'])[0].lower() in ('1', 'true', 'yes')
+        try:
+            with Image.open(io.BytesIO(body)) as header:
+                size = header.size
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Unreadable image: {e}")
+        affinity = (size, grayscale, tuple(sorted(params.items())))
+
+        def _compute():
+            result = self.server.pool.submit(affinity, encrypt_request, body, params, grayscale).result()
+            header = {name: result[name] for name in ('sha256', 'encrypted_shape', 'encrypted_dtype')}
+            return header, result['compressed']
+
+        cache = self.server.cache
+        key = cache_key(source_digest(body), params, {'grayscale': grayscale}) if cache is not None else None
+        header, compressed, hit = cached_call(cache, key, _compute)
+        if cache is not None:
+            CACHE_LOOKUPS.inc(result='hit' if hit else 'miss')
+        self._send(200, compressed, 'application/zlib', {
+            'X-Content-SHA256': header['sha256'],
+            'X-Encrypted-Shape': ','.join(str(dim) for dim in header['encrypted_shape']),
+            'X-Encrypted-Dtype': header['encrypted_dtype'],
+            'X-Cache': 'HIT' if hit else 'MISS',
+        })
+
+    def _handle_decrypt(self, body, query):
+
+        shape = self._encrypted_shape(query)
+        expected_sha256 = self.headers.get('X-Content-SHA256') or query.get('sha256', [None])[0]
+        result = self.server.pool.submit(tuple(shape), decrypt_request, body, shape,
+                                         expected_sha256=expected_sha256).result()
+        self._send(200, result['png'], 'image/png')
+
+    def _handle_verify(self, body, query):
+
+        expected_sha256 = self.headers.get('X-Content-SHA256') or query.get('sha256', [None])[0]
+        if not expected_sha256:
+            raise ValueError("Missing expected hash (X-Content-SHA256 header or ?sha256=...).")
+        calculated = calculate_hash_bytes(body)
+        self._send(200, {'valid': calculated == expected_sha256, 'sha256': calculated})
+
+    def _handle_metadata(self, body, query):
+
+        shape = self._encrypted_shape(query)
+        metadata = self.server.pool.submit(tuple(shape), metadata_request, body, shape).result()
+        if metadata is None:
+            raise ValueError("No metadata could be extracted.")
+        self._send(200, metadata)
+
+
+class EncryptionServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=2, verbose=False, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(address, EncryptionRequestHandler)
+        self.pool = WorkerPool(workers)
+        self.cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.stats = LatencyStats()
+        self.verbose = verbose
+        self.started_at = time.perf_counter()
+
+    def server_close(self):
+
+        super().server_close()
+        self.pool.shutdown()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=2, verbose=False, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+
+    server = EncryptionServer((host, port), workers=workers, verbose=verbose,
+                              cache_dir=cache_dir, cache_max_bytes=cache_max_bytes)
+    log.info("Encryption service listening on http://%s:%d with %d workers", host, server.server_address[1], workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down encryption service...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local image encryption service.")
+    add_logging_arguments(parser)
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--cache-dir', default=None, help="Enable the on-disk result cache in this directory.")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024))
+    args = parser.parse_args()
+    configure_from_args(args, parser)
+    serve(args.host, args.port, args.workers, args.verbose, args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
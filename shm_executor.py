@@ -0,0 +1,288 @@
+import atexit
+import os
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core import (
+    acm_permutation, cached_keystream, s_box_np, inv_s_box_np, encrypt_image, enable_kernel_caches,
+)
+from logs import get_logger
+
+
+BANDS_PER_WORKER = 4
+_live_blocks = weakref.WeakSet()
+log = get_logger('shm')
+
+
+def _attach_block(name):
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArray:
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.owner = name is None
+        self.block = shared_memory.SharedMemory(create=True, size=nbytes) if self.owner else _attach_block(name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf)
+        if self.owner:
+            _live_blocks.add(self)
+
+    @classmethod
+    def from_array(cls, array):
+
+        shared = cls(array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    @property
+    def spec(self):
+
+        return (self.block.name, self.shape, self.dtype.str)
+
+    def close(self):
+
+        self.array = None
+        try:
+            self.block.close()
+        except BufferError:
+            pass
+
+    def release(self):
+
+        self.close()
+        if self.owner:
+            try:
+                self.block.unlink()
+            except FileNotFoundError:
+                pass
+            _live_blocks.discard(self)
+
+
+@atexit.register
+def _release_leftover_blocks():
+
+    for shared in list(_live_blocks):
+        shared.release()
+
+
+def _run_attached(specs, fn):
+
+    attached = [SharedArray.attach(spec) for spec in specs]
+    try:
+        return fn(*[shared.array for shared in attached])
+    finally:
+        for shared in attached:
+            shared.close()
+
+
+def _encrypt_band(specs, start, stop):
+
+    def _work(source, gather, keystream, output):
+        channels = source.shape[2] if source.ndim == 3 else 1
+        source_px = source.reshape(-1, channels)
+        keystream_px = keystream.reshape(-1, channels)
+        output_px = output.reshape(-1, channels)
+        np.bitwise_xor(s_box_np[source_px[gather[start:stop]]], keystream_px[start:stop], out=output_px[start:stop])
+    _run_attached(specs, _work)
+
+
+def _decrypt_band(specs, start, stop):
+
+    def _work(source, forward, keystream, output):
+        channels = source.shape[2] if source.ndim == 3 else 1
+        source_px = source.reshape(-1, channels)
+        keystream_px = keystream.reshape(-1, channels)
+        output_px = output.reshape(-1, channels)
+        positions = forward[start:stop]
+        output_px[start:stop] = inv_s_box_np[np.bitwise_xor(source_px[positions], keystream_px[positions])]
+    _run_attached(specs, _work)
+
+
+def _encrypt_whole(specs, params):
+
+    def _work(source, output):
+        encrypted, _ = encrypt_image(source, **params)
+        output[...] = encrypted
+    _run_attached(specs, _work)
+
+
+def _remove_padding(img_array, original_shape_before_padding):
+
+    current_h, current_w = img_array.shape[:2]
+    orig_h, orig_w = original_shape_before_padding[:2]
+    if orig_h > current_h or orig_w > current_w:
+        log.error("Original dimensions (%dx%d) larger than decrypted image (%dx%d). Cannot unpad.", orig_h, orig_w, current_h, current_w)
+        return img_array
+    pad_top = (current_h - orig_h) // 2
+    pad_left = (current_w - orig_w) // 2
+    return img_array[pad_top : pad_top + orig_h, pad_left : pad_left + orig_w]
+
+
+class SharedMemoryExecutor:
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._blocks = []
+
+    def __enter__(self):
+
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=enable_kernel_caches)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+
+        self.shutdown()
+        return False
+
+    def share(self, array):
+
+        shared = SharedArray.from_array(np.ascontiguousarray(array))
+        self._blocks.append(shared)
+        return shared
+
+    def allocate(self, shape, dtype=np.uint8):
+
+        shared = SharedArray(shape, dtype)
+        self._blocks.append(shared)
+        return shared
+
+    def release(self, *shared_arrays):
+
+        for shared in shared_arrays:
+            shared.release()
+            if shared in self._blocks:
+                self._blocks.remove(shared)
+
+    def shutdown(self):
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        for shared in self._blocks:
+            shared.release()
+        self._blocks = []
+
+    def _bands(self, total):
+
+        count = max(1, min(total, self.max_workers * BANDS_PER_WORKER))
+        edges = np.linspace(0, total, count + 1, dtype=np.int64)
+        return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+    def _run(self, fn, jobs):
+
+        if self._pool is None:
+            raise RuntimeError("SharedMemoryExecutor must be used as a context manager.")
+        futures = [self._pool.submit(fn, *job) for job in jobs]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        for future in done:
+            future.result()
+
+    def encrypt_image(self, img_array, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1,
+                      keystream_backend='logistic'):
+
+        log.debug("Starting Shared-Memory Parallel Encryption...")
+        start_time = time.perf_counter()
+        if img_array.ndim not in [2, 3] or img_array.shape[0] != img_array.shape[1]:
+            raise ValueError("Parallel encryption requires a square 2D or 3D image array. Please pad first.")
+        img_array = img_array.astype(np.uint8, copy=False)
+        size = img_array.shape[0]
+
+        _, gather = acm_permutation(size, acm_iterations, acm_a, acm_b)
+        keystream = cached_keystream(logistic_x0, logistic_r, img_array.size, backend=keystream_backend)
+        blocks = [self.share(img_array), self.share(gather), self.share(keystream),
+                  self.allocate(img_array.shape, np.uint8)]
+        try:
+            specs = [block.spec for block in blocks]
+            self._run(_encrypt_band, [(specs, start, stop) for start, stop in self._bands(size * size)])
+            encrypted = blocks[-1].array.copy()
+        finally:
+            self.release(*blocks)
+
+        encryption_time = time.perf_counter() - start_time
+        log.debug("Parallel encryption completed in %.4f seconds (%d workers).", encryption_time, self.max_workers)
+        return encrypted, encryption_time
+
+    def decrypt_image(self, encrypted_img_array, acm_iterations, logistic_x0, logistic_r,
+                      original_shape_before_padding, padded, acm_a=1, acm_b=1, keystream_backend='logistic'):
+
+        log.debug("Starting Shared-Memory Parallel Decryption...")
+        start_time = time.perf_counter()
+        if encrypted_img_array.ndim not in [2, 3] or encrypted_img_array.shape[0] != encrypted_img_array.shape[1]:
+            raise ValueError("Parallel decryption requires a square 2D or 3D image array.")
+        encrypted_img_array = encrypted_img_array.astype(np.uint8, copy=False)
+        size = encrypted_img_array.shape[0]
+
+        forward, _ = acm_permutation(size, acm_iterations, acm_a, acm_b)
+        keystream = cached_keystream(logistic_x0, logistic_r, encrypted_img_array.size, backend=keystream_backend)
+        blocks = [self.share(encrypted_img_array), self.share(forward), self.share(keystream),
+                  self.allocate(encrypted_img_array.shape, np.uint8)]
+        try:
+            specs = [block.spec for block in blocks]
+            self._run(_decrypt_band, [(specs, start, stop) for start, stop in self._bands(size * size)])
+            decrypted = blocks[-1].array.copy()
+        finally:
+            self.release(*blocks)
+
+        if padded:
+            decrypted = _remove_padding(decrypted, original_shape_before_padding)
+        decryption_time = time.perf_counter() - start_time
+        log.debug("Parallel decryption completed in %.4f seconds (%d workers).", decryption_time, self.max_workers)
+        return decrypted, decryption_time
+
+    def encrypt_batch(self, images, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1,
+                      keystream_backend='logistic'):
+
+        log.debug("Starting Shared-Memory Batch Encryption of %d images...", len(images))
+        start_time = time.perf_counter()
+        params = {
+            'acm_iterations': acm_iterations, 'logistic_x0': logistic_x0, 'logistic_r': logistic_r,
+            'acm_a': acm_a, 'acm_b': acm_b, 'keystream_backend': keystream_backend,
+        }
+        pairs = [(self.share(image.astype(np.uint8, copy=False)), self.allocate(image.shape, np.uint8))
+                 for image in images]
+        try:
+            self._run(_encrypt_whole, [([source.spec, output.spec], params) for source, output in pairs])
+            results = [output.array.copy() for _, output in pairs]
+        finally:
+            for source, output in pairs:
+                self.release(source, output)
+
+        batch_time = time.perf_counter() - start_time
+        log.info("Batch encryption of %d images completed in %.4f seconds (%d workers).", len(images), batch_time, self.max_workers)
+        return results, batch_time
+
+
+def parallel_encrypt_image(img_array, acm_iterations, logistic_x0, logistic_r, acm_a=1, acm_b=1, max_workers=None,
+                           keystream_backend='logistic'):
+
+    with SharedMemoryExecutor(max_workers=max_workers) as executor:
+        return executor.encrypt_image(img_array, acm_iterations, logistic_x0, logistic_r, acm_a, acm_b, keystream_backend)
+
+
+def parallel_decrypt_image(encrypted_img_array, acm_iterations, logistic_x0, logistic_r,
+                           original_shape_before_padding, padded, acm_a=1, acm_b=1, max_workers=None,
+                           keystream_backend='logistic'):
+
+    with SharedMemoryExecutor(max_workers=max_workers) as executor:
+        return executor.decrypt_image(encrypted_img_array, acm_iterations, logistic_x0, logistic_r,
+                                      original_shape_before_padding, padded, acm_a, acm_b, keystream_backend)
@@ -0,0 +1,331 @@
+import argparse
+import bisect
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logs import get_logger
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+_registry = None
+log = get_logger('telemetry')
+
+
+def _escape(value):
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _format_labels(names, values, extra=()):
+
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._values[()] = self._initial()
+
+    def _initial(self):
+
+        return 0
+
+    def _key(self, labels):
+
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise ValueError(f"Metric '{self.name}' expects labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+
+        if amount < 0:
+            raise ValueError(f"Counter '{self.name}' can only increase.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+
+        self.inc(-amount, **labels)
+
+    def set_to_current_time(self, **labels):
+
+        self.set(time.time(), **labels)
+
+    def value(self, **labels):
+
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        if 'le' in labelnames:
+            raise ValueError("Histogram labels may not include 'le'.")
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        super().__init__(name, help_text, labelnames)
+
+    def observe(self, value, **labels):
+
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = self._initial()
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _initial(self):
+
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def count(self, **labels):
+
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in sorted(self._values.items())]
+        rows = []
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                rows.append((f"{self.name}_bucket", key, (('le', _format_value(bound)),), cumulative))
+            rows.append((f"{self.name}_sum", key, (), total))
+            rows.append((f"{self.name}_count", key, (), count))
+        return rows
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_type, name, help_text, labelnames, **kwargs):
+
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, help_text, labelnames, **kwargs)
+            elif type(metric) is not metric_type or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind} "
+                                 f"with labels {metric.labelnames}.")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def metrics(self):
+
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self):
+
+        return '\n'.join(metric.render() for metric in self.metrics()) + '\n'
+
+    def write(self, path):
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve(self, host='127.0.0.1', port=9464):
+
+        return MetricsServer(self, host, port)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+
+        pass
+
+    def do_GET(self):
+
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404, "Only /metrics is served here")
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, registry, host='127.0.0.1', port=9464):
+        super().__init__((host, port), MetricsRequestHandler)
+        self.registry = registry
+        self._thread = threading.Thread(target=self.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def close(self):
+
+        self.shutdown()
+        self.server_close()
+
+
+class PeriodicWriter:
+
+    def __init__(self, registry, path, interval=15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+
+        while not self._stop.wait(self.interval):
+            try:
+                self.registry.write(self.path)
+            except OSError as e:
+                log.warning("Could not write metrics to %s: %s", self.path, e)
+
+    def close(self):
+
+        self._stop.set()
+        self._thread.join()
+        self.registry.write(self.path)
+
+
+def get_registry():
+
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+def set_registry(registry):
+
+    global _registry
+    previous = _registry
+    _registry = registry
+    return previous
+
+
+def start_exporters(registry=None, path=None, port=None, host='127.0.0.1', interval=15.0):
+
+    registry = registry or get_registry()
+    exporters = []
+    if port is not None:
+        server = registry.serve(host, port)
+        log.info("Serving Prometheus metrics at %s", server.url)
+        exporters.append(server)
+    if path:
+        exporters.append(PeriodicWriter(registry, path, interval))
+    return exporters
+
+
+def stop_exporters(exporters):
+
+    for exporter in exporters:
+        exporter.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch a Prometheus metrics endpoint or print a metrics file.")
+    parser.add_argument('source', help="http://host:port/metrics URL or a metrics text file.")
+    args = parser.parse_args()
+    if args.source.startswith(('http://', 'https://')):
+        from urllib.request import urlopen
+        with urlopen(args.source, timeout=10) as response:
+            print(response.read().decode('utf-8'), end='')
+    else:
+        with open(args.source) as f:
+            print(f.read(), end='')
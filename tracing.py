@@ -0,0 +1,291 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+_NULL_SPAN = contextlib.nullcontext()
+_active_tracer = None
+
+
+def _nbytes(value):
+
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return None
+
+
+def _read_rss_bytes():
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Span:
+
+    __slots__ = ('name', 'path', 'depth', 'start_ns', 'end_ns', 'bytes_processed',
+                 'start_mem', 'peak_mem', 'thread_id', 'attrs')
+
+    def __init__(self, name, path, depth, bytes_processed, attrs):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.bytes_processed = bytes_processed
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.start_mem = None
+        self.peak_mem = None
+
+    @property
+    def duration_ns(self):
+
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def to_dict(self):
+
+        duration_s = self.duration_ns / 1e9
+        throughput = (self.bytes_processed / duration_s / 1e6
+                      if self.bytes_processed and duration_s > 0 else None)
+        return {
+            'name': self.name,
+            'path': self.path,
+            'depth': self.depth,
+            'start_ns': self.start_ns,
+            'duration_ns': self.duration_ns,
+            'bytes': self.bytes_processed,
+            'throughput_mb_s': throughput,
+            'peak_mem_bytes': (self.peak_mem - self.start_mem) if self.peak_mem is not None else None,
+            'thread_id': self.thread_id,
+            'attrs': self.attrs,
+        }
+
+
+class Tracer:
+
+    def __init__(self, memory='tracemalloc', rss_interval=0.005):
+        if memory not in ('tracemalloc', 'rss', None):
+            raise ValueError(f"Unknown memory mode '{memory}'. Expected 'tracemalloc', 'rss' or None.")
+        self.memory = memory
+        self.rss_interval = rss_interval
+        self.spans = []
+        self.origin_ns = time.perf_counter_ns()
+        self._local = threading.local()
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._open = set()
+        self._sampler = None
+        self._sampler_stop = threading.Event()
+        self._started_tracemalloc = False
+
+    def _stack(self):
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._stacks[threading.get_ident()] = stack
+        return stack
+
+    def current_path(self, thread_id=None):
+
+        stack = self._stacks.get(threading.get_ident() if thread_id is None else thread_id)
+        return stack[-1].path if stack else None
+
+    def start(self):
+
+        if self.memory == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif self.memory == 'rss' and self._sampler is None:
+            self._sampler_stop.clear()
+            self._sampler = threading.Thread(target=self._sample_rss, name='tracer-rss', daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+
+        if self._sampler is not None:
+            self._sampler_stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _sample_rss(self):
+
+        while not self._sampler_stop.wait(self.rss_interval):
+            rss = _read_rss_bytes()
+            if rss is None:
+                continue
+            with self._lock:
+                for span in self._open:
+                    if span.peak_mem is None or rss > span.peak_mem:
+                        span.peak_mem = rss
+
+    def _memory_now(self):
+
+        if self.memory == 'tracemalloc' and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        if self.memory == 'rss':
+            rss = _read_rss_bytes()
+            return rss, rss
+        return None, None
+
+    def begin(self, name, bytes_processed=None, **attrs):
+
+        stack = self._stack()
+        path = f"{stack[-1].path}/{name}" if stack else name
+        span = Span(name, path, len(stack), bytes_processed, attrs)
+
+        current, peak = self._memory_now()
+        if current is not None:
+            with self._lock:
+                for open_span in self._open:
+                    open_span.peak_mem = max(open_span.peak_mem or 0, peak)
+                if self.memory == 'tracemalloc':
+                    tracemalloc.reset_peak()
+                span.start_mem = current
+                span.peak_mem = current
+                self._open.add(span)
+        stack.append(span)
+        return span
+
+    def end(self, span):
+
+        span.end_ns = time.perf_counter_ns()
+        current, peak = self._memory_now()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        elif span in stack:
+            stack.remove(span)
+        with self._lock:
+            if current is not None:
+                span.peak_mem = max(span.peak_mem or 0, peak)
+                for open_span in self._open:
+                    if open_span is not span:
+                        open_span.peak_mem = max(open_span.peak_mem or 0, span.peak_mem)
+            self._open.discard(span)
+            self.spans.append(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name, bytes_processed=None, **attrs):
+
+        span = self.begin(name, bytes_processed, **attrs)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    def records(self):
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        return [span.to_dict() for span in spans]
+
+    def export_json_lines(self, path):
+
+        with open(path, 'w') as f:
+            for record in self.records():
+                f.write(json.dumps(record) + '\n')
+        return path
+
+    def export_chrome_trace(self, path):
+
+        pid = os.getpid()
+        events = []
+        for record in self.records():
+            args = {k: v for k, v in record.items() if k in ('bytes', 'throughput_mb_s', 'peak_mem_bytes', 'path')}
+            args.update(record['attrs'])
+            events.append({
+                'name': record['name'],
+                'cat': record['path'].split('/')[0],
+                'ph': 'X',
+                'ts': (record['start_ns'] - self.origin_ns) / 1000.0,
+                'dur': record['duration_ns'] / 1000.0,
+                'pid': pid,
+                'tid': record['thread_id'],
+                'args': args,
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+    def summary(self):
+
+        totals = {}
+        for record in self.records():
+            entry = totals.setdefault(record['path'], {'count': 0, 'total_s': 0.0, 'bytes': 0, 'peak_mem_bytes': 0})
+            entry['count'] += 1
+            entry['total_s'] += record['duration_ns'] / 1e9
+            entry['bytes'] += record['bytes'] or 0
+            entry['peak_mem_bytes'] = max(entry['peak_mem_bytes'], record['peak_mem_bytes'] or 0)
+        return totals
+
+    def print_summary(self):
+
+        print("--- Trace Summary ---")
+        print(f"{'Span':<48} {'Calls':>5} {'Total (s)':>10} {'MB/s':>9} {'Peak MB':>9}")
+        for path, entry in self.summary().items():
+            throughput = entry['bytes'] / entry['total_s'] / 1e6 if entry['bytes'] and entry['total_s'] > 0 else float('nan')
+            print(f"{path:<48} {entry['count']:>5} {entry['total_s']:>10.4f} {throughput:>9.1f} "
+                  f"{entry['peak_mem_bytes'] / 1e6:>9.1f}")
+
+
+def get_tracer():
+
+    return _active_tracer
+
+
+def set_tracer(tracer):
+
+    global _active_tracer
+    previous = _active_tracer
+    _active_tracer = tracer
+    return previous
+
+
+@contextlib.contextmanager
+def tracing(memory='tracemalloc'):
+
+    tracer = Tracer(memory=memory).start()
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+        tracer.stop()
+
+
+def trace_span(name, bytes_processed=None, **attrs):
+
+    tracer = _active_tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, bytes_processed, **attrs)
+
+
+def traced(name, bytes_arg=None):
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _active_tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            bytes_processed = _nbytes(args[bytes_arg]) if bytes_arg is not None and len(args) > bytes_arg else None
+            with tracer.span(name, bytes_processed):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator